@@ -1,7 +1,7 @@
 // src/pages/AdminPanel.jsx
 import React, { useEffect, useState, useRef, useMemo } from "react";
 import { useNavigate, useLocation } from "react-router-dom";
-import userFetch from "../services/UserFetchService";
+import userFetch, { listResults } from "../services/UserFetchService";
 import { toast } from "react-toastify";
 import StudentRecords from "../services/StudentRecords";
 import { AuthContext } from "../context/Authcontext";
@@ -15,6 +15,33 @@ import "react-toastify/dist/ReactToastify.css";
  * - Preserves original functionality but fixes loading / fetch timing / duplication issues.
  */
 
+// List endpoint behind each collection of /api/admin/bootstrap/
+const COLLECTION_ENDPOINTS = {
+  users: "/accounts/api/users/",
+  teachers: "/accounts/api/users/?role=teacher",
+  students: "/accounts/api/users/?role=student",
+  classes: "academics/api/classes/",
+  subjects: "academics/api/subjects/",
+  enrollments: "academics/api/student-class-enrollment/",
+  class_subjects: "academics/api/class-subject/",
+};
+
+const withParam = (url, name, value) => `${url}${url.includes("?") ? "&" : "?"}${name}=${encodeURIComponent(value)}`;
+
+// Previous/next controls for a server-side page; `page` is the collection's entry in `pages`
+function Pager({ page, shown, onPrevious, onNext }) {
+  if (!page || (!page.previous && !page.next && !page.more)) return null;
+  return (
+    <div className="d-flex justify-content-between align-items-center mt-2">
+      <small className="text-muted">Showing {shown} of {page.count}</small>
+      <div className="btn-group">
+        <button className="btn btn-sm btn-outline-secondary" onClick={onPrevious} disabled={!page.previous}>Previous</button>
+        <button className="btn btn-sm btn-outline-secondary" onClick={onNext} disabled={!page.next && !page.more}>Next</button>
+      </div>
+    </div>
+  );
+}
+
 export default function AdminPanel() {
   const auth = useContext(AuthContext);
   const user = auth.user;
@@ -40,6 +67,9 @@ export default function AdminPanel() {
   const [subjects, setSubjects] = useState([]);
   const [enrollments, setEnrollments] = useState([]);
   const [assignments, setAssignments] = useState([]);
+  // Per collection: the URL of the page on screen, the total count and the next/previous links
+  const [pages, setPages] = useState({});
+  const searchTimerRef = useRef(null);
 
   const [searchRoll, setSearchRoll] = useState("");
 
@@ -110,6 +140,16 @@ export default function AdminPanel() {
     });
   };
 
+  const setters = {
+    users: setUsers,
+    teachers: setTeachers,
+    students: setStudents,
+    classes: setClasses,
+    subjects: setSubjects,
+    enrollments: setEnrollments,
+    class_subjects: setAssignments,
+  };
+
   // ---------- Data fetching ----------
   // use ref to prevent duplicate fetches for same user
   const initializedRef = useRef(false);
@@ -124,36 +164,19 @@ export default function AdminPanel() {
     try {
       setIsLoading(true);
 
-      const [
-        
-        usersData,
-        teachersData,
-        studentsData,
-        classesData,
-        subjectsData,
-        enrollmentsData,
-        assignmentsData,
-      ] = await Promise.all([
-        
-        userFetch.get("/accounts/api/users/"),
-        userFetch.get("/accounts/api/users/?role=teacher"),
-        userFetch.get("/accounts/api/users/?role=student"),
-        userFetch.get("academics/api/classes/"),
-        userFetch.get("academics/api/subjects/"),
-        userFetch.get("academics/api/student-class-enrollment/"),
-        userFetch.get("academics/api/class-subject/"),
-      ]);
-
-     
-      setUsers(Array.isArray(usersData) ? usersData : []);
-  
-      setTeachers(Array.isArray(teachersData) ? teachersData : []);
-      setStudents(Array.isArray(studentsData) ? studentsData : []);
-      setClasses(Array.isArray(classesData) ? classesData : []);
-      setSubjects(Array.isArray(subjectsData) ? subjectsData : []);
-      setEnrollments(Array.isArray(enrollmentsData) ? enrollmentsData : []);
-      
-      setAssignments(Array.isArray(assignmentsData) ? assignmentsData : []);
+      // One request returns the first page and the size of every collection;
+      // further pages are fetched from the list endpoints as the tables page through
+      const data = await userFetch.get("/api/admin/bootstrap/");
+      const bootstrapped = {};
+      Object.keys(COLLECTION_ENDPOINTS).forEach((name) => {
+        const rows = listResults(data?.[name]);
+        setters[name](rows);
+        // The bootstrap carries no links; `more` says there is a next page to look up
+        const count = data?.[name]?.count ?? rows.length;
+        bootstrapped[name] = { url: COLLECTION_ENDPOINTS[name], count, next: null, previous: null, more: count > rows.length };
+      });
+      setPages(bootstrapped);
+      setStats({ total_users: data?.users?.count, total_students: data?.students?.count, total_teachers: data?.teachers?.count });
       setError(null);
     } catch (err) {
       console.error("Admin data fetch error:", err);
@@ -180,8 +203,65 @@ export default function AdminPanel() {
   }, [user, auth.loading, navigate, location.pathname]);
 
 
+  // ---------- Paging ----------
+  const loadPage = async (name, url) => {
+    const data = await userFetch.get(url);
+    const rows = listResults(data);
+    setters[name](rows);
+    setPages((prev) => ({
+      ...prev,
+      [name]: { url, count: data?.count ?? rows.length, next: data?.next || null, previous: data?.previous || null, more: false },
+    }));
+  };
+
+  // After a change, reload only the page each affected table is showing
+  const refreshPages = (...names) =>
+    Promise.all(names.map((name) => loadPage(name, pages[name]?.url || COLLECTION_ENDPOINTS[name])));
+
+  const nextPage = async (name) => {
+    try {
+      let next = pages[name]?.next;
+      if (!next && pages[name]?.more) {
+        // A bootstrap page: ask the list endpoint for its link to page two
+        next = (await userFetch.get(pages[name].url))?.next;
+      }
+      if (next) await loadPage(name, next);
+    } catch (err) {
+      toast.error(`Failed to load the next page: ${err?.message || String(err)}`);
+    }
+  };
+
+  const previousPage = async (name) => {
+    if (!pages[name]?.previous) return;
+    try {
+      await loadPage(name, pages[name].previous);
+    } catch (err) {
+      toast.error(`Failed to load the previous page: ${err?.message || String(err)}`);
+    }
+  };
+
+  const userCollection = (tab = activeSubTab) => (tab === "students" ? "students" : "teachers");
+
+  // Users are searched on the server, a short pause after typing stops
+  const searchUsers = (query, tab = activeSubTab) => {
+    setSearchQuery(query);
+    clearTimeout(searchTimerRef.current);
+    searchTimerRef.current = setTimeout(() => {
+      const name = userCollection(tab);
+      const url = query.trim() ? withParam(COLLECTION_ENDPOINTS[name], "search", query.trim()) : COLLECTION_ENDPOINTS[name];
+      loadPage(name, url).catch((err) => toast.error(`Search failed: ${err?.message || String(err)}`));
+    }, 300);
+  };
+
+  const switchSubTab = (tab) => {
+    setActiveSubTab(tab);
+    if (searchQuery) searchUsers("", tab);
+  };
+
+  const USER_COLLECTIONS = ["users", "students", "teachers"];
+
   // ---------- CRUD helper (generic) ----------
-  const handleSubmit = async (endpoint, data = {}, method = "POST", successMessage = "Success") => {
+  const handleSubmit = async (endpoint, data = {}, method = "POST", successMessage = "Success", collections = []) => {
     try {
       let res;
       if (method === "DELETE") {
@@ -193,7 +273,7 @@ export default function AdminPanel() {
       }
 
       if (successMessage) toast.success(successMessage);
-      await fetchAllData();
+      await refreshPages(...collections);
       resetForm();
       return res;
     } catch (err) {
@@ -218,8 +298,7 @@ export default function AdminPanel() {
         department: formData.department,
       });
       toast.success("Class created successfully!");
-      const classesList = await userFetch.get("academics/api/classes/");
-      setClasses(Array.isArray(classesList) ? classesList : []);
+      await refreshPages("classes");
       setFormData((prev) => ({ ...prev, className: "", year: "", semester: "", department: "" }));
     } catch (err) {
       console.error("Class creation error:", err);
@@ -238,8 +317,7 @@ export default function AdminPanel() {
         department: formData.department,
       });
       toast.success("Class updated successfully!");
-      const classesList = await userFetch.get("academics/api/classes/");
-      setClasses(Array.isArray(classesList) ? classesList : []);
+      await refreshPages("classes");
       resetForm();
     } catch (err) {
       console.error("Update class error:", err);
@@ -262,7 +340,7 @@ export default function AdminPanel() {
   const deleteClass = async (id) => {
     if (!window.confirm("Are you sure you want to delete this class?")) return;
     try {
-      await handleSubmit(`academics/api/classes/${id}/`, {}, "DELETE", "Class deleted successfully!");
+      await handleSubmit(`academics/api/classes/${id}/`, {}, "DELETE", "Class deleted successfully!", ["classes"]);
     } catch (err) {
       console.error("Delete class error:", err);
     }
@@ -278,8 +356,7 @@ export default function AdminPanel() {
     try {
       await userFetch.post("academics/api/subjects/", { name: formData.subjectName, code: formData.subjectCode });
       toast.success("Subject created successfully!");
-      const subjectsList = await userFetch.get("academics/api/subjects/");
-      setSubjects(Array.isArray(subjectsList) ? subjectsList : []);
+      await refreshPages("subjects");
       setFormData((prev) => ({ ...prev, subjectName: "", subjectCode: "" }));
     } catch (err) {
       console.error("Subject creation error:", err);
@@ -296,8 +373,7 @@ export default function AdminPanel() {
         code: formData.subjectCode,
       });
       toast.success("Subject updated successfully!");
-      const subjectsList = await userFetch.get("/api/subjects/");
-      setSubjects(Array.isArray(subjectsList) ? subjectsList : []);
+      await refreshPages("subjects");
       resetForm();
     } catch (err) {
       console.error("Update subject error:", err);
@@ -316,8 +392,7 @@ export default function AdminPanel() {
     try {
       await userFetch.delete(`/api/subjects/${subjectId}/`);
       toast.success("Subject deleted successfully");
-      const subjectsList = await userFetch.get("/api/subjects/");
-      setSubjects(Array.isArray(subjectsList) ? subjectsList : []);
+      await refreshPages("subjects");
     } catch (err) {
       console.error("Delete subject error:", err);
       toast.error(`Failed to delete subject: ${err?.message || String(err)}`);
@@ -336,9 +411,9 @@ export default function AdminPanel() {
 
     try {
       if (editMode.user) {
-        await handleSubmit(`/accounts/api/users/${editMode.user}/`, payload, "PUT", "User updated successfully!");
+        await handleSubmit(`/accounts/api/users/${editMode.user}/`, payload, "PUT", "User updated successfully!", USER_COLLECTIONS);
       } else {
-        await handleSubmit("/accounts/api/users/", payload, "POST", "User created successfully!");
+        await handleSubmit("/accounts/api/users/", payload, "POST", "User created successfully!", USER_COLLECTIONS);
       }
     } catch (err) {
       console.error("User submit error:", err);
@@ -364,7 +439,7 @@ export default function AdminPanel() {
     try {
       await userFetch.delete(`/accounts/api/users/${id}/`);
       toast.success("User deleted successfully");
-      await fetchAllData();
+      await refreshPages(...USER_COLLECTIONS);
     } catch (err) {
       console.error("Delete user error:", err);
       toast.error(`Delete failed: ${err?.message || String(err)}`);
@@ -384,9 +459,7 @@ export default function AdminPanel() {
         enrolled_class: formData.enrollClassId,
       });
       toast.success("Student enrolled successfully!");
-      const enrollList = await userFetch.get("academics/api/student-class-enrollment/");
-      
-      setEnrollments(Array.isArray(enrollList) ? enrollList : []);
+      await refreshPages("enrollments");
       setFormData((prev) => ({ ...prev, studentId: "", enrollClassId: "" }));
     } catch (err) {
       console.error("Enrollment error:", err);
@@ -407,8 +480,7 @@ export default function AdminPanel() {
         subject: formData.subjectId,
       });
       toast.success("Teacher assigned successfully!");
-      const assignmentsList = await userFetch.get("academics/api/class-subject/");
-      setAssignments(Array.isArray(assignmentsList) ? assignmentsList : []);
+      await refreshPages("class_subjects");
       setFormData((prev) => ({ ...prev, teacherId: "", classId: "", subjectId: "" }));
     } catch (err) {
       console.error("Assignment error:", err);
@@ -419,7 +491,7 @@ export default function AdminPanel() {
   const deleteAssignment = async (id) => {
     if (!window.confirm("Are you sure you want to remove this assignment?")) return;
     try {
-      await handleSubmit(`/api/assignments/${id}/`, {}, "DELETE", "Assignment removed successfully!");
+      await handleSubmit(`/api/assignments/${id}/`, {}, "DELETE", "Assignment removed successfully!", ["class_subjects"]);
     } catch (err) {
       console.error("Delete assignment error:", err);
     }
@@ -430,8 +502,7 @@ export default function AdminPanel() {
     try {
       await userFetch.delete(`academics/api/student-class-enrollment/${enrollmentId}/`);
       toast.success("Enrollment removed successfully");
-      const enrollList = await userFetch.get("academics/api/student-class-enrollment/");
-      setEnrollments(Array.isArray(enrollList) ? enrollList : []);
+      await refreshPages("enrollments");
     } catch (err) {
       console.error("Delete enrollment error:", err);
       toast.error(`Failed to remove enrollment: ${err?.message || String(err)}`);
@@ -452,10 +523,7 @@ export default function AdminPanel() {
           localStorage.removeItem(`pendingPassword:${email}`);
         } catch (e) { /* ignore */ }
       }
-      const studentList = await userFetch.get("/accounts/api/users/?role=student");
-      const userList = await userFetch.get("/accounts/api/users/");
-      setUsers(Array.isArray(userList) ? userList : []);
-      setStudents(Array.isArray(studentList) ? studentList : []);
+      await refreshPages(...USER_COLLECTIONS);
 
       
     } catch (err) {
@@ -474,8 +542,7 @@ export default function AdminPanel() {
       toast.success("Feedback sent successfully!");
       setFeedbackText("");
       setSelectedEmail(null);
-      const usersList = await userFetch.get("/accounts/api/users/");
-      setUsers(Array.isArray(usersList) ? usersList : []);
+      await refreshPages("users");
     } catch (err) {
       console.error("Feedback error:", err);
       toast.error(`Failed to send feedback: ${err?.message || String(err)}`);
@@ -483,14 +550,8 @@ export default function AdminPanel() {
   };
 
   // ---------- Utilities ----------
-  const filteredUsers = users.filter((u) =>
-    u.role === (activeSubTab === "students" ? "student" : "teacher") &&
-    (
-      u.name?.toLowerCase().includes(searchQuery.toLowerCase().trim()) ||
-      u.email?.toLowerCase().includes(searchQuery.toLowerCase().trim()) ||
-      (activeSubTab === "students" && u.roll_number?.toString().includes(searchQuery))
-    )
-  );
+  // The page on screen, already filtered by role and search on the server
+  const listedUsers = activeSubTab === "students" ? students : teachers;
 
   // ---------- Render ----------
   if (isLoading) {
@@ -679,10 +740,10 @@ export default function AdminPanel() {
         <div className="user-management-tab">
           <ul className="nav nav-tabs mb-3">
             <li className="nav-item">
-              <button className={`nav-link ${activeSubTab === "students" ? "active" : ""}`} onClick={() => setActiveSubTab("students")}>Students</button>
+              <button className={`nav-link ${activeSubTab === "students" ? "active" : ""}`} onClick={() => switchSubTab("students")}>Students</button>
             </li>
             <li className="nav-item">
-              <button className={`nav-link ${activeSubTab === "teachers" ? "active" : ""}`} onClick={() => setActiveSubTab("teachers")}>Teachers</button>
+              <button className={`nav-link ${activeSubTab === "teachers" ? "active" : ""}`} onClick={() => switchSubTab("teachers")}>Teachers</button>
             </li>
           </ul>
 
@@ -729,7 +790,7 @@ export default function AdminPanel() {
             <div className="card-header"><h5 className="mb-0">User List</h5></div>
             <div className="card-body">
               <div className="mb-3">
-                <input type="text" className="form-control" placeholder={`Search ${activeSubTab} by ${activeSubTab === "students" ? "Roll No., Name, or Email" : "Name or Email"}`} value={searchQuery} onChange={(e) => setSearchQuery(e.target.value)} />
+                <input type="text" className="form-control" placeholder={`Search ${activeSubTab} by ${activeSubTab === "students" ? "Roll No., Name, or Email" : "Name or Email"}`} value={searchQuery} onChange={(e) => searchUsers(e.target.value)} />
               </div>
 
               <div className="table-responsive">
@@ -738,7 +799,7 @@ export default function AdminPanel() {
                     <tr><th>Roll No.</th><th>Name</th><th>Email</th><th>Role</th><th>Status</th><th>Actions</th></tr>
                   </thead>
                   <tbody>
-                    {filteredUsers.map(u => (
+                    {listedUsers.map(u => (
                       
                       <tr key={u.id}>
                         <td>{u.roll_number}</td>
@@ -816,6 +877,7 @@ export default function AdminPanel() {
                   </tbody>
                 </table>
               </div>
+              <Pager page={pages[userCollection()]} shown={listedUsers.length} onPrevious={() => previousPage(userCollection())} onNext={() => nextPage(userCollection())} />
             </div>
           </div>
 
@@ -895,6 +957,7 @@ export default function AdminPanel() {
                   </tbody>
                 </table>
               </div>
+              <Pager page={pages.classes} shown={classes.length} onPrevious={() => previousPage("classes")} onNext={() => nextPage("classes")} />
             </div>
           </div>
         </div>
@@ -950,6 +1013,7 @@ export default function AdminPanel() {
                   </tbody>
                 </table>
               </div>
+              <Pager page={pages.subjects} shown={subjects.length} onPrevious={() => previousPage("subjects")} onNext={() => nextPage("subjects")} />
             </div>
           </div>
         </div>
@@ -58,19 +58,11 @@ export default function Dashboard({ user }) {
       if (data || dashboardFetchRef.current) return;
       dashboardFetchRef.current = true;
       try {
-        // NOTE: backend may return an array of users for /accounts/api/users/
-        // Normalize into { users, user } where `user` is the current profile.
-        const result = await userFetch.get("accounts/api/users/");
-        // if (Array.isArray(result) && result.length > 0) {
-        //   // Try to find the logged-in user's record by email
-        //   const matched = savedUser && savedUser.email ? result.find(u => u.email === savedUser.email) : null;
-        //   const serverProfile = matched || result[0];
-        //   const mergedProfile = { ...(serverProfile || {}), ...(savedUser || {}) };
-        //   setData({ users: result, user: mergedProfile });
-        // } else {
-          // If backend returned an object (dashboard shape), use it directly
-          setData(result);
-        // }
+        // The logged-in user's own record; the user list is paginated and
+        // would only hold them if they happened to be on its first page
+        const userId = user?.id ?? savedUser?.id;
+        const result = await userFetch.get(`accounts/api/users/${userId}/`);
+        setData(result);
       } catch (err) {
         console.error("Dashboard fetch error:", err);
         // if unauthorized, redirect to login
@@ -121,9 +113,8 @@ export default function Dashboard({ user }) {
   let student = null, summaryBySubject = {}, sortedSubjects = [], totalPages = 1, startIdx = 0, endIdx = 0, pagedAttendance = [], subjectOptions = [];
 
   if (currentUser?.role === "student" && data) {
-    student = data.find(e => e.email === currentUser.email);
+    student = data;
     // Attendance summary by subject
-    console.log(student);
     const getAttendanceSummaryBySubject = attendance => {
       const summary = {};
       attendance.forEach(a => {
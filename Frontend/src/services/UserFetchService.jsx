@@ -91,4 +91,7 @@ const userFetch = {
   },
 };
 
+// List endpoints are paginated ({ results, next, ... }); older ones returned bare arrays
+export const listResults = (data) => (Array.isArray(data) ? data : (data?.results || []));
+
 export default userFetch;
@@ -2,7 +2,15 @@ from django.contrib import admin
 from .models import Class, ClassSubject, Subject, StudentClassEnrollment
 
 # Register your models here.
+class ClassSubjectAdmin(admin.ModelAdmin):
+    list_select_related = ['class_instance', 'subject']
+
+
+class StudentClassEnrollmentAdmin(admin.ModelAdmin):
+    list_select_related = ['student', 'enrolled_class']
+
+
 admin.site.register(Class)
 admin.site.register(Subject)
-admin.site.register(ClassSubject)
-admin.site.register(StudentClassEnrollment)
\ No newline at end of file
+admin.site.register(ClassSubject, ClassSubjectAdmin)
+admin.site.register(StudentClassEnrollment, StudentClassEnrollmentAdmin)
\ No newline at end of file
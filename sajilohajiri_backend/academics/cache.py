@@ -0,0 +1,97 @@
+import hashlib
+import json
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from sajilohajiri_backend.etags import etag_for, etag_matches
+
+# Response cache for academics reference data (classes, subjects, class
+# subjects), which is read on every page load but changes a few times a term.
+#
+# Each cached response is keyed by the view, its URL kwargs, the normalized
+# query parameters and the current *version* of every model it renders.
+# A version is the time of that model's last change; academics.signals bumps
+# it on post_save/post_delete, which orphans every entry built from the old
+# data without having to find and delete them. The same versions give the
+# Last-Modified header, and each entry keeps its ETag.
+#
+# Works with any Django cache backend. LocMemCache is per process, so with
+# several workers use FileBasedCache or a shared cache so a change made
+# through one worker invalidates the others.
+
+
+def get_cache():
+    return caches[getattr(settings, 'ACADEMICS_CACHE', 'default')]
+
+
+def version_key(name):
+    return f'academics:version:{name}'
+
+
+def bump_version(name):
+    # Bump now so this process stops serving old entries, and again after commit
+    # in case another request cached the pre-commit data in between
+    get_cache().set(version_key(name), time.time_ns(), None)
+    transaction.on_commit(lambda: get_cache().set(version_key(name), time.time_ns(), None))
+
+
+def get_versions(names):
+    cache = get_cache()
+    keys = [version_key(name) for name in names]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Unknown (cold or evicted cache): start a fresh version
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key, time.time_ns())
+    return [versions[key] for key in keys]
+
+
+def response_key(request, view_name, kwargs, versions):
+    params = sorted((key, sorted(values)) for key, values in request.query_params.lists())
+    fingerprint = json.dumps([request.get_host(), sorted(kwargs.items()), params, versions], default=str)
+    return f'academics:response:{view_name}:{hashlib.md5(fingerprint.encode()).hexdigest()}'
+
+
+class CachedResponseMixin:
+    """Cache list/retrieve responses of a viewset until one of `cache_dependencies` changes."""
+    cache_dependencies = ()
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, lambda: super(CachedResponseMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, lambda: super(CachedResponseMixin, self).retrieve(request, *args, **kwargs))
+
+    def cached_response(self, request, render):
+        versions = get_versions(self.cache_dependencies)
+        key = response_key(request, f'{self.basename}-{self.action}', self.kwargs, versions)
+        cache = get_cache()
+        entry = cache.get(key)
+        if entry is None:
+            response = render()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            # Plain JSON types so the entry pickles on any backend
+            data = json.loads(JSONRenderer().render(response.data))
+            entry = {'data': data, 'etag': etag_for(data), 'modified': max(versions) // 1_000_000_000}
+            cache.set(key, entry, getattr(settings, 'ACADEMICS_CACHE_TIMEOUT', 300))
+
+        headers = {
+            'ETag': entry['etag'],
+            'Last-Modified': http_date(entry['modified']),
+            'Cache-Control': 'private, no-cache',
+        }
+        if 'If-None-Match' in request.headers:
+            not_modified = etag_matches(request, entry['etag'])
+        else:
+            since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+            not_modified = since is not None and entry['modified'] <= since
+        if not_modified:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(entry['data'], headers=headers)
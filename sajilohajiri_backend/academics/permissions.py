@@ -13,4 +13,9 @@ class OnlyAuthenticated(BasePermission):
         else:
             if request.method in ['POST', 'PATCH', 'DELETE', 'PUT'] and not (request.user.role=='admin' or request.user.is_staff): 
                 return False
-            return True
\ No newline at end of file
+            return True
+
+class TeacherRole(BasePermission):
+
+    def has_permission(self, request, view):
+        return request.user.is_authenticated and (request.user.role in ['teacher', 'admin'] or request.user.is_staff)
@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .cache import bump_version
+from .models import Class, Subject, ClassSubject
+
+
+# Invalidate cached academics responses (see academics.cache)
+@receiver(post_save, sender=Class)
+@receiver(post_delete, sender=Class)
+def class_changed(sender, **kwargs):
+    bump_version('class')
+
+
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+def subject_changed(sender, **kwargs):
+    bump_version('subject')
+
+
+@receiver(post_save, sender=ClassSubject)
+@receiver(post_delete, sender=ClassSubject)
+def class_subject_changed(sender, **kwargs):
+    bump_version('class_subject')
+
+
+# Class subjects render their teacher's name; other user saves (students,
+# last_login updates on every login) never change what is shown there
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def teacher_saved(sender, instance, update_fields=None, **kwargs):
+    if instance.role == 'teacher' and (update_fields is None or 'name' in update_fields):
+        bump_version('teacher')
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def teacher_deleted(sender, instance, **kwargs):
+    if instance.role == 'teacher':
+        bump_version('teacher')
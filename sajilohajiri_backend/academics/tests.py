@@ -1,3 +1,137 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import update_last_login
+from rest_framework.test import APIClient
+from accounts.models import User
+from .models import Class, Subject, ClassSubject, StudentClassEnrollment
 
 # Create your tests here.
+class ListQueryCountTests(TestCase):
+    """Every academics list endpoint must cost the same number of queries however many rows it returns.
+
+    Paginated lists run two: the page count and the page itself.
+    """
+
+    def setUp(self):
+        self.admin = User.objects.create(email='admin@example.com', role='admin', name='Admin')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.created = 0
+        self.add_rows(2)
+
+    def add_rows(self, count):
+        for _ in range(count):
+            self.created += 1
+            n = self.created
+            school_class = Class.objects.create(name=f'Class {n}', year=1, semester=1, department='Computer')
+            subject = Subject.objects.create(name=f'Subject {n}', code=f'S{n}')
+            teacher = User.objects.create(email=f'teacher{n}@example.com', role='teacher', name=f'Teacher {n}')
+            student = User.objects.create(email=f'student{n}@example.com', role='student', name=f'Student {n}', roll_number=f'R{n}')
+            ClassSubject.objects.create(class_instance=school_class, subject=subject, teacher=teacher)
+            StudentClassEnrollment.objects.create(student=student, enrolled_class=school_class)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+
+    def assertConstantQueries(self, url, expected):
+        small, _ = self.count_queries(url)
+        self.add_rows(20)
+        large, response = self.count_queries(url)
+        self.assertEqual(small, large, f'{url} issues more queries as rows grow')
+        self.assertEqual(large, expected)
+        return response
+
+    def test_classes(self):
+        self.assertConstantQueries('/academics/api/classes/', 2)
+
+    def test_subjects(self):
+        self.assertConstantQueries('/academics/api/subjects/', 2)
+
+    def test_class_subjects(self):
+        response = self.assertConstantQueries('/academics/api/class-subject/', 2)
+        first = response.json()['results'][0]
+        self.assertEqual(first['class_instance'], 'Class 1 - Sem 1')
+        self.assertEqual(first['subject'], 'S1 - Subject 1')
+        self.assertEqual(first['teacher'], 'Teacher 1')
+
+    def test_class_subjects_filtered(self):
+        # One extra query: the filter validates the teacher id
+        teacher = User.objects.filter(role='teacher').first()
+        self.assertConstantQueries(f'/academics/api/class-subject/?teacher={teacher.pk}', 3)
+
+    def test_student_class_enrollments(self):
+        self.assertConstantQueries('/academics/api/student-class-enrollment/', 2)
+
+
+class ResponseCacheTests(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create(email='admin@example.com', role='admin', name='Admin')
+        self.teacher = User.objects.create(email='teacher@example.com', role='teacher', name='Teacher')
+        self.school_class = Class.objects.create(name='Class 1', year=1, semester=1, department='Computer')
+        self.subject = Subject.objects.create(name='Subject 1', code='S1')
+        ClassSubject.objects.create(class_instance=self.school_class, subject=self.subject, teacher=self.teacher)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def get(self, url, **headers):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, headers=headers)
+        return response, len(queries)
+
+    def test_repeat_request_is_served_from_cache(self):
+        first, _ = self.get('/academics/api/class-subject/?ordering=id&page=1')
+        # Same parameters in another order hit the same entry
+        second, queries = self.get('/academics/api/class-subject/?page=1&ordering=id')
+        self.assertEqual(queries, 0)
+        self.assertEqual(first.json(), second.json())
+        self.assertEqual(first['ETag'], second['ETag'])
+        self.assertIn('Last-Modified', second)
+
+    def test_etag_revalidation(self):
+        response, _ = self.get('/academics/api/subjects/')
+        revalidated, queries = self.get('/academics/api/subjects/', if_none_match=response['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(queries, 0)
+        revalidated, _ = self.get('/academics/api/subjects/', if_modified_since=response['Last-Modified'])
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_saving_a_model_invalidates_dependent_responses(self):
+        response, _ = self.get('/academics/api/class-subject/')
+        self.subject.name = 'Renamed'
+        self.subject.save()
+        changed, queries = self.get('/academics/api/class-subject/', if_none_match=response['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertGreater(queries, 0)
+        self.assertEqual(changed.json()['results'][0]['subject'], 'S1 - Renamed')
+
+        self.teacher.name = 'Renamed Teacher'
+        self.teacher.save()
+        self.assertEqual(self.get('/academics/api/class-subject/')[0].json()['results'][0]['teacher'], 'Renamed Teacher')
+
+    def test_unrelated_changes_keep_the_cache(self):
+        self.get('/academics/api/classes/')
+        Subject.objects.create(name='Subject 2', code='S2')
+        User.objects.create(email='student@example.com', role='student', name='Student')
+        _, queries = self.get('/academics/api/classes/')
+        self.assertEqual(queries, 0)
+
+    def test_logins_keep_the_cache(self):
+        self.get('/academics/api/class-subject/')
+        for user in (self.admin, self.teacher):
+            update_last_login(None, user)
+        _, queries = self.get('/academics/api/class-subject/')
+        self.assertEqual(queries, 0)
+
+    def test_detail_responses_are_cached(self):
+        url = f'/academics/api/classes/{self.school_class.pk}/'
+        self.get(url)
+        _, queries = self.get(url)
+        self.assertEqual(queries, 0)
+        self.school_class.delete()
+        response, _ = self.get(url)
+        self.assertEqual(response.status_code, 404)
@@ -5,28 +5,37 @@ from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 from .serializers import ClassSerializer, SubjectSerializer, ClassSubjectSerializer, StudentClassEnrollmentSerializer
 from .permissions import OnlyAuthenticated
 from .filters import ClassFilter, SubjectFilter, ClassSubjectFilter, StudentClassEnrollmentFilter
+from .cache import CachedResponseMixin
 
 # Create your views here.
-class ClassViewSet(viewsets.ModelViewSet):
+class ClassViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = Class.objects.all()
     serializer_class = ClassSerializer
     permission_classes = [OnlyAuthenticated]
     filterset_class = ClassFilter
+    ordering = ['id']
+    cache_dependencies = ['class']
 
-class SubjectViewSet(viewsets.ModelViewSet):
+class SubjectViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     queryset = Subject.objects.all()
     serializer_class = SubjectSerializer
     permission_classes = [OnlyAuthenticated]
     filterset_class = SubjectFilter
+    ordering = ['id']
+    cache_dependencies = ['subject']
 
-class ClassSubjectViewSet(viewsets.ModelViewSet):
-    queryset = ClassSubject.objects.all()
+class ClassSubjectViewSet(CachedResponseMixin, viewsets.ModelViewSet):
+    # ClassSubjectSerializer renders each relation through its __str__
+    queryset = ClassSubject.objects.select_related('class_instance', 'subject', 'teacher')
     serializer_class = ClassSubjectSerializer
     permission_classes = [OnlyAuthenticated]
     filterset_class = ClassSubjectFilter
+    ordering = ['id']
+    cache_dependencies = ['class_subject', 'class', 'subject', 'teacher']
 
 class StudentClassEnrollmentViewSet(viewsets.ModelViewSet):
-    queryset = StudentClassEnrollment.objects.all()
+    queryset = StudentClassEnrollment.objects.select_related('student', 'enrolled_class')
     serializer_class = StudentClassEnrollmentSerializer
     permission_classes = [OnlyAuthenticated]
-    filterset_class = StudentClassEnrollmentFilter
\ No newline at end of file
+    filterset_class = StudentClassEnrollmentFilter
+    ordering = ['id']
\ No newline at end of file
@@ -0,0 +1,101 @@
+import threading
+import time
+from django.conf import settings
+from django.utils.functional import cached_property
+from rest_framework.authentication import BasicAuthentication, SessionAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from .models import User
+
+# Stateless JWT authentication for hot endpoints.
+#
+# Tokens from /api/token/ carry the user's role, is_staff and approval_status
+# as claims (see serializers.ClaimsTokenObtainPairSerializer), so views that
+# only need those get a ClaimsUser built from the token instead of a User row.
+# Revocation is checked against a per-process cache of each user's current
+# state, refreshed from the database at most every JWT_CLAIMS_CHECK_TTL
+# seconds and dropped as soon as the user is saved or deleted in this
+# process: deactivated or deleted users and users whose claims changed are
+# rejected, and the client gets fresh claims from /api/token/refresh/.
+
+CLAIMS = ('role', 'is_staff', 'approval_status')
+
+
+def user_claims(user):
+    return {claim: getattr(user, claim) for claim in CLAIMS}
+
+
+class UserStateCache:
+    """{user_id: (is_active, role, is_staff, approval_status)}, each entry kept for a short TTL."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._states = {}
+
+    def get(self, user_id):
+        user_id = str(user_id)
+        now = time.monotonic()
+        entry = self._states.get(user_id)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+        # None when the user no longer exists
+        state = User.objects.filter(pk=user_id).values_list('is_active', *CLAIMS).first()
+        with self._lock:
+            self._states[user_id] = (now + getattr(settings, 'JWT_CLAIMS_CHECK_TTL', 60), state)
+        return state
+
+    def forget(self, user_id):
+        with self._lock:
+            self._states.pop(str(user_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._states.clear()
+
+
+user_states = UserStateCache()
+
+
+class ClaimsUser(TokenUser):
+    """request.user backed by token claims: pk, role, is_staff and approval_status, no database row."""
+
+    @cached_property
+    def id(self):
+        # simplejwt stores the id as a string
+        return User._meta.pk.to_python(self.token[api_settings.USER_ID_CLAIM])
+
+    @cached_property
+    def role(self):
+        return self.token.get('role')
+
+    @cached_property
+    def approval_status(self):
+        return self.token.get('approval_status')
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that returns a ClaimsUser instead of fetching the User on every request.
+
+    Only for views that read nothing but pk and the CLAIMS from request.user;
+    tokens issued without the claims fall back to the User lookup.
+    """
+
+    def get_user(self, validated_token):
+        if any(claim not in validated_token for claim in (api_settings.USER_ID_CLAIM, *CLAIMS)):
+            return super().get_user(validated_token)
+
+        state = user_states.get(validated_token[api_settings.USER_ID_CLAIM])
+        if state is None:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+        is_active, *claims = state
+        if not is_active:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+        if dict(zip(CLAIMS, claims)) != {claim: validated_token[claim] for claim in CLAIMS}:
+            raise AuthenticationFailed('Token claims are out of date, refresh the token.', code='claims_changed')
+        return ClaimsUser(validated_token)
+
+
+# For views that only read pk and the CLAIMS from request.user
+CLAIMS_AUTHENTICATION_CLASSES = [ClaimsJWTAuthentication, SessionAuthentication, BasicAuthentication]
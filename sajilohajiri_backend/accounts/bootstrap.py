@@ -0,0 +1,73 @@
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from academics.models import Class, Subject, ClassSubject, StudentClassEnrollment
+from academics.serializers import ClassSerializer, SubjectSerializer, ClassSubjectSerializer, StudentClassEnrollmentSerializer
+from .models import User
+from .serializers import UserSerializer
+
+# Everything the admin panel shows on first load, in one response:
+# the size of each collection and its first page, in the same shapes as the
+# list endpoints. Built with six queries: one for every count, one for the
+# three overlapping user pages, and one per academics collection.
+
+ACADEMICS = [
+    ('classes', Class.objects.all(), ClassSerializer),
+    ('subjects', Subject.objects.all(), SubjectSerializer),
+    ('enrollments', StudentClassEnrollment.objects.all(), StudentClassEnrollmentSerializer),
+    ('class_subjects', ClassSubject.objects.select_related('class_instance', 'subject', 'teacher'), ClassSubjectSerializer),
+]
+
+# (collection, role); None lists every user
+USER_COLLECTIONS = [
+    ('users', None),
+    ('teachers', 'teacher'),
+    ('students', 'student'),
+]
+
+
+def collection_counts():
+    # A single SELECT of scalar subqueries instead of one COUNT round trip per table
+    quote = connection.ops.quote_name
+    user_table = quote(User._meta.db_table)
+    selects, params = [], []
+    for _, role in USER_COLLECTIONS:
+        if role is None:
+            selects.append(f'(SELECT COUNT(*) FROM {user_table})')
+        else:
+            selects.append(f'(SELECT COUNT(*) FROM {user_table} WHERE {quote("role")} = %s)')
+            params.append(role)
+    selects += [f'(SELECT COUNT(*) FROM {quote(queryset.model._meta.db_table)})' for _, queryset, _ in ACADEMICS]
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT ' + ', '.join(selects), params)
+        row = cursor.fetchone()
+    names = [name for name, _ in USER_COLLECTIONS] + [name for name, _, _ in ACADEMICS]
+    return dict(zip(names, row))
+
+
+def user_pages(page_size, context):
+    """First page of users, teachers and students, fetched together and serialized once per user."""
+    first_ids = Q()
+    for _, role in USER_COLLECTIONS:
+        users = User.objects.filter(role=role) if role else User.objects.all()
+        first_ids |= Q(pk__in=users.order_by('pk').values('pk')[:page_size])
+    users = list(User.objects.filter(first_ids).order_by('pk'))
+    serialized = {user.pk: data for user, data in zip(users, UserSerializer(users, many=True, context=context).data)}
+
+    pages = {}
+    for name, role in USER_COLLECTIONS:
+        members = [user for user in users if role is None or user.role == role]
+        pages[name] = [serialized[user.pk] for user in members[:page_size]]
+    return pages
+
+
+def admin_bootstrap(context, page_size=None):
+    page_size = page_size or settings.REST_FRAMEWORK.get('PAGE_SIZE', 100)
+    counts = collection_counts()
+    pages = user_pages(page_size, context)
+    for name, queryset, serializer_class in ACADEMICS:
+        pages[name] = serializer_class(queryset.order_by('pk')[:page_size], many=True, context=context).data
+    return {
+        'page_size': page_size,
+        **{name: {'count': counts[name], 'results': pages[name]} for name in counts},
+    }
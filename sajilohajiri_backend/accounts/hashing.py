@@ -0,0 +1,9 @@
+# Password hashing for bulk imports, run in worker processes.
+#
+# Kept free of model and settings access so spawned workers can import it and
+# unpickle the hasher without django.setup().
+
+
+def hash_passwords(hasher, passwords):
+    """Hash each password with `hasher` (an instance from django.contrib.auth.hashers.get_hasher())."""
+    return [hasher.encode(password, hasher.salt()) for password in passwords]
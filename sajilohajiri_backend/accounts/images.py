@@ -0,0 +1,64 @@
+import io
+import logging
+import os
+from PIL import Image, ImageOps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from face.models import FaceEncoding
+from face.workers import EncoderBusy, locate_face
+
+logger = logging.getLogger(__name__)
+
+# Avatar preprocessing. Phone photos arrive rotated via EXIF and at several
+# megapixels, while face detection time grows with pixel count, so face
+# encoding works from a rotated, downscaled JPEG copy of the avatar.
+
+
+def normalize_image(image_file, max_dimension=None):
+    """Return JPEG bytes of image_file, EXIF-rotated and fit within max_dimension."""
+    max_dimension = max_dimension or getattr(settings, 'AVATAR_MAX_DIMENSION', 800)
+    image_file.seek(0)
+    with Image.open(image_file) as image:
+        # JPEG draft mode lets the decoder skip most of the downscaling work
+        image.draft('RGB', (max_dimension, max_dimension))
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+        output = io.BytesIO()
+        image.save(output, format='JPEG', quality=90)
+    return output.getvalue()
+
+
+def preprocess_avatar(user):
+    """Store user's normalized avatar and the box of the face found in it.
+
+    Called whenever the avatar is set or replaced; a student's existing face
+    encoding is deleted with the old avatar.
+    """
+    if user.avatar_normalized:
+        user.avatar_normalized.delete(save=False)
+    user.face_box = None
+
+    if user.avatar:
+        try:
+            data = normalize_image(user.avatar)
+        except (OSError, ValueError):
+            logger.warning('Could not normalize avatar for %s', user.email)
+        else:
+            name = os.path.splitext(os.path.basename(user.avatar.name))[0] + '.jpg'
+            user.avatar_normalized.save(name, ContentFile(data), save=False)
+            if user.role == 'student':
+                try:
+                    face_box = locate_face(data)
+                    user.face_box = [int(value) for value in face_box] if face_box else None
+                except EncoderBusy:
+                    # Not fatal; enrollment will run detection itself
+                    logger.info('Face pool busy, skipping face detection for %s', user.email)
+                except Exception:
+                    # Nor is a failing pool; the user row is already saved
+                    logger.exception('Face detection failed for %s', user.email)
+
+    user.save(update_fields=['avatar_normalized', 'face_box'])
+    if user.role == 'student':
+        # An encoding of the previous avatar would keep matching the old face;
+        # the student is encoded again from the new one on approval
+        FaceEncoding.objects.filter(student=user).delete()
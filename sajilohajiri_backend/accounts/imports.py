@@ -0,0 +1,186 @@
+import csv
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from django.conf import settings
+from django.contrib.auth.base_user import BaseUserManager
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from academics.models import Class, StudentClassEnrollment
+from attendance.roster import rosters
+from . import hashing
+from .models import User
+from .serializers import StudentImportRowSerializer
+
+# Bulk student import for semester onboarding.
+#
+# Rows are validated in memory, the unique email and roll_number constraints
+# are checked with one query per batch, passwords are hashed on a process
+# pool (PBKDF2 costs a few hundred milliseconds each), and users and their
+# class enrollments are written with bulk_create, one transaction per batch.
+# The result is a per-row report; rows are numbered from 1, header excluded.
+
+BATCH_SIZE = 500
+HASH_CHUNK_SIZE = 25
+
+
+def read_csv(file):
+    """Rows of an uploaded CSV as dicts, with blank cells left out."""
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    rows = []
+    for row in csv.DictReader(text):
+        rows.append({
+            key.strip(): value.strip()
+            for key, value in row.items()
+            if key and isinstance(value, str) and value.strip()
+        })
+    return rows
+
+
+def hash_passwords(passwords):
+    """Hash passwords on a pool of IMPORT_HASH_WORKERS processes (0 hashes inline)."""
+    hasher = get_hasher()
+    workers = getattr(settings, 'IMPORT_HASH_WORKERS', os.cpu_count() or 1)
+    chunks = [passwords[start:start + HASH_CHUNK_SIZE] for start in range(0, len(passwords), HASH_CHUNK_SIZE)]
+    if workers == 0 or len(chunks) <= 1:
+        return hashing.hash_passwords(hasher, passwords)
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), mp_context=multiprocessing.get_context('spawn')) as pool:
+        return [encoded for chunk in pool.map(hashing.hash_passwords, repeat(hasher), chunks) for encoded in chunk]
+
+
+class StudentImport:
+
+    def __init__(self, rows, class_id=None, batch_size=BATCH_SIZE):
+        self.rows = rows
+        self.class_id = class_id
+        self.batch_size = batch_size
+        self.errors = {}  # {row number: {field: [messages]}}
+        self.created = []
+
+    def fail(self, number, field, message):
+        self.errors.setdefault(number, {}).setdefault(field, []).append(message)
+
+    def validate(self):
+        """[(row number, validated data)] of rows that pass field validation and are unique within the file."""
+        valid = []
+        emails, roll_numbers = {}, {}
+        for number, row in enumerate(self.rows, start=1):
+            serializer = StudentImportRowSerializer(data=row)
+            if not serializer.is_valid():
+                self.errors[number] = serializer.errors
+                continue
+            data = serializer.validated_data
+            data['email'] = BaseUserManager.normalize_email(data['email'])
+            if data.get('class_id') is None:
+                data['class_id'] = self.class_id
+            duplicate = False
+            for field, seen in (('email', emails), ('roll_number', roll_numbers)):
+                if data[field] in seen:
+                    self.fail(number, field, f'Duplicate of row {seen[data[field]]}.')
+                    duplicate = True
+                else:
+                    seen[data[field]] = number
+            if not duplicate:
+                valid.append((number, data))
+        return valid
+
+    def check_classes(self, rows):
+        class_ids = {data['class_id'] for _, data in rows if data['class_id'] is not None}
+        existing = set(Class.objects.filter(pk__in=class_ids).values_list('pk', flat=True))
+        valid = []
+        for number, data in rows:
+            if data['class_id'] is not None and data['class_id'] not in existing:
+                self.fail(number, 'class_id', f'Class {data["class_id"]} does not exist.')
+            else:
+                valid.append((number, data))
+        return valid
+
+    def check_existing(self, batch):
+        """Drop rows whose email or roll number is already taken; one query per batch."""
+        emails = [data['email'] for _, data in batch]
+        roll_numbers = [data['roll_number'] for _, data in batch]
+        taken = User.objects.filter(Q(email__in=emails) | Q(roll_number__in=roll_numbers)).values_list('email', 'roll_number')
+        taken_emails, taken_roll_numbers = set(), set()
+        for email, roll_number in taken:
+            taken_emails.add(email)
+            taken_roll_numbers.add(roll_number)
+        valid = []
+        for number, data in batch:
+            ok = True
+            if data['email'] in taken_emails:
+                self.fail(number, 'email', 'A user with this email already exists.')
+                ok = False
+            if data['roll_number'] in taken_roll_numbers:
+                self.fail(number, 'roll_number', 'A user with this roll number already exists.')
+                ok = False
+            if ok:
+                valid.append((number, data))
+        return valid
+
+    def batches(self, items):
+        for start in range(0, len(items), self.batch_size):
+            yield items[start:start + self.batch_size]
+
+    def save(self, batch, passwords):
+        users = [
+            User(
+                email=data['email'],
+                name=data['name'],
+                password=password,
+                role='student',
+                roll_number=data['roll_number'],
+                semester=data.get('semester') or None,
+                section=data.get('section') or None,
+                department=data.get('department') or None,
+            )
+            for (_, data), password in zip(batch, passwords)
+        ]
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create(users)
+                enrollments = [
+                    StudentClassEnrollment(student=user, enrolled_class_id=data['class_id'])
+                    for (_, data), user in zip(batch, users) if data['class_id'] is not None
+                ]
+                StudentClassEnrollment.objects.bulk_create(enrollments)
+        except IntegrityError:
+            # Someone else took an email or roll number since check_existing
+            for number, _ in batch:
+                self.fail(number, 'non_field_errors', 'Conflicts with a user created during the import; retry this row.')
+            return
+        self.created += [(number, user) for (number, _), user in zip(batch, users)]
+        # bulk_create sends no post_save, so drop the affected rosters directly
+        for class_id in {enrollment.enrolled_class_id for enrollment in enrollments}:
+            transaction.on_commit(lambda class_id=class_id: rosters.drop_class(class_id))
+
+    def run(self, dry_run=False):
+        rows = self.check_classes(self.validate())
+        rows = [row for batch in self.batches(rows) for row in self.check_existing(batch)]
+        if not dry_run:
+            with_password = [data['password'] for _, data in rows if data.get('password')]
+            hashed = iter(hash_passwords(with_password))
+            passwords = [next(hashed) if data.get('password') else make_password(None) for _, data in rows]
+            for batch, batch_passwords in zip(self.batches(rows), self.batches(passwords)):
+                self.save(batch, batch_passwords)
+        return self.report(rows, dry_run)
+
+    def report(self, rows, dry_run):
+        report = {
+            'total': len(self.rows),
+            'created': len(self.created),
+            'failed': len(self.errors),
+            'errors': [{'row': number, 'errors': errors} for number, errors in sorted(self.errors.items())],
+        }
+        if dry_run:
+            report['valid'] = len(rows)
+        else:
+            report['students'] = [{'row': number, 'id': user.pk, 'email': user.email} for number, user in self.created]
+        return report
+
+
+def import_students(rows, class_id=None, dry_run=False, batch_size=BATCH_SIZE):
+    """Create students from row dicts; returns the import report."""
+    return StudentImport(rows, class_id, batch_size).run(dry_run)
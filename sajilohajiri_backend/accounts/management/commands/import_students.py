@@ -0,0 +1,36 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from accounts.imports import BATCH_SIZE, import_students, read_csv
+
+
+class Command(BaseCommand):
+    help = 'Create students from a CSV (email, name, password, roll_number, semester, section, department, class_id).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file with a header row')
+        parser.add_argument('--class-id', type=int, help='Class to enroll rows without their own class_id in')
+        parser.add_argument('--dry-run', action='store_true', help='Validate and check for conflicts without creating anything')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--report', help='Write the full JSON report to this file')
+        parser.add_argument('--show', type=int, default=20, help='Row errors to print')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], 'rb') as file:
+                rows = read_csv(file)
+        except OSError as exc:
+            raise CommandError(str(exc))
+
+        report = import_students(rows, class_id=options['class_id'], dry_run=options['dry_run'], batch_size=options['batch_size'])
+        if options['report']:
+            with open(options['report'], 'w') as output:
+                json.dump(report, output, indent=2)
+
+        for error in report['errors'][:options['show']]:
+            messages = '; '.join(f'{field}: {" ".join(map(str, problems))}' for field, problems in error['errors'].items())
+            self.stdout.write(f'row {error["row"]}: {messages}')
+        if options['dry_run']:
+            summary = f'{report["valid"]} of {report["total"]} rows can be imported, {report["failed"]} have errors.'
+        else:
+            summary = f'Created {report["created"]} of {report["total"]} students, {report["failed"]} rows failed.'
+        self.stdout.write(self.style.SUCCESS(summary) if not report['failed'] else self.style.WARNING(summary))
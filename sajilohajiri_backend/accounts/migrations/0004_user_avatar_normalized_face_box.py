@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_alter_user_options_alter_user_roll_number_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='avatar_normalized',
+            field=models.ImageField(blank=True, null=True, upload_to='avatars/normalized/'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='face_box',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -54,6 +54,8 @@ class User(AbstractUser):
     email = models.EmailField(unique=True)
     role = models.CharField(max_length=10, choices=ROLE_CHOICES)
     avatar = models.ImageField(upload_to='avatars/', blank=True, null=True)
+    avatar_normalized = models.ImageField(upload_to='avatars/normalized/', blank=True, null=True)  # rotated/downscaled copy used for face encoding
+    face_box = models.JSONField(blank=True, null=True)  # [top, right, bottom, left] of the face in avatar_normalized
     name = models.CharField(max_length=150, blank=True, null=True)
     roll_number = models.CharField(max_length=10, null=True, blank=True, db_index=True)
     semester = models.CharField(max_length=20, blank=True, null=True)
@@ -1,18 +1,71 @@
 from rest_framework import serializers
 from .models import User
 from django.core.validators import RegexValidator
+from django.core.files.storage import FileSystemStorage
+from django.db import models
+from django.utils.encoding import filepath_to_uri
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from .authentication import user_claims
+
+password_validator = RegexValidator(
+    regex=r'^(?=.*[a-z])(?=.*[A-Z])(?=.*\d)(?=.*[!@#$%^&*-])[A-Za-z\d!@#$%^&*-]{8,32}$',
+    message='The password must be 8-32 characters, include at least one lowercase, one uppercase, one digit, and one special character. (Allowed special characters: !@#$%%^&*-).'
+)
+
+# Fields of the compact listing (?view=compact): no feedback, no avatar upload field
+COMPACT_FIELDS = ['id', 'email', 'name', 'avatar_url', 'role', 'roll_number', 'semester', 'section', 'department', 'approval_status']
+
+
+def requested_fields(query_params):
+    """Field names asked for with ?fields=a,b or ?view=compact; None for the full representation."""
+    if query_params.get('fields'):
+        return [name.strip() for name in query_params['fields'].split(',') if name.strip()]
+    if query_params.get('view') == 'compact':
+        return COMPACT_FIELDS
+    return None
+
+
+def file_url(file, context):
+    """Absolute URL of a stored file.
+
+    For local storage the URL is the request's media prefix, built once and
+    kept in the serializer context for every row of a listing, joined with
+    the file name. Other storages go through storage.url per file.
+    """
+    if not file:
+        return None
+    request = context.get('request', None)
+    if isinstance(file.storage, FileSystemStorage):
+        if 'media_prefix' not in context:
+            base_url = file.storage.base_url
+            context['media_prefix'] = request.build_absolute_uri(base_url) if request is not None else base_url
+        return context['media_prefix'] + filepath_to_uri(file.name).lstrip('/')
+    try:
+        url = file.url
+    except Exception:
+        return None
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+class MediaImageField(serializers.ImageField):
+    def to_representation(self, value):
+        return file_url(value, self.context)
+
 
 # serializers go down here
 class UserSerializer(serializers.ModelSerializer):
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        models.ImageField: MediaImageField,
+    }
     avatar_url = serializers.SerializerMethodField()
     password = serializers.CharField(
         write_only=True,
         required=True,
         style={'input_type': 'password', 'placeholder': 'Password'},
-        validators=[RegexValidator(
-            regex=r'^(?=.*[a-z])(?=.*[A-Z])(?=.*\d)(?=.*[!@#$%^&*-])[A-Za-z\d!@#$%^&*-]{8,32}$',
-                message='The password must be 8-32 characters, include at least one lowercase, one uppercase, one digit, and one special character. (Allowed special characters: !@#$%%^&*-).'
-        )]
+        validators=[password_validator]
     )
 
     class Meta:
@@ -33,6 +86,17 @@ class UserSerializer(serializers.ModelSerializer):
             'feedback',
         ]
 
+    def __init__(self, *args, fields=None, **kwargs):
+        # fields: names to keep in the output, e.g. from requested_fields()
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            readable = {name for name, field in self.fields.items() if not field.write_only}
+            unknown = [name for name in fields if name not in readable]
+            if unknown:
+                raise serializers.ValidationError({'fields': f"Unknown fields: {', '.join(unknown)}."})
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
     def create(self, validated_data):
         password = validated_data.pop('password', None)
         instance = self.Meta.model(**validated_data)
@@ -42,13 +106,59 @@ class UserSerializer(serializers.ModelSerializer):
         return instance
 
     def get_avatar_url(self, obj):
-        request = self.context.get('request', None)
-        url = obj.avatar_url
-        if url and request is not None:
-            return request.build_absolute_uri(url)
-        return url
+        return file_url(obj.avatar, self.context)
     
     def validate_roll_number(self, value):
         if value == '':
             return None
-        return value
\ No newline at end of file
+        return value
+
+
+class StudentImportRowSerializer(serializers.Serializer):
+    # One row of a bulk student import (see accounts.imports)
+    email = serializers.EmailField(max_length=254)
+    name = serializers.CharField(max_length=150)
+    # Blank leaves the account without a usable password
+    password = serializers.CharField(required=False, allow_blank=True, validators=[password_validator])
+    roll_number = serializers.CharField(max_length=10)
+    semester = serializers.CharField(max_length=20, required=False, allow_blank=True)
+    section = serializers.CharField(max_length=20, required=False, allow_blank=True)
+    department = serializers.CharField(max_length=50, required=False, allow_blank=True)
+    class_id = serializers.IntegerField(required=False, allow_null=True)
+
+
+class StudentImportSerializer(serializers.Serializer):
+    file = serializers.FileField(required=False, help_text='CSV with a header row of StudentImportRowSerializer fields')
+    students = serializers.ListField(child=serializers.DictField(), required=False, allow_empty=False)
+    class_id = serializers.IntegerField(required=False, help_text='Class to enroll rows without their own class_id in')
+    dry_run = serializers.BooleanField(default=False)
+
+    def validate(self, attrs):
+        if ('file' in attrs) == ('students' in attrs):
+            raise serializers.ValidationError('Provide either a CSV file or a students list.')
+        return attrs
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    # Claims read by accounts.authentication.ClaimsJWTAuthentication
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        for claim, value in user_claims(user).items():
+            token[claim] = value
+        return token
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        # The refresh token holds the claims from sign in; give the new access token the current ones
+        user_id = self.token_class(attrs['refresh']).get(api_settings.USER_ID_CLAIM)
+        user = User.objects.filter(pk=user_id).first()
+        if user is not None:
+            access = AccessToken(data['access'])
+            for claim, value in user_claims(user).items():
+                access[claim] = value
+            data['access'] = str(access)
+        return data
@@ -0,0 +1,14 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .authentication import user_states
+from .models import User
+
+
+# Re-check claims of a changed user on their next request (see accounts.authentication)
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    user_id = instance.pk
+    user_states.forget(user_id)
+    transaction.on_commit(lambda: user_states.forget(user_id))
@@ -1,3 +1,467 @@
-from django.test import TestCase
+import io
+import json
+import logging
+import shutil
+import tempfile
+from concurrent.futures.process import BrokenProcessPool
+from unittest import mock
+from PIL import Image
+from django.contrib.auth.hashers import check_password
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from sajilohajiri_backend.instrumentation import BUCKETS_MS, ViewStats, metrics
+from academics.models import Class, Subject, ClassSubject, StudentClassEnrollment
+from face.models import FaceEncoding
+from .authentication import user_states
+from .bootstrap import admin_bootstrap, collection_counts
+from .imports import hash_passwords, import_students
+from .models import User
+from .serializers import COMPACT_FIELDS
 
 # Create your tests here.
+class UserListTests(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create(email='admin@example.com', role='admin', name='Admin')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        for n in range(3):
+            User.objects.create(email=f'student{n}@example.com', role='student', name=f'Student {2 - n}', roll_number=f'R{2 - n}')
+
+    def test_pages_follow_id(self):
+        response = self.client.get('/accounts/api/users/?page_size=2')
+        self.assertEqual(response.status_code, 200)
+        ids = [user['id'] for user in response.json()['results']]
+        response = self.client.get(response.json()['next'])
+        ids += [user['id'] for user in response.json()['results']]
+        self.assertEqual(ids, sorted(User.objects.values_list('id', flat=True)))
+
+    def test_fields_limits_the_output(self):
+        response = self.client.get('/accounts/api/users/?fields=id,name')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({tuple(user) for user in response.json()['results']}, {('id', 'name')})
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get('/accounts/api/users/?fields=id,nmae,password')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'fields': 'Unknown fields: nmae, password.'})
+
+    def test_compact_view(self):
+        response = self.client.get('/accounts/api/users/?view=compact')
+        self.assertEqual(response.status_code, 200)
+        for user in response.json()['results']:
+            self.assertEqual(list(user), COMPACT_FIELDS)
+
+        # An explicit field list wins over the view
+        response = self.client.get('/accounts/api/users/?view=compact&fields=email')
+        self.assertEqual({tuple(user) for user in response.json()['results']}, {('email',)})
+
+    def test_ordering_is_rejected(self):
+        response = self.client.get('/accounts/api/users/?ordering=name')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ordering', response.json())
+
+
+class ClaimsAuthenticationTests(TestCase):
+    """Tokens from /api/token/ authenticate claims views without loading the User, but still honour revocation."""
+
+    url = '/api/attendance/session/open/?class_subject_id=0'
+
+    def setUp(self):
+        user_states.clear()
+        self.teacher = User.objects.create(email='teacher@example.com', role='teacher', name='Teacher', approval_status='approved')
+        self.teacher.set_password('Secret-pass1')
+        self.teacher.save()
+        self.client = APIClient()
+
+    def obtain(self):
+        response = self.client.post('/api/token/', {'email': 'teacher@example.com', 'password': 'Secret-pass1'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def get(self, access):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, HTTP_AUTHORIZATION=f'Bearer {access}')
+        return response, len(queries)
+
+    def assertRejected(self, access, code):
+        response, _ = self.get(access)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data['detail'].code, code)
+
+    def test_claims_replace_the_user_lookup(self):
+        access = self.obtain()['access']
+        self.assertEqual(AccessToken(access)['role'], 'teacher')
+        response, first = self.get(access)
+        self.assertEqual(response.status_code, 200)
+        # Later requests trust the cached user state: only the view's own query runs
+        response, later = self.get(access)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(later, first - 1)
+        self.assertEqual(later, 1)
+
+    def test_deactivated_user_is_rejected(self):
+        access = self.obtain()['access']
+        self.get(access)
+        self.teacher.is_active = False
+        self.teacher.save()
+        self.assertRejected(access, 'user_inactive')
+
+    def test_deleted_user_is_rejected(self):
+        access = self.obtain()['access']
+        self.get(access)
+        self.teacher.delete()
+        self.assertRejected(access, 'user_not_found')
+
+    def test_changed_claims_are_rejected(self):
+        access = self.obtain()['access']
+        self.get(access)
+        self.teacher.approval_status = 'unapproved'
+        self.teacher.save()
+        self.assertRejected(access, 'claims_changed')
+
+    def test_token_without_claims_falls_back_to_the_user(self):
+        access = str(AccessToken.for_user(self.teacher))
+        self.assertNotIn('role', AccessToken(access))
+        response, _ = self.get(access)
+        self.assertEqual(response.status_code, 200)
+        self.teacher.is_active = False
+        self.teacher.save()
+        response, _ = self.get(access)
+        self.assertEqual(response.status_code, 401)
+
+    def test_refresh_embeds_current_claims(self):
+        tokens = self.obtain()
+        self.teacher.approval_status = 'unapproved'
+        self.teacher.save()
+        self.assertRejected(tokens['access'], 'claims_changed')
+
+        response = self.client.post('/api/token/refresh/', {'refresh': tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, 200)
+        access = response.json()['access']
+        self.assertEqual(AccessToken(access)['approval_status'], 'unapproved')
+        self.assertEqual(self.get(access)[0].status_code, 200)
+
+
+def avatar_upload(name='avatar.png'):
+    output = io.BytesIO()
+    Image.new('RGB', (40, 40), (120, 80, 60)).save(output, format='PNG')
+    return SimpleUploadedFile(name, output.getvalue(), content_type='image/png')
+
+
+class AvatarTests(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        self.client = APIClient()
+
+    def register(self):
+        return self.client.post('/accounts/api/users/', {
+            'email': 'student@example.com', 'password': 'Secret-pass1', 'name': 'Student',
+            'role': 'student', 'roll_number': '1', 'avatar': avatar_upload(),
+        }, format='multipart')
+
+    def test_registration_survives_a_broken_face_pool(self):
+        with mock.patch('accounts.images.locate_face', side_effect=BrokenProcessPool('worker died')):
+            with self.assertLogs('accounts.images', 'ERROR'):
+                response = self.register()
+        self.assertEqual(response.status_code, 201)
+        student = User.objects.get(email='student@example.com')
+        self.assertTrue(student.avatar_normalized)
+        self.assertIsNone(student.face_box)
+
+    def test_new_avatar_drops_the_old_face_encoding(self):
+        with mock.patch('accounts.images.locate_face', return_value=(1, 30, 30, 1)):
+            self.register()
+            student = User.objects.get(email='student@example.com')
+            self.assertEqual(student.face_box, [1, 30, 30, 1])
+            face_encoding = FaceEncoding(student=student)
+            face_encoding.set_vector([0.0] * 128)
+            face_encoding.save()
+
+            response = self.client.patch(f'/accounts/api/users/{student.pk}/', {'name': 'Renamed'}, format='multipart')
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(FaceEncoding.objects.filter(student=student).exists())
+
+            response = self.client.patch(f'/accounts/api/users/{student.pk}/', {'avatar': avatar_upload('new.png')}, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(FaceEncoding.objects.filter(student=student).exists())
+
+
+class AdminBootstrapTests(TestCase):
+    url = '/api/admin/bootstrap/'
+
+    def setUp(self):
+        self.admin = User.objects.create(email='admin@example.com', role='admin', name='Admin')
+        teacher = User.objects.create(email='teacher@example.com', role='teacher', name='Teacher')
+        school_class = Class.objects.create(name='Class', year=1, semester=1, department='Computer')
+        subject = Subject.objects.create(name='Subject', code='S1')
+        ClassSubject.objects.create(class_instance=school_class, subject=subject, teacher=teacher)
+        for n in range(3):
+            student = User.objects.create(email=f'student{n}@example.com', role='student', name=f'Student {n}', roll_number=str(n))
+            StudentClassEnrollment.objects.create(student=student, enrolled_class=school_class)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_counts_in_one_query(self):
+        with self.assertNumQueries(1):
+            counts = collection_counts()
+        self.assertEqual(counts, {
+            'users': 5, 'teachers': 1, 'students': 3,
+            'classes': 1, 'subjects': 1, 'enrollments': 3, 'class_subjects': 1,
+        })
+
+    def test_bootstrap_queries_do_not_grow_with_rows(self):
+        with self.assertNumQueries(6):
+            data = admin_bootstrap({}, page_size=2)
+        self.assertEqual(data['page_size'], 2)
+        self.assertEqual(data['users']['count'], 5)
+        self.assertEqual([user['email'] for user in data['users']['results']], ['admin@example.com', 'teacher@example.com'])
+        self.assertEqual([user['email'] for user in data['students']['results']], ['student0@example.com', 'student1@example.com'])
+        self.assertEqual(len(data['enrollments']['results']), 2)
+        self.assertEqual(data['class_subjects']['results'][0]['teacher'], str(User.objects.get(role='teacher')))
+
+        for n in range(3, 10):
+            User.objects.create(email=f'student{n}@example.com', role='student', name=f'Student {n}', roll_number=str(n))
+        with self.assertNumQueries(6):
+            admin_bootstrap({}, page_size=2)
+
+    def test_unchanged_data_is_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=f'W/{etag}').status_code, 304)
+
+        Subject.objects.create(name='Another', code='S2')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['subjects']['count'], 2)
+
+    def test_admins_only(self):
+        self.client.force_authenticate(User.objects.filter(role='student').first())
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class InlinePool:
+    """Stands in for the ProcessPoolExecutor of accounts.imports.hash_passwords, running chunks in this process."""
+
+    instances = []
+
+    def __init__(self, max_workers, mp_context=None):
+        self.max_workers = max_workers
+        self.chunks = []
+        self.instances.append(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def map(self, fn, hashers, chunks):
+        for hasher, chunk in zip(hashers, chunks):
+            self.chunks.append(chunk)
+            yield fn(hasher, chunk)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], IMPORT_HASH_WORKERS=2)
+class StudentImportTests(TestCase):
+
+    def setUp(self):
+        InlinePool.instances = []
+        self.enterContext(mock.patch('accounts.imports.ProcessPoolExecutor', InlinePool))
+        self.enterContext(mock.patch('accounts.imports.HASH_CHUNK_SIZE', 2))
+        self.school_class = Class.objects.create(name='Class', year=1, semester=1, department='Computer')
+        self.other_class = Class.objects.create(name='Other', year=1, semester=1, department='Computer')
+        User.objects.create(email='taken@example.com', role='student', name='Taken', roll_number='T1')
+
+    def row(self, n, **fields):
+        return {'email': f'student{n}@Example.com', 'name': f'Student {n}', 'password': f'Secret-pass{n}', 'roll_number': f'R{n}', **fields}
+
+    def test_hash_passwords_on_the_pool(self):
+        passwords = [f'Secret-pass{n}' for n in range(5)]
+        encoded = hash_passwords(passwords)
+        pool, = InlinePool.instances
+        self.assertEqual(pool.max_workers, 2)
+        self.assertEqual(pool.chunks, [passwords[0:2], passwords[2:4], passwords[4:]])
+        self.assertTrue(all(check_password(password, hashed) for password, hashed in zip(passwords, encoded)))
+
+    def test_import_creates_students_and_enrollments(self):
+        rows = [self.row(n) for n in range(4)] + [self.row(4, password='', class_id=self.other_class.pk)]
+        with self.captureOnCommitCallbacks(execute=True):
+            report = import_students(rows, class_id=self.school_class.pk, batch_size=2)
+        self.assertEqual((report['total'], report['created'], report['failed'], report['errors']), (5, 5, 0, []))
+        self.assertEqual([student['row'] for student in report['students']], [1, 2, 3, 4, 5])
+
+        student = User.objects.get(email='student0@example.com')
+        self.assertEqual((student.role, student.roll_number), ('student', 'R0'))
+        self.assertTrue(student.check_password('Secret-pass0'))
+        self.assertFalse(User.objects.get(roll_number='R4').has_usable_password())
+        self.assertEqual(StudentClassEnrollment.objects.filter(enrolled_class=self.school_class).count(), 4)
+        self.assertEqual(list(StudentClassEnrollment.objects.filter(enrolled_class=self.other_class).values_list('student__roll_number', flat=True)), ['R4'])
+        # Blank passwords are not sent to the pool
+        self.assertEqual(sum(len(chunk) for pool in InlinePool.instances for chunk in pool.chunks), 4)
+
+    def test_row_errors(self):
+        rows = [
+            self.row(0),
+            self.row(1, email='not-an-email'),
+            {'email': 'student2@example.com', 'roll_number': 'R2'},
+            self.row(3, email='student0@EXAMPLE.COM'),
+            self.row(4, roll_number='R0'),
+            self.row(5, email='taken@example.com'),
+            self.row(6, roll_number='T1'),
+            self.row(7, class_id=0),
+            self.row(8, password='weak'),
+            self.row(9),
+        ]
+        report = import_students(rows)
+        self.assertEqual((report['total'], report['created'], report['failed']), (10, 2, 8))
+        errors = {error['row']: error['errors'] for error in report['errors']}
+        self.assertEqual(set(errors[2]), {'email'})
+        self.assertEqual(set(errors[3]), {'name'})
+        self.assertEqual(errors[4], {'email': ['Duplicate of row 1.']})
+        self.assertEqual(errors[5], {'roll_number': ['Duplicate of row 1.']})
+        self.assertEqual(errors[6], {'email': ['A user with this email already exists.']})
+        self.assertEqual(errors[7], {'roll_number': ['A user with this roll number already exists.']})
+        self.assertEqual(errors[8], {'class_id': ['Class 0 does not exist.']})
+        self.assertEqual(set(errors[9]), {'password'})
+        self.assertEqual(sorted(User.objects.filter(roll_number__in=['R0', 'R9']).values_list('email', flat=True)), ['student0@example.com', 'student9@example.com'])
+
+    def test_dry_run_creates_nothing(self):
+        report = import_students([self.row(0), self.row(1, email='taken@example.com')], class_id=self.school_class.pk, dry_run=True)
+        self.assertEqual((report['valid'], report['created'], report['failed']), (1, 0, 1))
+        self.assertNotIn('students', report)
+        self.assertEqual(InlinePool.instances, [])
+        self.assertFalse(User.objects.filter(roll_number='R0').exists())
+        self.assertFalse(StudentClassEnrollment.objects.exists())
+
+    def write_csv(self, text):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        path = f'{directory}/students.csv'
+        with open(path, 'w', encoding='utf-8-sig') as output:
+            output.write(text)
+        return path
+
+    def test_command(self):
+        path = self.write_csv(
+            'email,name,password,roll_number,class_id\n'
+            'a@example.com, A ,Secret-pass1,A1,\n'
+            'b@example.com,B,,B1,%d\n'
+            'taken@example.com,C,Secret-pass3,C1,\n' % self.other_class.pk
+        )
+        stdout = io.StringIO()
+        call_command('import_students', path, '--class-id', str(self.school_class.pk), '--dry-run', stdout=stdout)
+        self.assertIn('2 of 3 rows can be imported, 1 have errors.', stdout.getvalue())
+        self.assertIn('row 3: email: A user with this email already exists.', stdout.getvalue())
+        self.assertFalse(User.objects.filter(email='a@example.com').exists())
+
+        report_path = path.replace('.csv', '.json')
+        stdout = io.StringIO()
+        call_command('import_students', path, '--class-id', str(self.school_class.pk), '--report', report_path, stdout=stdout)
+        self.assertIn('Created 2 of 3 students, 1 rows failed.', stdout.getvalue())
+        self.assertEqual(User.objects.get(email='a@example.com').name, 'A')
+        self.assertEqual(
+            dict(StudentClassEnrollment.objects.values_list('student__roll_number', 'enrolled_class_id')),
+            {'A1': self.school_class.pk, 'B1': self.other_class.pk},
+        )
+        with open(report_path) as report_file:
+            self.assertEqual(json.load(report_file)['created'], 2)
+
+    def test_missing_file(self):
+        with self.assertRaises(CommandError):
+            call_command('import_students', '/nonexistent/students.csv')
+
+
+@override_settings(INSTRUMENTATION_ENABLED=True)
+class InstrumentationTests(TestCase):
+    url = '/accounts/api/users/'
+
+    def setUp(self):
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+        # Keep the per-request log lines out of the test output
+        self.enterContext(mock.patch.object(logging.getLogger('sajilohajiri_backend.instrumentation'), 'handlers', []))
+        self.admin = User.objects.create(email='admin@example.com', role='admin', name='Admin')
+        # A new client so its handler loads the middleware with the setting on
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def server_timing(self, response):
+        return dict(timing.split(';', 1) for timing in response['Server-Timing'].split(', '))
+
+    def test_server_timing(self):
+        with CaptureQueriesContext(connection) as queries:
+            with self.assertLogs('sajilohajiri_backend.instrumentation', 'INFO') as logs:
+                response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        timings = self.server_timing(response)
+        self.assertEqual(set(timings), {'total', 'db', 'serialize'})
+        self.assertTrue(timings['db'].endswith(f';desc="{len(queries)} queries"'))
+        logged = json.loads(logs.records[0].getMessage())
+        self.assertEqual((logged['path'], logged['status'], logged['db_queries']), (self.url, 200, len(queries)))
+        self.assertEqual(logged['bytes'], len(response.content))
+
+    def test_metrics_histograms(self):
+        for _ in range(3):
+            self.client.get(self.url)
+        self.client.get(f'{self.url}?ordering=name')
+
+        response = self.client.get('/api/admin/metrics/')
+        self.assertEqual(response.status_code, 200)
+        stats = response.json()['views']
+        self.assertEqual(set(stats), {'GET /accounts/api/users/'})
+        users = stats['GET /accounts/api/users/']
+        self.assertEqual((users['count'], users['errors']), (4, 0))
+        self.assertEqual(sum(users['histogram_ms'].values()), 4)
+        self.assertEqual(list(users['histogram_ms'])[-1], f'>{BUCKETS_MS[-1]}')
+        self.assertGreaterEqual(users['max_db_queries'], 1)
+        self.assertIn('serialize', users['mean_spans_ms'])
+
+        response = self.client.delete('/api/admin/metrics/')
+        self.assertEqual(response.status_code, 204)
+        # The DELETE itself is recorded after the reset
+        self.assertEqual(set(metrics.snapshot()['views']), {'DELETE /api/admin/metrics/'})
+
+    def test_metrics_are_for_admins(self):
+        student = User.objects.create(email='student@example.com', role='student', name='Student')
+        self.client.force_authenticate(student)
+        self.assertEqual(self.client.get('/api/admin/metrics/').status_code, 403)
+        self.assertEqual(self.client.delete('/api/admin/metrics/').status_code, 403)
+
+    def test_percentiles(self):
+        stats = ViewStats()
+        for duration, status in [(3, 200), (7, 200), (7, 200), (40, 500), (20000, 200)]:
+            stats.add({'status': status, 'duration_ms': duration, 'db_queries': 2, 'db_ms': 1.0, 'spans_ms': {'face': 4.0}, 'bytes': 100})
+        summary = stats.as_dict()
+        self.assertEqual((summary['count'], summary['errors']), (5, 1))
+        self.assertEqual((summary['p50_ms'], summary['p95_ms']), (10, None))
+        self.assertEqual(summary['histogram_ms']['<=5'], 1)
+        self.assertEqual(summary['histogram_ms']['<=10'], 2)
+        self.assertEqual(summary['histogram_ms']['<=50'], 1)
+        self.assertEqual(summary['mean_spans_ms'], {'face': 4.0})
+        self.assertEqual(summary['mean_db_queries'], 2)
+
+    @override_settings(INSTRUMENTATION_ENABLED=False)
+    def test_disabled(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.get(self.url)
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(metrics.snapshot()['views'], {})
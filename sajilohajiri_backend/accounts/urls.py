@@ -1,12 +1,16 @@
 from django.urls import path
 from rest_framework.routers import DefaultRouter
-from .views import UserViewSet, FaceEncodingUpdateAPIView
+from .views import UserViewSet, FaceEncodingUpdateAPIView, StudentImportAPIView
+from face.views import BulkFaceEnrollmentAPIView, FaceEnrollmentJobAPIView
 
 router = DefaultRouter()
 
 router.register('users', UserViewSet, basename='user')
 
 urlpatterns = [
+    path('users/import/', StudentImportAPIView.as_view(), name='student_import'),
+    path('face-encoding/bulk/', BulkFaceEnrollmentAPIView.as_view(), name='face_encoding_bulk'),
+    path('face-encoding/jobs/<int:pk>/', FaceEnrollmentJobAPIView.as_view(), name='face_encoding_job'),
     path('face-encoding/<str:pk>/', FaceEncodingUpdateAPIView.as_view(), name='face_encoding')
 ]
 
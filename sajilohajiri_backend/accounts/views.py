@@ -1,7 +1,8 @@
+import logging
 from django.shortcuts import render
 from rest_framework import viewsets
 from .models import User
-from .serializers import UserSerializer
+from .serializers import UserSerializer, StudentImportSerializer, requested_fields
 from django_filters.rest_framework import DjangoFilterBackend
 from .filters import UserFilter
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
@@ -11,8 +12,15 @@ from rest_framework import generics
 from rest_framework.response import Response
 from rest_framework import status
 from face.models import FaceEncoding
-import face_recognition
-import json
+from face.workers import EncoderBusy, encode_image, read_avatar
+from .images import preprocess_avatar
+from sajilohajiri_backend.pagination import KeysetPagination
+from sajilohajiri_backend.etags import conditional_response
+from sajilohajiri_backend.instrumentation import metrics
+from .bootstrap import admin_bootstrap
+from .imports import import_students, read_csv
+
+logger = logging.getLogger(__name__)
 
 # Create your views here.
 class UserViewSet(viewsets.ModelViewSet):
@@ -21,14 +29,38 @@ class UserViewSet(viewsets.ModelViewSet):
     permission_classes = [AllowAny]
     filterset_class = UserFilter
     search_fields = ['name', 'email', 'roll_number']
-    ordering_fields = ['name', 'email', 'roll_number']
-    ordering = ['roll_number']
+    # The user table grows with every intake; page it by id rather than OFFSET
+    pagination_class = KeysetPagination
+
+    def get_fields(self):
+        if self.request.method == 'GET':
+            return requested_fields(self.request.query_params)
+        return None
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = self.get_fields()
+        if fields is not None:
+            # Load only the columns the requested fields read
+            names = {'avatar' if name == 'avatar_url' else name for name in fields}
+            queryset = queryset.only(*[field.name for field in User._meta.concrete_fields if field.name in names])
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self.get_fields())
+        return super().get_serializer(*args, **kwargs)
     
     def perform_create(self, serializer):
         if serializer.validated_data['role'] != 'student':
-           serializer.save(roll_number=None, semester=None, section=None, department=None)
+           instance = serializer.save(roll_number=None, semester=None, section=None, department=None)
         else:
-            serializer.save()
+            instance = serializer.save()
+        preprocess_avatar(instance)
+
+    def perform_update(self, serializer):
+        instance = serializer.save()
+        if 'avatar' in serializer.validated_data:
+            preprocess_avatar(instance)
 
     # def get_permissions(self):
     #     if self.request.method not in ['POST', 'PUT', 'PATCH', 'DELETE']:
@@ -41,7 +73,6 @@ class FaceEncodingUpdateAPIView(generics.UpdateAPIView):
     http_method_names = ['patch']
 
     def update(self, request, *args, **kwargs):
-        print(request.user.role)
         partial = kwargs.pop('partial', True)
         try:
             instance = self.get_object()
@@ -56,30 +87,34 @@ class FaceEncodingUpdateAPIView(generics.UpdateAPIView):
                 return Response({'detail': 'Face encoding not required or already exists'}, status=status.HTTP_400_BAD_REQUEST)
 
             try:
-                # Use context manager for safe file handling
-                with instance.avatar.open(mode='rb') as image_file:
-                    image = face_recognition.load_image_file(image_file)
-                    encodings = face_recognition.face_encodings(image)
+                # Prefers the normalized avatar and its stored face box
+                image_data, face_box = read_avatar(instance)
+                # Encoding runs in the face worker pool, not in this request thread
+                vector = encode_image(image_data, face_box)
                 
-                if encodings:
-                    encoding_data = json.dumps(encodings[0].tolist())
-                    FaceEncoding.objects.create(student=instance, encoding_data=encoding_data)
+                if vector is not None:
+                    face_encoding = FaceEncoding(student=instance)
+                    face_encoding.set_vector(vector)
+                    face_encoding.save()
                     serializer = self.get_serializer(instance, data=request.data, partial=partial)
-                    serializer.is_valid(raise_Exception=True)
+                    serializer.is_valid(raise_exception=True)
                     self.perform_update(serializer)
-                    print(f"Face encoding saved for {instance.email}")
+                    logger.info("Face encoding saved for %s", instance.email)
                     return Response(serializer.data)
                     
                 else:
-                    print(f"No face found for {instance.email}")
+                    logger.warning("No face found for %s", instance.email)
                     return Response({'detail': 'No face found!'}, status=status.HTTP_400_BAD_REQUEST)
                     
             except FileNotFoundError:
-                print(f"Avatar file missing for {instance.email}")
+                logger.warning("Avatar file missing for %s", instance.email)
                 return Response({'detail': 'Avatar file missing!'}, status=status.HTTP_400_BAD_REQUEST)
+
+            except EncoderBusy:
+                raise
             
             except Exception as e:
-                print(f"Error processing face for {instance.email}: {str(e)}")
+                logger.exception("Error processing face for %s", instance.email)
                 return Response({'detail': f"Error processing face for {instance.email}: {str(e)}"}, status=status.HTTP_400_BAD_REQUEST)
         
         else:
@@ -87,4 +122,43 @@ class FaceEncodingUpdateAPIView(generics.UpdateAPIView):
             serializer.is_valid(raise_exception=True)
             self.perform_update(serializer)
             return Response(serializer.data)
-            
\ No newline at end of file
+            
+
+
+class AdminBootstrapAPIView(views.APIView):
+    """Counts and first pages of every admin panel collection in one response."""
+    permission_classes = [IsAuthenticated, AdminRole]
+
+    def get(self, request, *args, **kwargs):
+        return conditional_response(request, admin_bootstrap({'request': request}))
+
+
+class MetricsAPIView(views.APIView):
+    """Per-view request histograms of this process (see sajilohajiri_backend.instrumentation); DELETE starts over."""
+    permission_classes = [IsAuthenticated, AdminRole]
+
+    def get(self, request, *args, **kwargs):
+        return Response(metrics.snapshot())
+
+    def delete(self, request, *args, **kwargs):
+        metrics.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class StudentImportAPIView(views.APIView):
+    """Create students in bulk from a CSV upload or a JSON list, with a per-row error report.
+
+    Runs in the request; for imports of several thousand rows prefer the
+    import_students management command, as password hashing dominates.
+    """
+    permission_classes = [IsAuthenticated, AdminRole]
+
+    def post(self, request, *args, **kwargs):
+        serializer = StudentImportSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        rows = read_csv(data['file']) if 'file' in data else data['students']
+        report = import_students(rows, class_id=data.get('class_id'), dry_run=data['dry_run'])
+        if data['dry_run']:
+            return Response(report)
+        return Response(report, status=status.HTTP_201_CREATED if report['created'] else status.HTTP_400_BAD_REQUEST)
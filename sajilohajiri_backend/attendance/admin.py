@@ -1,6 +1,7 @@
 from django.contrib import admin
-from .models import AttendanceSession, AttendanceRecord
+from .models import AttendanceSession, AttendanceRecord, AttendanceSummary
 
 # Register your models here.
 admin.site.register(AttendanceSession)
-admin.site.register(AttendanceRecord)
\ No newline at end of file
+admin.site.register(AttendanceRecord)
+admin.site.register(AttendanceSummary)
@@ -0,0 +1,215 @@
+import asyncio
+import base64
+import binascii
+import json
+import logging
+import re
+import time
+from urllib.parse import parse_qs
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from rest_framework.exceptions import AuthenticationFailed
+from accounts.authentication import ClaimsJWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from accounts.models import User
+from face import encoding
+from face.workers import EncoderBusy, face_pool, detection_model
+from .models import AttendanceSession
+from .recognition import match_students, mark_attendance
+from .roster import rosters
+
+logger = logging.getLogger(__name__)
+
+# Live recognition over a WebSocket, served by sajilohajiri_backend.asgi.
+#
+#   ws://<host>/ws/attendance/<session_id>/?token=<access token>
+#
+# The client streams frames as binary messages (raw JPEG) or as text
+# {"image": "<base64 or data URL>"}, and switches mode with {"mode": "exit"}.
+# The server answers with {"type": "marked", ...} events as students are
+# marked and {"type": "recognized", "status": ...} for recognized students
+# it did not mark (already marked, exit without entry, not enrolled). Only
+# the newest frame is kept while the encoder is busy, so a slow encoder drops
+# frames instead of building up a backlog.
+
+SESSION_RECHECK_SECONDS = 5
+
+
+class AttendanceStreamConsumer:
+
+    def __init__(self, scope, receive, send, session_id):
+        self.scope = scope
+        self.receive = receive
+        self.send = send
+        self.session_id = int(session_id)
+        self.mode = 'entry'
+        self.latest_frame = None
+        self.frame_ready = asyncio.Event()
+        self.frames_received = 0
+        self.frames_dropped = 0
+        self.announced = set()
+
+    async def __call__(self):
+        message = await self.receive()
+        if message['type'] != 'websocket.connect':
+            return
+
+        self.session = await self.authorize()
+        if self.session is None:
+            return
+        await self.send({'type': 'websocket.accept'})
+        await self.send_json({'type': 'ready', 'session_id': self.session_id, 'mode': self.mode})
+
+        worker = asyncio.create_task(self.process_frames())
+        try:
+            while True:
+                message = await self.receive()
+                if message['type'] == 'websocket.disconnect':
+                    break
+                if message['type'] == 'websocket.receive':
+                    await self.handle_message(message)
+                if worker.done():
+                    break
+        finally:
+            worker.cancel()
+            try:
+                await worker
+            except asyncio.CancelledError:
+                pass
+
+    async def authorize(self):
+        token = parse_qs(self.scope.get('query_string', b'').decode()).get('token', [None])[0]
+        user, session = None, None
+        if token:
+            try:
+                user, session = await sync_to_async(self.load_user_and_session)(token)
+            except (InvalidToken, TokenError, AuthenticationFailed):
+                pass
+        if user is None:
+            await self.send({'type': 'websocket.close', 'code': 4401})
+            return None
+        if session is None:
+            await self.send({'type': 'websocket.close', 'code': 4404})
+            return None
+        if not (user.role == 'admin' or user.is_staff or session.class_subject.teacher_id == user.pk):
+            await self.send({'type': 'websocket.close', 'code': 4403})
+            return None
+        if session.status != 'open':
+            await self.send({'type': 'websocket.close', 'code': 4409})
+            return None
+        return session
+
+    def load_user_and_session(self, token):
+        authentication = ClaimsJWTAuthentication()
+        user = authentication.get_user(authentication.get_validated_token(token))
+        session = AttendanceSession.objects.select_related('class_subject').filter(pk=self.session_id).first()
+        return user, session
+
+    async def handle_message(self, message):
+        frame = message.get('bytes')
+        if frame is None and message.get('text'):
+            try:
+                payload = json.loads(message['text'])
+            except ValueError:
+                await self.send_json({'type': 'error', 'detail': 'Invalid JSON message'})
+                return
+            if payload.get('mode') in ('entry', 'exit'):
+                self.mode = payload['mode']
+                await self.send_json({'type': 'mode', 'mode': self.mode})
+            image = payload.get('image')
+            if image:
+                try:
+                    frame = base64.b64decode(image.partition(',')[2] if image.startswith('data:') else image, validate=True)
+                except (binascii.Error, ValueError):
+                    await self.send_json({'type': 'error', 'detail': 'Invalid base64 image'})
+                    return
+        if frame:
+            self.frames_received += 1
+            if self.latest_frame is not None:
+                self.frames_dropped += 1
+            # Replace, never queue: only the newest frame matters
+            self.latest_frame = (frame, self.mode)
+            self.frame_ready.set()
+
+    async def process_frames(self):
+        max_dimension = getattr(settings, 'RECOGNITION_FRAME_MAX_DIMENSION', 640)
+        checked_at = time.monotonic()
+        while True:
+            await self.frame_ready.wait()
+            self.frame_ready.clear()
+            latest, self.latest_frame = self.latest_frame, None
+            if latest is None:
+                continue
+            frame, mode = latest
+
+            try:
+                future = face_pool.submit(encoding.encode_frames, [frame], detection_model(), max_dimension)
+                encodings, frame_count = await asyncio.wrap_future(future)
+            except EncoderBusy:
+                self.frames_dropped += 1
+                continue
+            except Exception:
+                # A bad frame or a crashed worker costs this frame, not the connection
+                logger.exception('Face encoding failed for session %s', self.session_id)
+                await self.send_json({'type': 'error', 'detail': 'Face recognition failed for this frame'})
+                continue
+            if not len(encodings):
+                continue
+
+            if time.monotonic() - checked_at > SESSION_RECHECK_SECONDS:
+                await sync_to_async(self.session.refresh_from_db)(fields=['status'])
+                checked_at = time.monotonic()
+                if self.session.status != 'open':
+                    rosters.drop(self.session_id)
+                    await self.send_closed()
+                    return
+
+            events = await sync_to_async(self.recognize)(encodings, mode)
+            if events is None:
+                # Closed since the last recheck; mark_attendance turned the marks away
+                await self.send_closed()
+                return
+            for event in events:
+                await self.send_json(event)
+
+    def recognize(self, encodings, mode):
+        matches = match_students(self.session, encodings)
+        results = mark_attendance(self.session, list(matches), mode)
+        if 'session-closed' in results.values():
+            return None
+        # Announce new marks, and existing ones once per connection
+        fresh = {
+            student_id: result for student_id, result in results.items()
+            if result == 'present' or (student_id, mode) not in self.announced
+        }
+        if not fresh:
+            return []
+        self.announced.update((student_id, mode) for student_id in fresh)
+        students = User.objects.filter(pk__in=fresh).values('id', 'name', 'roll_number')
+        return [
+            {
+                # Only new marks wrote a row; the rest say why not (already-marked, no-entry, not-enrolled)
+                'type': 'marked' if fresh[student['id']] == 'present' else 'recognized',
+                'student_id': student['id'],
+                'name': student['name'],
+                'roll_number': student['roll_number'],
+                'mode': mode,
+                'status': fresh[student['id']],
+                'distance': round(matches[student['id']], 4),
+                'frames_received': self.frames_received,
+                'frames_dropped': self.frames_dropped,
+            }
+            for student in students
+        ]
+
+    async def send_closed(self):
+        await self.send_json({'type': 'closed', 'session_id': self.session_id})
+        await self.send({'type': 'websocket.close', 'code': 1000})
+
+    async def send_json(self, data):
+        await self.send({'type': 'websocket.send', 'text': json.dumps(data)})
+
+
+websocket_urlpatterns = [
+    (re.compile(r'^/ws/attendance/(?P<session_id>\d+)/$'), AttendanceStreamConsumer),
+]
@@ -0,0 +1,16 @@
+import django_filters
+from .models import AttendanceRecord
+
+# FilterSet classes below:
+class AttendanceRecordFilter(django_filters.FilterSet):
+    class_subject = django_filters.NumberFilter(field_name='attendance_session__class_subject')
+    enrolled_class = django_filters.NumberFilter(field_name='attendance_session__class_subject__class_instance')
+    from_date = django_filters.DateFilter(field_name='attendance_session__date', lookup_expr='gte')
+    to_date = django_filters.DateFilter(field_name='attendance_session__date', lookup_expr='lte')
+    department = django_filters.CharFilter(field_name='student__department')
+    semester = django_filters.CharFilter(field_name='student__semester')
+    section = django_filters.CharFilter(field_name='student__section')
+
+    class Meta:
+        model = AttendanceRecord
+        fields = ['student', 'entry_status', 'exit_status']
@@ -0,0 +1,91 @@
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection
+from academics.models import ClassSubject, StudentClassEnrollment
+from attendance.models import AttendanceSession, AttendanceRecord
+from attendance.synthetic import generate_attendance
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the hot attendance queries (open-session lookup, per-student history, '
+        'per-session roll) against a throwaway test database filled with synthetic records.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--records', type=int, default=1_000_000, help='Approximate number of attendance records')
+        parser.add_argument('--classes', type=int, default=25)
+        parser.add_argument('--students', type=int, default=200, help='Students per class')
+        parser.add_argument('--repeat', type=int, default=50, help='Runs per query')
+        parser.add_argument('--without-indexes', action='store_true', help='Also time the queries with the attendance indexes dropped')
+
+    def handle(self, *args, **options):
+        classes, students = options['classes'], options['students']
+        sessions = max(1, options['records'] // (classes * students))
+
+        # Never touch the real database: benchmark in a fresh test database
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=False)
+        try:
+            self.stdout.write(f'Generating {classes * students * sessions} records ({classes} classes x {students} students x {sessions} sessions)')
+            started = time.perf_counter()
+            generate_attendance(classes, students, sessions, stdout=self.stdout)
+            self.stdout.write(f'Generated in {time.perf_counter() - started:.1f}s')
+            if connection.vendor == 'sqlite':
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE')
+
+            queries = self.queries()
+            self.run(queries, options['repeat'], 'with indexes')
+            if options['without_indexes']:
+                self.drop_indexes()
+                self.run(queries, options['repeat'], 'without indexes')
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def queries(self):
+        class_subject = ClassSubject.objects.order_by('-pk').first()
+        student_id = StudentClassEnrollment.objects.filter(enrolled_class_id=class_subject.class_instance_id).values_list('student_id', flat=True).first()
+        session_id = AttendanceSession.objects.filter(class_subject=class_subject).order_by('date').values_list('id', flat=True).first()
+        return [
+            ('open-session lookup', lambda: AttendanceSession.objects.filter(
+                class_subject_id=class_subject.pk, status='open',
+            ).values('id', 'date', 'is_manual_allowed')[:1]),
+            ('per-student history', lambda: AttendanceRecord.objects.filter(
+                student_id=student_id,
+            ).values('attendance_session_id', 'entry_status', 'exit_status')),
+            ('per-session roll', lambda: AttendanceRecord.objects.filter(
+                attendance_session_id=session_id,
+            ).values_list('student_id', 'entry_status', 'exit_status')),
+        ]
+
+    def run(self, queries, repeat, label):
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\n== {label} =='))
+        for name, build in queries:
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                rows = list(build())
+                timings.append((time.perf_counter() - started) * 1000)
+            # 'inclusive' keeps the p95 within the measured timings; quantiles() needs two of them
+            p95 = statistics.quantiles(timings, n=100, method='inclusive')[94] if len(timings) > 1 else timings[0]
+            self.stdout.write(self.style.SUCCESS(
+                f'{name}: {len(rows)} rows, median {statistics.median(timings):.3f} ms, '
+                f'p95 {p95:.3f} ms'
+            ))
+            self.stdout.write(build().explain())
+
+    def drop_indexes(self):
+        # SQLite drops constraints by rebuilding the table from model state, so
+        # hide the Meta indexes/constraints while removing them
+        with connection.schema_editor() as editor:
+            for model in (AttendanceSession, AttendanceRecord):
+                indexes, constraints = model._meta.indexes, model._meta.constraints
+                model._meta.indexes, model._meta.constraints = [], []
+                try:
+                    for index in indexes:
+                        editor.remove_index(model, index)
+                    for constraint in constraints:
+                        editor.remove_constraint(model, constraint)
+                finally:
+                    model._meta.indexes, model._meta.constraints = indexes, constraints
@@ -0,0 +1,110 @@
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections
+from attendance.models import AttendanceSession, AttendanceRecord
+from attendance.recognition import mark_attendance
+from attendance.roster import rosters
+from attendance.synthetic import generate_attendance
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark attendance write throughput with N classrooms marking entries and exits '
+        'in parallel, on the database profile selected by the DB_* environment variables.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sessions', type=int, default=8, help='Open sessions marked in parallel, one thread each')
+        parser.add_argument('--students', type=int, default=60, help='Students per class')
+        parser.add_argument('--burst', type=int, default=3, help='Students marked per recognition call')
+
+    def handle(self, *args, **options):
+        sessions, students, burst = options['sessions'], options['students'], options['burst']
+        workdir = None
+        if connection.vendor == 'sqlite':
+            # The default in-memory test database has none of the file locking being measured
+            workdir = tempfile.mkdtemp(prefix='attendance-bench-')
+            connection.settings_dict['TEST']['NAME'] = os.path.join(workdir, 'bench.sqlite3')
+
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=False)
+        try:
+            generate_attendance(sessions, students, 1)
+            # Each class gets one open session, left unmarked
+            AttendanceRecord.objects.filter(attendance_session__status='open').delete()
+            open_sessions = list(AttendanceSession.objects.filter(status='open').select_related('class_subject'))
+            self.describe()
+            self.run(open_sessions, burst)
+        finally:
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            if workdir:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+    def describe(self):
+        settings_dict = connection.settings_dict
+        options = settings_dict.get('OPTIONS', {})
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                journal_mode = cursor.fetchone()[0]
+            profile = f'sqlite journal_mode={journal_mode} timeout={options.get("timeout", 5)}s transaction_mode={options.get("transaction_mode", "DEFERRED")}'
+        else:
+            pool = options.get('pool')
+            profile = f'{connection.vendor} pool={pool or "off"} CONN_MAX_AGE={settings_dict.get("CONN_MAX_AGE")}'
+        self.stdout.write(self.style.MIGRATE_HEADING(profile))
+
+    def run(self, open_sessions, burst):
+        latencies, errors, marks = [], [], []
+        lock = threading.Lock()
+        start = threading.Barrier(len(open_sessions))
+
+        def classroom(session):
+            student_ids = sorted(rosters.get(session).student_ids)
+            calls, failed, marked = [], 0, 0
+            start.wait()
+            try:
+                for mode in ('entry', 'exit'):
+                    for index in range(0, len(student_ids), burst):
+                        started = time.perf_counter()
+                        try:
+                            results = mark_attendance(session, student_ids[index:index + burst], mode)
+                        except OperationalError:
+                            # e.g. SQLite's "database is locked" once the busy timeout runs out
+                            failed += 1
+                            continue
+                        calls.append(time.perf_counter() - started)
+                        marked += sum(status == 'present' for status in results.values())
+            finally:
+                connection.close()
+            with lock:
+                latencies.extend(calls)
+                errors.append(failed)
+                marks.append(marked)
+
+        threads = [threading.Thread(target=classroom, args=(session,)) for session in open_sessions]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        if not latencies:
+            # Every write failed: nothing to take percentiles of
+            self.stdout.write(self.style.ERROR(
+                f'{len(open_sessions)} parallel sessions: no successful writes in {elapsed:.2f}s, {sum(errors)} failed writes'
+            ))
+            return
+        # 'inclusive' keeps the p95 within the measured latencies; quantiles() needs two of them
+        p95 = statistics.quantiles(latencies, n=100, method='inclusive')[94] if len(latencies) > 1 else latencies[0]
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(open_sessions)} parallel sessions: {sum(marks)} marks in {elapsed:.2f}s '
+            f'= {sum(marks) / elapsed:.0f} marks/s, {len(latencies)} writes, '
+            f'median {statistics.median(latencies) * 1000:.1f} ms, p95 {p95 * 1000:.1f} ms, '
+            f'{sum(errors)} failed writes'
+        ))
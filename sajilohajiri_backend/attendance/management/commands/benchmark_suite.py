@@ -0,0 +1,256 @@
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+from accounts.imports import hash_passwords, import_students
+from accounts.models import User
+from academics.models import Class, ClassSubject
+from face.index import ClassFaceIndex, load_matrix
+from face.models import FaceEncoding
+from reports.aggregation import attendance_table
+from attendance.synthetic import (
+    START_DATE, generate_classes, generate_face_encodings, generate_sessions, probe_embeddings, synthetic_embeddings,
+)
+
+# Sizes per profile; every benchmark is measured at each size so results show how cost grows
+PROFILES = {
+    'quick': {
+        'roster_sizes': [50, 500],
+        'user_counts': [500, 2000],
+        'range_days': [7, 30],
+        'import_rows': [200],
+    },
+    'full': {
+        'roster_sizes': [50, 200, 1000, 5000],
+        'user_counts': [1000, 10000, 50000],
+        'range_days': [7, 30, 90, 180],
+        'import_rows': [200, 2000],
+    },
+}
+STUDENTS_PER_CLASS = 100
+SESSIONS_PER_CLASS = 10
+PROBES_PER_FRAME = 5
+
+
+def measure(fn, repeat, warmup=1):
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        'runs': repeat,
+        'median_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(p95(timings), 3),
+        'min_ms': round(min(timings), 3),
+    }
+
+
+def p95(timings):
+    # 'inclusive' interpolates within the measured values, so p95 never falls below the median
+    return statistics.quantiles(timings, n=100, method='inclusive')[94] if len(timings) > 1 else timings[0]
+
+
+def result_key(result):
+    return result['benchmark'], json.dumps(result['params'], sort_keys=True)
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain'], cwd=settings.BASE_DIR, capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+class Command(BaseCommand):
+    help = (
+        'Run the backend benchmark suite (embedding match, list endpoints, report aggregation, '
+        'bulk enrollment) on synthetic data in a throwaway test database and write the results as JSON.'
+    )
+
+    benchmarks = ['embedding_match', 'list_endpoints', 'report_aggregation', 'bulk_enrollment']
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', choices=sorted(PROFILES), default='quick')
+        parser.add_argument('--only', nargs='+', choices=self.benchmarks, help='Run only these benchmarks')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per measurement')
+        parser.add_argument('--output', help='Write the JSON results to this file instead of stdout')
+        parser.add_argument('--compare', help='Earlier results to compare against; fails on regressions')
+        parser.add_argument('--threshold', type=float, default=0.25, help='Allowed median slowdown with --compare (0.25 = 25%%)')
+
+    def handle(self, *args, **options):
+        self.repeat = options['repeat']
+        self.sizes = PROFILES[options['profile']]
+        commit, dirty = git_commit()
+        report = {
+            'meta': {
+                'commit': commit,
+                'dirty': dirty,
+                'timestamp': timezone.now().isoformat(),
+                'profile': options['profile'],
+                'repeat': self.repeat,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'cpus': os.cpu_count(),
+            },
+            'results': [],
+        }
+
+        # Never touch the real database; each benchmark's data is rolled back afterwards
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=False)
+        setup_test_environment()
+        try:
+            for name in options['only'] or self.benchmarks:
+                self.stderr.write(self.style.MIGRATE_HEADING(f'== {name} =='))
+                with transaction.atomic():
+                    for result in getattr(self, name)():
+                        report['results'].append({'benchmark': name, **result})
+                        self.stderr.write(f'  {json.dumps(result)}')
+                    transaction.set_rollback(True)
+        finally:
+            teardown_test_environment()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output + '\n')
+        else:
+            self.stdout.write(output)
+        if options['compare']:
+            self.compare(report, options['compare'], options['threshold'])
+
+    def embedding_match(self):
+        """Matching one frame's faces against the class index, by roster size."""
+        for roster_size in self.sizes['roster_sizes']:
+            embeddings = synthetic_embeddings(roster_size)
+            student_ids = list(range(1, roster_size + 1))
+            index = ClassFaceIndex(0, student_ids, embeddings)
+            probes = probe_embeddings(embeddings[:PROBES_PER_FRAME])
+            matched = sum(student_id == expected for (student_id, _), expected in zip(index.match(probes), student_ids))
+            yield {
+                'params': {'roster_size': roster_size, 'probes': len(probes)},
+                **measure(lambda: index.match(probes), self.repeat),
+                'correct_matches': matched,
+            }
+
+            rows = []
+            for vector in embeddings:
+                face_encoding = FaceEncoding()
+                face_encoding.set_vector(vector)
+                rows.append((face_encoding.encoding_format, face_encoding.encoding_blob, None, face_encoding.encoding_dim))
+            yield {
+                'params': {'roster_size': roster_size, 'step': 'index_load'},
+                **measure(lambda: ClassFaceIndex(0, student_ids, load_matrix(rows)), self.repeat),
+            }
+
+    def list_endpoints(self):
+        """First page of the user and attendance record lists, by table size."""
+        admin = User.objects.create(email='bench-admin@example.com', role='admin', name='Bench Admin')
+        client = Client()
+        client.force_login(admin)
+        endpoints = [
+            ('users', '/accounts/api/users/'),
+            ('users_compact', '/accounts/api/users/?view=compact'),
+            ('students_by_semester', '/accounts/api/users/?role=student&semester=1'),
+            ('attendance_records', '/api/attendance/records/'),
+        ]
+
+        generated = 0
+        for user_count in self.sizes['user_counts']:
+            classes = max(1, (user_count - generated) // STUDENTS_PER_CLASS)
+            first_class = generated // STUDENTS_PER_CLASS
+            for class_subject, student_ids in generate_classes(classes, STUDENTS_PER_CLASS, first_class=first_class):
+                generate_sessions(class_subject, student_ids, SESSIONS_PER_CLASS, open_last=False)
+            generated += classes * STUDENTS_PER_CLASS
+            User.objects.filter(role='student', semester__isnull=True).update(semester='1')
+            for name, url in endpoints:
+                response = client.get(url)
+                if response.status_code != 200:
+                    raise CommandError(f'{url} returned {response.status_code}')
+                yield {
+                    'params': {'endpoint': name, 'users': generated, 'records': generated * SESSIONS_PER_CLASS},
+                    **measure(lambda: client.get(url), self.repeat),
+                    'bytes': len(response.content),
+                }
+
+    def report_aggregation(self):
+        """attendance_table() for one class of STUDENTS_PER_CLASS students, by date range."""
+        days = max(self.sizes['range_days'])
+        [(class_subject, student_ids)] = generate_classes(1, STUDENTS_PER_CLASS)
+        records = generate_sessions(class_subject, student_ids, days, open_last=False)
+        class_subjects = ClassSubject.objects.filter(pk=class_subject.pk)
+        for range_days in self.sizes['range_days']:
+            to_date = START_DATE + datetime.timedelta(days=range_days - 1)
+            yield {
+                'params': {'range_days': range_days, 'students': len(student_ids), 'records_in_range': records * range_days // days},
+                **measure(lambda: attendance_table(class_subjects, START_DATE, to_date), self.repeat),
+            }
+
+    def bulk_enrollment(self):
+        """Bulk student import with class enrollment (rows/s), and password hashing on the import pool."""
+        school_class = Class.objects.create(name='Bench import', year=1, semester=1, department='Bench')
+        imported = 0
+        for row_count in self.sizes['import_rows']:
+            rows = [
+                {'email': f'import-{imported + index}@example.com', 'name': f'Import {index}', 'roll_number': f'I{imported + index:08d}'}
+                for index in range(row_count)
+            ]
+            imported += row_count
+            started = time.perf_counter()
+            report = import_students(rows, class_id=school_class.pk)
+            elapsed = time.perf_counter() - started
+            if report['failed']:
+                raise CommandError(f'Import benchmark rows failed: {report["errors"][:3]}')
+            yield {
+                'params': {'rows': row_count, 'passwords': False},
+                'runs': 1,
+                'median_ms': round(elapsed * 1000, 3),
+                'rows_per_s': round(row_count / elapsed, 1),
+            }
+
+        workers = getattr(settings, 'IMPORT_HASH_WORKERS', os.cpu_count() or 1)
+        passwords = [f'Bench-{index}-Pw1!' for index in range(max(workers, 1) * 2)]
+        started = time.perf_counter()
+        hash_passwords(passwords)
+        elapsed = time.perf_counter() - started
+        yield {
+            'params': {'step': 'password_hashing', 'passwords': len(passwords), 'workers': workers},
+            'runs': 1,
+            'median_ms': round(elapsed * 1000, 3),
+            'passwords_per_s': round(len(passwords) / elapsed, 2),
+        }
+
+    def compare(self, report, path, threshold):
+        with open(path) as file:
+            baseline = {result_key(result): result for result in json.load(file)['results']}
+        regressions = []
+        for result in report['results']:
+            before = baseline.get(result_key(result))
+            if before is None:
+                continue
+            change = result['median_ms'] / before['median_ms'] - 1 if before['median_ms'] else 0
+            line = f'{result["benchmark"]} {json.dumps(result["params"], sort_keys=True)}: {before["median_ms"]} -> {result["median_ms"]} ms ({change:+.0%})'
+            if change > threshold:
+                regressions.append(line)
+                self.stderr.write(self.style.ERROR(line))
+            else:
+                self.stderr.write(line)
+        if regressions:
+            raise CommandError(f'{len(regressions)} benchmarks regressed by more than {threshold:.0%} against {path}.')
+        self.stderr.write(self.style.SUCCESS(f'No regressions over {threshold:.0%} against {path}.'))
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from attendance.models import AttendanceSummary
+from attendance.summary import compute_summaries
+
+BATCH_SIZE = 2000
+FIELDS = ['sessions_held', 'present', 'manual', 'exited']
+
+
+class Command(BaseCommand):
+    help = 'Rebuild AttendanceSummary from AttendanceSession/AttendanceRecord, or check it with --verify.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true', help='Only compare the stored summary with the raw data')
+        parser.add_argument('--show', type=int, default=20, help='Mismatches to print with --verify')
+
+    def handle(self, *args, **options):
+        expected = compute_summaries()
+        if options['verify']:
+            self.verify(expected, options['show'])
+            return
+
+        with transaction.atomic():
+            AttendanceSummary.objects.all().delete()
+            AttendanceSummary.objects.bulk_create([
+                AttendanceSummary(student_id=student_id, class_subject_id=class_subject_id, **dict(zip(FIELDS, counts)))
+                for (student_id, class_subject_id), counts in expected.items()
+            ], batch_size=BATCH_SIZE)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(expected)} attendance summaries.'))
+
+    def verify(self, expected, show):
+        stored = {
+            (row[0], row[1]): tuple(row[2:])
+            for row in AttendanceSummary.objects.values_list('student_id', 'class_subject_id', *FIELDS).iterator(chunk_size=BATCH_SIZE)
+        }
+        mismatches = []
+        for key in expected.keys() | stored.keys():
+            # A stored all-zero row is equivalent to a missing one
+            if expected.get(key, (0, 0, 0, 0)) != stored.get(key, (0, 0, 0, 0)):
+                mismatches.append(key)
+        for student_id, class_subject_id in sorted(mismatches)[:show]:
+            key = (student_id, class_subject_id)
+            self.stdout.write(f'student {student_id} class_subject {class_subject_id}: stored {stored.get(key)} expected {expected.get(key)} ({", ".join(FIELDS)})')
+        if mismatches:
+            raise CommandError(f'{len(mismatches)} of {len(expected)} attendance summaries are out of date; run rebuild_attendance_summary.')
+        self.stdout.write(self.style.SUCCESS(f'All {len(expected)} attendance summaries match.'))
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:02
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_records(apps, schema_editor):
+    # Keep the earliest record per (session, student), carrying over an exit
+    # mark from a later duplicate if the earliest one has none
+    AttendanceRecord = apps.get_model('attendance', 'AttendanceRecord')
+    duplicates = (
+        AttendanceRecord.objects.values('attendance_session_id', 'student_id')
+        .annotate(first_id=Min('id'), count=Count('id'))
+        .filter(count__gt=1)
+    )
+    for duplicate in duplicates:
+        records = list(AttendanceRecord.objects.filter(
+            attendance_session_id=duplicate['attendance_session_id'],
+            student_id=duplicate['student_id'],
+        ).order_by('id'))
+        keep = records[0]
+        if not keep.exit_status:
+            exited = next((record for record in records[1:] if record.exit_status), None)
+            if exited is not None:
+                keep.exit_status = exited.exit_status
+                keep.exit_method = exited.exit_method
+                keep.exit_time = exited.exit_time
+                keep.save(update_fields=['exit_status', 'exit_method', 'exit_time'])
+        AttendanceRecord.objects.filter(pk__in=[record.pk for record in records[1:]]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0001_initial'),
+        ('attendance', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendancerecord',
+            index=models.Index(fields=['student', 'attendance_session'], name='att_record_student_session_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendancesession',
+            index=models.Index(fields=['class_subject', 'status'], name='att_session_cs_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendancesession',
+            index=models.Index(fields=['class_subject', 'date'], name='att_session_cs_date_idx'),
+        ),
+        migrations.RunPython(remove_duplicate_records, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='attendancerecord',
+            constraint=models.UniqueConstraint(fields=('attendance_session', 'student'), name='unique_attendance_record'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:40
+
+from django.db import migrations
+
+
+def fill_absent_records(apps, schema_editor):
+    # Sessions closed before absences were recorded: every currently enrolled
+    # student without a record gets an absent one, which is what the summary
+    # counted them for until now
+    AttendanceSession = apps.get_model('attendance', 'AttendanceSession')
+    AttendanceRecord = apps.get_model('attendance', 'AttendanceRecord')
+    StudentClassEnrollment = apps.get_model('academics', 'StudentClassEnrollment')
+    sessions = AttendanceSession.objects.filter(status='closed').values_list('id', 'class_subject__class_instance_id')
+    for session_id, class_id in sessions.iterator():
+        recorded = set(AttendanceRecord.objects.filter(attendance_session_id=session_id).values_list('student_id', flat=True))
+        AttendanceRecord.objects.bulk_create([
+            AttendanceRecord(
+                attendance_session_id=session_id,
+                student_id=student_id,
+                entry_status='absent',
+                entry_method='manual',
+                exit_status='absent',
+            )
+            for student_id in StudentClassEnrollment.objects.filter(enrolled_class_id=class_id).values_list('student_id', flat=True)
+            if student_id not in recorded
+        ], ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0001_initial'),
+        ('attendance', '0003_attendancesummary'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_absent_records, migrations.RunPython.noop),
+    ]
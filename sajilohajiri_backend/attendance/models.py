@@ -16,6 +16,13 @@ class AttendanceSession(models.Model):
     is_manual_allowed = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # open-session lookup and per-subject session lists by date
+            models.Index(fields=['class_subject', 'status'], name='att_session_cs_status_idx'),
+            models.Index(fields=['class_subject', 'date'], name='att_session_cs_date_idx'),
+        ]
+
     def __str__(self):
         return f"Session for {self.class_subject} on {self.date}"
 
@@ -45,5 +52,46 @@ class AttendanceRecord(models.Model):
     exit_method = models.CharField(max_length=10, choices=METHOD_CHOICES, null=True, blank=True)
     exit_time = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        constraints = [
+            # One record per student per session; also serves per-session roll lookups
+            models.UniqueConstraint(fields=['attendance_session', 'student'], name='unique_attendance_record'),
+        ]
+        indexes = [
+            # per-student history across sessions
+            models.Index(fields=['student', 'attendance_session'], name='att_record_student_session_idx'),
+        ]
+
+    def __str__(self):
+        return f"Record for {self.student.username} - {self.attendance_session}"
+
+
+class AttendanceSummary(models.Model):
+    # Running totals per student and subject over closed sessions, maintained
+    # by attendance.summary so dashboards don't scan AttendanceRecord
+    student = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='attendance_summaries', limit_choices_to={'role': 'student'})
+    class_subject = models.ForeignKey(ClassSubject, on_delete=models.CASCADE, related_name='attendance_summaries')
+    sessions_held = models.PositiveIntegerField(default=0)
+    present = models.PositiveIntegerField(default=0)
+    manual = models.PositiveIntegerField(default=0)
+    exited = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            # Also the index behind per-student dashboard reads
+            models.UniqueConstraint(fields=['student', 'class_subject'], name='unique_attendance_summary'),
+        ]
+
+    @property
+    def attended(self):
+        return self.present + self.manual
+
+    @property
+    def percentage(self):
+        if not self.sessions_held:
+            return None
+        return round(self.attended * 100 / self.sessions_held, 2)
+
     def __str__(self):
-        return f"Record for {self.student.username} - {self.attendance_session}"
\ No newline at end of file
+        return f"Summary for {self.student} - {self.class_subject}"
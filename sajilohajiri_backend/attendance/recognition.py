@@ -0,0 +1,126 @@
+from django.db import transaction
+from django.utils import timezone
+from face.index import face_index
+from .models import AttendanceSession, AttendanceRecord
+from .roster import rosters
+
+# Batched recognition pipeline behind /api/attendance/recognize/:
+# encode every face of the burst in a face.workers process, match them all
+# against the class index in one go, then write the new marks in one transaction.
+# close_session() finalizes a session the same way, absentees included.
+
+
+def match_students(session, encodings):
+    """Map each recognized student id to its best distance across the burst."""
+    best = {}
+    index = face_index.for_class_subject(session.class_subject)
+    for student_id, distance in index.match(encodings):
+        if student_id is not None and distance < best.get(student_id, float('inf')):
+            best[student_id] = distance
+    return best
+
+
+ENTRY_STATUS = {'facial': 'present', 'manual': 'manual-present'}
+EXIT_STATUS = {'facial': 'present', 'manual': 'manual-exit'}
+
+
+def mark_attendance(session, student_ids, mode, method='facial'):
+    """Write entry/exit marks for student_ids, skipping existing ones.
+
+    Returns a {student_id: status} map where status is 'present' for new marks,
+    'already-marked' for students marked before, 'no-entry' for exits of
+    students who never entered, 'not-enrolled', or 'session-closed' once the
+    session has been closed. The session roster rules out unenrolled and
+    already marked students from memory; the rest cost a lock on the session
+    row, one read of their records, which other processes may have written
+    since the roster was built, and the write.
+    """
+    results = {}
+    if not student_ids:
+        return results
+    roster = rosters.get(session)
+    now = timezone.now()
+    with roster.lock:
+        candidates = []
+        for student_id in student_ids:
+            if not roster.is_enrolled(student_id):
+                results[student_id] = 'not-enrolled'
+            elif mode == 'entry' and roster.has_entry(student_id):
+                results[student_id] = 'already-marked'
+            elif mode == 'exit' and roster.has_exit(student_id):
+                results[student_id] = 'already-marked'
+            else:
+                candidates.append(student_id)
+        if not candidates:
+            return results
+
+        with transaction.atomic():
+            # Waits for a close in progress (see close_session), which then turns these marks away
+            if not AttendanceSession.objects.select_for_update().filter(pk=session.pk, status='open').exists():
+                rosters.drop(session.pk)
+                results.update((student_id, 'session-closed') for student_id in candidates)
+                return results
+            roster.add_records(AttendanceRecord.objects.filter(
+                attendance_session=session, student_id__in=candidates,
+            ).values_list('student_id', 'entry_status', 'exit_status'))
+            marked = []
+            for student_id in candidates:
+                if mode == 'entry' and roster.has_entry(student_id):
+                    results[student_id] = 'already-marked'
+                elif mode == 'exit' and not roster.has_entered(student_id):
+                    results[student_id] = 'no-entry'
+                elif mode == 'exit' and roster.has_exit(student_id):
+                    results[student_id] = 'already-marked'
+                else:
+                    marked.append(student_id)
+                    results[student_id] = 'present'
+            if not marked:
+                return results
+
+            if mode == 'entry':
+                # The unique (session, student) constraint keeps this idempotent
+                AttendanceRecord.objects.bulk_create([
+                    AttendanceRecord(
+                        attendance_session=session,
+                        student_id=student_id,
+                        entry_status=ENTRY_STATUS[method],
+                        entry_method=method,
+                    )
+                    for student_id in marked
+                ], ignore_conflicts=True)
+            else:
+                # One UPDATE for the whole burst; the exit_status filter keeps it idempotent
+                AttendanceRecord.objects.filter(
+                    attendance_session=session, student_id__in=marked, exit_status__isnull=True,
+                ).update(exit_status=EXIT_STATUS[method], exit_method=method, exit_time=now)
+
+        if mode == 'entry':
+            roster.mark_entries(marked, ENTRY_STATUS[method])
+        else:
+            roster.mark_exits(marked)
+    return results
+
+
+def close_session(session):
+    """Close an open session, recording every mark nobody made.
+
+    Students who entered but never exited get an absent exit, and enrolled
+    students without a record an absent entry and exit as the status changes
+    (see attendance.signals, which also folds the session into
+    AttendanceSummary). All of it happens in one transaction holding the
+    session row, which mark_attendance locks too, in the same number of
+    queries whatever the class size.
+
+    Returns {'absent': n, 'exit_absent': n}, or None if the session was
+    already closed.
+    """
+    with transaction.atomic():
+        if not AttendanceSession.objects.select_for_update().filter(pk=session.pk, status='open').exists():
+            return None
+        exit_absent = AttendanceRecord.objects.filter(
+            attendance_session=session, exit_status__isnull=True,
+        ).update(exit_status='absent')
+        session.status = 'closed'
+        session.save(update_fields=['status'])
+    # attendance.signals fills in the absentees as the status changes
+    return {'absent': session._absentees, 'exit_absent': exit_absent}
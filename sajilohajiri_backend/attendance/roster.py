@@ -0,0 +1,138 @@
+import threading
+import time
+from django.conf import settings
+from academics.models import StudentClassEnrollment
+from .models import AttendanceRecord
+
+# Per-process roster of every open AttendanceSession.
+#
+# Marking attendance needs to know who is enrolled and who is already marked;
+# the roster answers both from memory so recognized faces and manual marks
+# don't cost ORM round trips. It is built when a session opens, updated in
+# place as records are written (see recognition.mark_attendance) and dropped
+# when the session closes (see attendance.signals).
+
+
+class SessionRoster:
+
+    def __init__(self, session_id, class_id, student_ids, roll_numbers, entries, exited):
+        self.session_id = session_id
+        self.class_id = class_id
+        self.student_ids = set(student_ids)
+        self.roll_numbers = roll_numbers  # {roll_number: student_id}
+        self.entries = entries  # {student_id: entry_status}
+        self.exited = exited  # {student_id}
+        # Held while deciding and writing marks so concurrent bursts don't double-insert
+        self.lock = threading.Lock()
+        self.used_at = time.monotonic()
+
+    @classmethod
+    def build(cls, session):
+        class_id = session.class_subject.class_instance_id
+        enrollments = StudentClassEnrollment.objects.filter(enrolled_class_id=class_id).values_list('student_id', 'student__roll_number')
+        student_ids = []
+        roll_numbers = {}
+        for student_id, roll_number in enrollments:
+            student_ids.append(student_id)
+            if roll_number:
+                roll_numbers[roll_number] = student_id
+
+        entries = {}
+        exited = set()
+        records = AttendanceRecord.objects.filter(attendance_session=session).values_list('student_id', 'entry_status', 'exit_status')
+        for student_id, entry_status, exit_status in records:
+            entries[student_id] = entry_status
+            if exit_status:
+                exited.add(student_id)
+        return cls(session.pk, class_id, student_ids, roll_numbers, entries, exited)
+
+    def is_enrolled(self, student_id):
+        return student_id in self.student_ids
+
+    def student_for_roll(self, roll_number):
+        return self.roll_numbers.get(roll_number)
+
+    def has_entry(self, student_id):
+        return student_id in self.entries
+
+    def has_entered(self, student_id):
+        return self.entries.get(student_id, 'absent') != 'absent'
+
+    def has_exit(self, student_id):
+        return student_id in self.exited
+
+    def add_records(self, records):
+        # (student_id, entry_status, exit_status) rows read back from the database
+        for student_id, entry_status, exit_status in records:
+            self.entries[student_id] = entry_status
+            if exit_status:
+                self.exited.add(student_id)
+
+    def mark_entries(self, student_ids, entry_status):
+        for student_id in student_ids:
+            self.entries[student_id] = entry_status
+
+    def mark_exits(self, student_ids):
+        self.exited.update(student_ids)
+
+
+class RosterRegistry:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rosters = {}
+        self._swept_at = time.monotonic()
+
+    def get(self, session):
+        now = time.monotonic()
+        self.sweep(now)
+        roster = self._rosters.get(session.pk)
+        if roster is None:
+            roster = SessionRoster.build(session)
+            with self._lock:
+                roster = self._rosters.setdefault(session.pk, roster)
+        roster.used_at = now
+        return roster
+
+    def sweep(self, now):
+        # Drop idle rosters, e.g. of sessions another process closed
+        idle = getattr(settings, 'ROSTER_IDLE_SECONDS', 900)
+        if now - self._swept_at < idle:
+            return
+        with self._lock:
+            self._swept_at = now
+            self._rosters = {
+                session_id: roster for session_id, roster in self._rosters.items()
+                if now - roster.used_at < idle
+            }
+
+    def cached(self, session_id):
+        # The roster if one is loaded, without building it
+        return self._rosters.get(session_id)
+
+    def drop(self, session_id):
+        with self._lock:
+            self._rosters.pop(session_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._rosters = {}
+
+    def drop_class(self, class_id):
+        # Enrollment changed; affected rosters are rebuilt on next use
+        with self._lock:
+            self._rosters = {
+                session_id: roster for session_id, roster in self._rosters.items()
+                if roster.class_id != class_id
+            }
+
+    def drop_student(self, student_id):
+        # A student's roll number changed; rebuild the rosters that list them
+        with self._lock:
+            self._rosters = {
+                session_id: roster for session_id, roster in self._rosters.items()
+                if not roster.is_enrolled(student_id)
+            }
+
+
+rosters = RosterRegistry()
@@ -0,0 +1,66 @@
+import base64
+import binascii
+from rest_framework import serializers
+from .models import AttendanceRecord, AttendanceSummary
+
+# Serializers go down here
+class FrameField(serializers.Field):
+    """A webcam frame as encoded image bytes.
+
+    Accepts a base64 string or data URL from JSON bodies, or a raw image part
+    from multipart/form-data uploads.
+    """
+
+    def to_internal_value(self, data):
+        if hasattr(data, 'read'):
+            return data.read()
+        if not isinstance(data, str):
+            raise serializers.ValidationError('Expected a base64 image or an uploaded file.')
+        if data.startswith('data:'):
+            data = data.partition(',')[2]
+        try:
+            return base64.b64decode(data, validate=True)
+        except (binascii.Error, ValueError):
+            raise serializers.ValidationError('Invalid base64 image.')
+
+
+class RecognizeSerializer(serializers.Serializer):
+    session_id = serializers.IntegerField()
+    images = serializers.ListField(child=FrameField(), allow_empty=False, max_length=20)
+    mode = serializers.ChoiceField(choices=['entry', 'exit'], default='entry')
+
+
+class SessionCreateSerializer(serializers.Serializer):
+    class_subject_id = serializers.IntegerField()
+    session_title = serializers.CharField(max_length=255, required=False, allow_blank=True, allow_null=True)
+    is_manual_allowed = serializers.BooleanField(default=False)
+
+
+class ManualAttendanceSerializer(serializers.Serializer):
+    session_id = serializers.IntegerField()
+    roll_number = serializers.CharField(max_length=10)
+    mode = serializers.ChoiceField(choices=['entry', 'exit'], default='entry')
+
+
+class AttendanceSummarySerializer(serializers.ModelSerializer):
+    subject = serializers.CharField(source='class_subject.subject.name', read_only=True)
+    subject_code = serializers.CharField(source='class_subject.subject.code', read_only=True)
+
+    class Meta:
+        model = AttendanceSummary
+        fields = ['student', 'class_subject', 'subject', 'subject_code', 'sessions_held', 'present', 'manual', 'exited', 'attended', 'percentage', 'updated_at']
+        read_only_fields = fields
+
+
+class AttendanceRecordSerializer(serializers.ModelSerializer):
+    date = serializers.DateField(source='attendance_session.date', read_only=True)
+    class_subject = serializers.IntegerField(source='attendance_session.class_subject_id', read_only=True)
+    subject = serializers.CharField(source='attendance_session.class_subject.subject.name', read_only=True)
+    subject_code = serializers.CharField(source='attendance_session.class_subject.subject.code', read_only=True)
+    name = serializers.CharField(source='student.name', read_only=True)
+    roll_number = serializers.CharField(source='student.roll_number', read_only=True)
+
+    class Meta:
+        model = AttendanceRecord
+        fields = ['id', 'attendance_session', 'date', 'class_subject', 'subject', 'subject_code', 'student', 'name', 'roll_number', 'entry_status', 'entry_method', 'entry_time', 'exit_status', 'exit_method', 'exit_time']
+        read_only_fields = fields
@@ -0,0 +1,86 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from django.conf import settings
+from academics.models import StudentClassEnrollment
+from .models import AttendanceSession, AttendanceRecord
+from .roster import rosters
+from .summary import apply_session, apply_record_change, closed_session, record_counts
+
+
+# Build the roster when a session opens and drop it once it closes; reopening
+# drops it too, as it clears the absences the closed session recorded
+@receiver(post_save, sender=AttendanceSession)
+def session_saved(sender, instance, created, **kwargs):
+    if instance.status == 'closed' or getattr(instance, '_previous_status', None) == 'closed':
+        transaction.on_commit(lambda: rosters.drop(instance.pk))
+    elif created:
+        transaction.on_commit(lambda: rosters.get(instance))
+
+
+@receiver(post_delete, sender=AttendanceSession)
+def session_deleted(sender, instance, **kwargs):
+    transaction.on_commit(lambda: rosters.drop(instance.pk))
+
+
+@receiver(post_save, sender=StudentClassEnrollment)
+@receiver(post_delete, sender=StudentClassEnrollment)
+def enrollment_changed(sender, instance, **kwargs):
+    transaction.on_commit(lambda: rosters.drop_class(instance.enrolled_class_id))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def student_saved(sender, instance, update_fields=None, **kwargs):
+    if instance.role == 'student' and (update_fields is None or 'roll_number' in update_fields):
+        transaction.on_commit(lambda: rosters.drop_student(instance.pk))
+
+
+# Fold sessions into AttendanceSummary as they close (and back out if reopened)
+@receiver(pre_save, sender=AttendanceSession)
+def session_status_before(sender, instance, update_fields=None, **kwargs):
+    instance._previous_status = None
+    if instance.pk and (update_fields is None or 'status' in update_fields):
+        instance._previous_status = AttendanceSession.objects.filter(pk=instance.pk).values_list('status', flat=True).first()
+
+
+@receiver(post_save, sender=AttendanceSession)
+def session_summary(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and 'status' not in update_fields:
+        return
+    previous = getattr(instance, '_previous_status', None)
+    instance._absentees = 0
+    if instance.status == 'closed' and previous != 'closed':
+        instance._absentees = apply_session(instance)
+    elif previous == 'closed' and instance.status != 'closed':
+        apply_session(instance, sign=-1)
+
+
+# Records added to, corrected in or deleted from closed sessions, including
+# the cascade when a closed session is deleted; marks on open sessions are
+# bulk writes that send no signals and are counted when the session closes
+@receiver(pre_save, sender=AttendanceRecord)
+def record_before(sender, instance, **kwargs):
+    instance._summary_session = closed_session(instance.attendance_session_id)
+    instance._summary_counts = None
+    if instance._summary_session is not None and instance.pk:
+        previous = AttendanceRecord.objects.filter(pk=instance.pk).values_list('entry_status', 'exit_status').first()
+        if previous:
+            instance._summary_counts = record_counts(*previous)
+
+
+@receiver(post_save, sender=AttendanceRecord)
+def record_saved(sender, instance, **kwargs):
+    session = getattr(instance, '_summary_session', None)
+    if session is not None:
+        before = instance._summary_counts
+        apply_record_change(
+            session.class_subject_id, instance.student_id, before or (0, 0, 0),
+            record_counts(instance.entry_status, instance.exit_status), held=int(before is None),
+        )
+
+
+@receiver(post_delete, sender=AttendanceRecord)
+def record_deleted(sender, instance, **kwargs):
+    session = closed_session(instance.attendance_session_id)
+    if session is not None:
+        apply_record_change(session.class_subject_id, instance.student_id, record_counts(instance.entry_status, instance.exit_status), (0, 0, 0), held=-1)
@@ -0,0 +1,168 @@
+from collections import defaultdict
+from django.db import connection, transaction
+from django.db.models import Count, F, Q
+from django.db.models.constants import OnConflict
+from django.utils import timezone
+from academics.models import ClassSubject, StudentClassEnrollment
+from .models import AttendanceSession, AttendanceRecord, AttendanceSummary
+
+# Maintenance of AttendanceSummary, the per-(student, class_subject) totals
+# over closed sessions that dashboards read.
+#
+# A closed session counts towards a student's sessions_held exactly when the
+# student has a record in it: closing gives every enrolled student without
+# one an absent record, so students who enroll later are never counted for
+# earlier sessions. Closing folds the session's records into the summary in
+# a handful of grouped UPDATEs (see attendance.signals); records later added
+# to, edited in or deleted from a closed session apply their difference.
+# compute_summaries() recomputes everything from the raw tables for the
+# rebuild_attendance_summary command.
+
+EXITED = ('present', 'manual-exit')
+
+
+def record_counts(entry_status, exit_status):
+    """(present, manual, exited) contributed by one record."""
+    return (
+        int(entry_status == 'present'),
+        int(entry_status == 'manual-present'),
+        int(exit_status in EXITED),
+    )
+
+
+def apply_deltas(class_subject_id, deltas, held=0, create=True):
+    """Add {student_id: (present, manual, exited)} deltas and `held` sessions to each student's row.
+
+    Students sharing the same delta are updated together, so the number of
+    queries depends on the distinct deltas, not on the number of students.
+    """
+    if not deltas:
+        return
+    if create:
+        AttendanceSummary.objects.bulk_create([
+            AttendanceSummary(student_id=student_id, class_subject_id=class_subject_id) for student_id in deltas
+        ], ignore_conflicts=True)
+    groups = defaultdict(list)
+    for student_id, delta in deltas.items():
+        groups[delta].append(student_id)
+    now = timezone.now()
+    for (present, manual, exited), student_ids in groups.items():
+        AttendanceSummary.objects.filter(class_subject_id=class_subject_id, student_id__in=student_ids).update(
+            sessions_held=F('sessions_held') + held,
+            present=F('present') + present,
+            manual=F('manual') + manual,
+            exited=F('exited') + exited,
+            updated_at=now,
+        )
+
+
+def insert_select(model, columns, select, params):
+    """INSERT INTO model's table (columns) SELECT ..., skipping rows that would break a unique constraint.
+
+    One statement however many rows it copies, where bulk_create splits into
+    batches on SQLite. Returns the number of rows inserted.
+    """
+    quote = connection.ops.quote_name
+    sql = ' '.join([
+        connection.ops.insert_statement(on_conflict=OnConflict.IGNORE),
+        quote(model._meta.db_table),
+        '(' + ', '.join(quote(model._meta.get_field(name).column) for name in columns) + ')',
+        select,
+        connection.ops.on_conflict_suffix_sql(None, OnConflict.IGNORE, None, None),
+    ])
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
+
+
+def table(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def fill_absentees(session_id):
+    """Record enrolled students without a record in the session as absent; returns how many."""
+    # entry_method is required; absences are recorded by whoever closes the session
+    return insert_select(
+        AttendanceRecord,
+        ['attendance_session', 'student', 'entry_status', 'entry_method', 'entry_time', 'exit_status'],
+        f'SELECT s.id, e.student_id, %s, %s, %s, %s FROM {table(AttendanceSession)} s '
+        f'JOIN {table(ClassSubject)} cs ON cs.id = s.class_subject_id '
+        f'JOIN {table(StudentClassEnrollment)} e ON e.enrolled_class_id = cs.class_instance_id '
+        f'WHERE s.id = %s',
+        ['absent', 'manual', connection.ops.adapt_datetimefield_value(timezone.now()), 'absent', session_id],
+    )
+
+
+def add_summary_rows(session_id):
+    # Zero rows for the session's students that don't have one yet, for apply_deltas to update
+    insert_select(
+        AttendanceSummary,
+        ['student', 'class_subject', 'sessions_held', 'present', 'manual', 'exited', 'updated_at'],
+        f'SELECT r.student_id, s.class_subject_id, 0, 0, 0, 0, %s FROM {table(AttendanceRecord)} r '
+        f'JOIN {table(AttendanceSession)} s ON s.id = r.attendance_session_id '
+        f'WHERE r.attendance_session_id = %s',
+        [connection.ops.adapt_datetimefield_value(timezone.now()), session_id],
+    )
+
+
+def apply_session(session, sign=1):
+    """Fold a closed session into the summary (sign=1), or take it back out when it is reopened (sign=-1).
+
+    Closing first records enrolled students without a record as absent and
+    returns how many. Reopening backs out the students with a record, then
+    undoes what closing recorded: the absent rows are deleted and absent
+    exits cleared, so students can still be marked while the session is
+    open. The number of queries does not depend on the number of students.
+    """
+    absent = None
+    with transaction.atomic():
+        if sign > 0:
+            absent = fill_absentees(session.pk)
+            add_summary_rows(session.pk)
+        records = AttendanceRecord.objects.filter(attendance_session_id=session.pk)
+        deltas = {
+            student_id: tuple(sign * count for count in record_counts(entry_status, exit_status))
+            for student_id, entry_status, exit_status in records.values_list('student_id', 'entry_status', 'exit_status')
+        }
+        apply_deltas(session.class_subject_id, deltas, held=sign, create=False)
+        if sign < 0:
+            records.filter(entry_status='absent', exit_status='absent').delete()
+            # Absent exits have no method; exits marked by hand keep theirs
+            records.filter(exit_status='absent', exit_method__isnull=True).update(exit_status=None, exit_method=None, exit_time=None)
+    return absent
+
+
+def apply_record_change(class_subject_id, student_id, before, after, held=0):
+    """Apply the difference between a record's old and new counts, for records of closed sessions.
+
+    held is 1 for a record added to a closed session and -1 for one deleted from it.
+    """
+    delta = tuple(new - old for old, new in zip(before, after))
+    if any(delta) or held:
+        with transaction.atomic():
+            apply_deltas(class_subject_id, {student_id: delta}, held=held, create=held > 0 or any(after))
+
+
+def closed_session(session_id):
+    return AttendanceSession.objects.filter(pk=session_id, status='closed').only('pk', 'class_subject_id').first()
+
+
+def compute_summaries():
+    """Recompute {(student_id, class_subject_id): (sessions_held, present, manual, exited)} from raw data.
+
+    Every closed session a student has a record in counts as held.
+    """
+    counts = (
+        AttendanceRecord.objects.filter(attendance_session__status='closed').order_by()
+        .values('student_id', 'attendance_session__class_subject_id')
+        .annotate(
+            held=Count('pk'),
+            present=Count('pk', filter=Q(entry_status='present')),
+            manual=Count('pk', filter=Q(entry_status='manual-present')),
+            exited=Count('pk', filter=Q(exit_status__in=EXITED)),
+        )
+    )
+    return {
+        (row['student_id'], row['attendance_session__class_subject_id']): (row['held'], row['present'], row['manual'], row['exited'])
+        for row in counts
+    }
@@ -0,0 +1,112 @@
+import datetime
+import numpy as np
+from accounts.models import User
+from academics.models import Class, Subject, ClassSubject, StudentClassEnrollment
+from face.index import EMBEDDING_DIM
+from face.models import FaceEncoding
+from .models import AttendanceSession, AttendanceRecord
+
+# Synthetic data for the benchmark commands: students, classes, enrollments,
+# sessions, records and face embeddings, bulk-inserted. Only run these
+# against a throwaway test database.
+
+BATCH_SIZE = 10000
+START_DATE = datetime.date(2020, 1, 1)
+
+
+def bench_teacher():
+    teacher, _ = User.objects.get_or_create(email='bench-teacher@example.com', defaults={'role': 'teacher', 'name': 'Bench Teacher'})
+    return teacher
+
+
+def generate_classes(classes, students_per_class, first_class=0):
+    """Create classes with one subject each and students_per_class enrolled students.
+
+    Returns [(class_subject, student_ids)]. Pass first_class to add more
+    classes to an already generated school.
+    """
+    teacher = bench_teacher()
+    subject, _ = Subject.objects.get_or_create(code='BENCH', defaults={'name': 'Benchmark'})
+    generated = []
+    for class_index in range(first_class, first_class + classes):
+        school_class = Class.objects.create(name=f'Bench {class_index}', year=1, semester=1, department='Bench')
+        class_subject = ClassSubject.objects.create(class_instance=school_class, subject=subject, teacher=teacher)
+        User.objects.bulk_create([
+            User(
+                email=f'bench-{class_index}-{index}@example.com',
+                role='student',
+                name=f'Student {class_index}-{index}',
+                roll_number=f'{class_index:04d}{index:05d}',
+                approval_status='approved',
+            )
+            for index in range(students_per_class)
+        ], batch_size=BATCH_SIZE)
+        student_ids = list(User.objects.filter(email__startswith=f'bench-{class_index}-').values_list('id', flat=True))
+        StudentClassEnrollment.objects.bulk_create([
+            StudentClassEnrollment(student_id=student_id, enrolled_class=school_class) for student_id in student_ids
+        ], batch_size=BATCH_SIZE)
+        generated.append((class_subject, student_ids))
+    return generated
+
+
+def generate_sessions(class_subject, student_ids, sessions, start=START_DATE, open_last=True):
+    """One session a day from start, every student marked; the last one is left open like a live class."""
+    AttendanceSession.objects.bulk_create([
+        AttendanceSession(
+            class_subject=class_subject,
+            date=start + datetime.timedelta(days=index),
+            status='open' if open_last and index == sessions - 1 else 'closed',
+            started_by_id=class_subject.teacher_id,
+        )
+        for index in range(sessions)
+    ], batch_size=BATCH_SIZE)
+    session_ids = list(AttendanceSession.objects.filter(class_subject=class_subject).values_list('id', flat=True))
+
+    records = []
+    for session_id in session_ids:
+        for position, student_id in enumerate(student_ids):
+            present = (session_id + position) % 7 != 0
+            records.append(AttendanceRecord(
+                attendance_session_id=session_id,
+                student_id=student_id,
+                entry_status='present' if present else 'absent',
+                entry_method='facial',
+                exit_status='present' if present else 'absent',
+                exit_method='facial',
+            ))
+            if len(records) >= BATCH_SIZE:
+                AttendanceRecord.objects.bulk_create(records)
+                records = []
+    AttendanceRecord.objects.bulk_create(records)
+    return len(student_ids) * len(session_ids)
+
+
+def generate_attendance(classes, students_per_class, sessions_per_class, stdout=None):
+    """Bulk-insert a synthetic school: one subject per class, every session fully marked."""
+    for class_index, (class_subject, student_ids) in enumerate(generate_classes(classes, students_per_class)):
+        count = generate_sessions(class_subject, student_ids, sessions_per_class)
+        if stdout:
+            stdout.write(f'  class {class_index + 1}/{classes}: {count} records')
+
+
+def synthetic_embeddings(count, seed=0):
+    """(count, 128) float32 vectors spread like face_recognition embeddings (distinct people ~0.8 apart)."""
+    rng = np.random.default_rng(seed)
+    return rng.normal(0, 0.05, (count, EMBEDDING_DIM)).astype(np.float32)
+
+
+def probe_embeddings(embeddings, noise=0.01, seed=1):
+    """Fresh captures of the same faces: each embedding plus a little noise, well within the match tolerance."""
+    rng = np.random.default_rng(seed)
+    return (embeddings + rng.normal(0, noise, embeddings.shape)).astype(np.float32)
+
+
+def generate_face_encodings(student_ids, seed=0):
+    embeddings = synthetic_embeddings(len(student_ids), seed)
+    rows = []
+    for student_id, vector in zip(student_ids, embeddings):
+        face_encoding = FaceEncoding(student_id=student_id)
+        face_encoding.set_vector(vector)
+        rows.append(face_encoding)
+    FaceEncoding.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+    return embeddings
@@ -1,3 +1,399 @@
+import asyncio
+import base64
+import datetime
+import json
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from io import StringIO
+from unittest import mock
+import numpy as np
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from accounts.models import User
+from academics.models import Class, Subject, ClassSubject, StudentClassEnrollment
+from face.index import face_index
+from face.models import FaceEncoding
+from .consumers import AttendanceStreamConsumer
+from .models import AttendanceSession, AttendanceRecord, AttendanceSummary
+from .recognition import close_session, mark_attendance
+from .roster import rosters
+from .summary import compute_summaries
 
 # Create your tests here.
+class AttendanceSummaryTests(TestCase):
+    """AttendanceSummary, kept up to date by signals, must always equal compute_summaries()."""
+
+    def setUp(self):
+        teacher = User.objects.create(email='teacher@example.com', role='teacher', name='Teacher')
+        self.school_class = Class.objects.create(name='Class', year=1, semester=1, department='Computer')
+        subject = Subject.objects.create(name='Subject', code='S1')
+        self.class_subject = ClassSubject.objects.create(class_instance=self.school_class, subject=subject, teacher=teacher)
+        self.students = [self.enroll(f'student{n}') for n in range(3)]
+        self.days = 0
+
+    def enroll(self, name):
+        student = User.objects.create(email=f'{name}@example.com', role='student', name=name, roll_number=name)
+        StudentClassEnrollment.objects.create(student=student, enrolled_class=self.school_class)
+        return student
+
+    def open_session(self, marks=()):
+        """Open a session with (student, entry_status, exit_status) marks."""
+        self.days += 1
+        session = AttendanceSession.objects.create(class_subject=self.class_subject, date=datetime.date(2024, 1, self.days))
+        AttendanceRecord.objects.bulk_create([
+            AttendanceRecord(attendance_session=session, student=student, entry_status=entry_status, entry_method='facial', exit_status=exit_status)
+            for student, entry_status, exit_status in marks
+        ])
+        return session
+
+    def set_status(self, session, status):
+        session.status = status
+        session.save(update_fields=['status'])
+
+    def summary(self, student):
+        row = AttendanceSummary.objects.filter(student=student, class_subject=self.class_subject).first()
+        return (row.sessions_held, row.present, row.manual, row.exited) if row else (0, 0, 0, 0)
+
+    def assertMatchesRebuild(self):
+        stored = {
+            (row[0], row[1]): tuple(row[2:])
+            for row in AttendanceSummary.objects.values_list('student_id', 'class_subject_id', 'sessions_held', 'present', 'manual', 'exited')
+            if any(row[2:])
+        }
+        self.assertEqual(stored, compute_summaries())
+        call_command('rebuild_attendance_summary', '--verify', stdout=StringIO())
+
+    def test_close_counts_enrolled_students_without_records_as_absent(self):
+        first, second, third = self.students
+        session = self.open_session([(first, 'present', 'present'), (second, 'present', None)])
+        self.set_status(session, 'closed')
+        self.assertEqual(self.summary(first), (1, 1, 0, 1))
+        self.assertEqual(self.summary(second), (1, 1, 0, 0))
+        self.assertEqual(self.summary(third), (1, 0, 0, 0))
+        self.assertTrue(AttendanceRecord.objects.filter(attendance_session=session, student=third, entry_status='absent').exists())
+        self.assertMatchesRebuild()
+
+    def test_late_enrollment_counts_only_later_sessions(self):
+        first = self.open_session([(self.students[0], 'present', 'present')])
+        self.set_status(first, 'closed')
+        late = self.enroll('late')
+        second = self.open_session([(late, 'present', 'present')])
+        self.set_status(second, 'closed')
+        self.assertEqual(self.summary(late), (1, 1, 0, 1))
+        self.assertEqual(self.summary(self.students[0]), (2, 1, 0, 1))
+        self.assertMatchesRebuild()
+
+        # Reopening the first session must not touch the late student
+        self.set_status(first, 'open')
+        self.assertEqual(self.summary(late), (1, 1, 0, 1))
+        self.assertEqual(self.summary(self.students[1]), (1, 0, 0, 0))
+        self.assertMatchesRebuild()
+
+    def test_record_edits_in_closed_session(self):
+        first, second, third = self.students
+        session = self.open_session([(first, 'present', None)])
+        self.set_status(session, 'closed')
+
+        record = AttendanceRecord.objects.get(attendance_session=session, student=second)
+        record.entry_status = 'manual-present'
+        record.exit_status = 'manual-exit'
+        record.save()
+        self.assertEqual(self.summary(second), (1, 0, 1, 1))
+
+        AttendanceRecord.objects.filter(attendance_session=session, student=first).first().delete()
+        self.assertEqual(self.summary(first), (0, 0, 0, 0))
+
+        outsider = User.objects.create(email='outsider@example.com', role='student', name='Outsider')
+        AttendanceRecord.objects.create(attendance_session=session, student=outsider, entry_status='present', entry_method='manual')
+        self.assertEqual(self.summary(outsider), (1, 1, 0, 0))
+        self.assertMatchesRebuild()
+
+    def test_reopen_and_close_again(self):
+        first, second, third = self.students
+        session = self.open_session([(first, 'present', 'present')])
+        self.set_status(session, 'closed')
+        self.set_status(session, 'open')
+        for student in self.students:
+            self.assertEqual(self.summary(student), (0, 0, 0, 0))
+        # The absences recorded on close are gone again, so they can still be marked
+        self.assertFalse(AttendanceRecord.objects.filter(attendance_session=session, entry_status='absent').exists())
+        self.assertMatchesRebuild()
+
+        AttendanceRecord.objects.create(attendance_session=session, student=third, entry_status='present', entry_method='facial')
+        self.set_status(session, 'closed')
+        self.assertEqual(self.summary(first), (1, 1, 0, 1))
+        self.assertEqual(self.summary(second), (1, 0, 0, 0))
+        self.assertEqual(self.summary(third), (1, 1, 0, 0))
+        self.assertMatchesRebuild()
+
+    def test_delete_closed_session(self):
+        kept = self.open_session([(self.students[0], 'present', 'present')])
+        self.set_status(kept, 'closed')
+        deleted = self.open_session([(self.students[0], 'present', None), (self.students[1], 'present', 'present')])
+        self.set_status(deleted, 'closed')
+        deleted.delete()
+        self.assertEqual(self.summary(self.students[0]), (1, 1, 0, 1))
+        self.assertEqual(self.summary(self.students[1]), (1, 0, 0, 0))
+        self.assertMatchesRebuild()
+
+    def test_rebuild_matches_signals(self):
+        session = self.open_session([(self.students[0], 'present', 'present')])
+        self.set_status(session, 'closed')
+        self.enroll('late')
+        self.set_status(self.open_session(), 'closed')
+        expected = {
+            (row[0], row[1]): tuple(row[2:])
+            for row in AttendanceSummary.objects.values_list('student_id', 'class_subject_id', 'sessions_held', 'present', 'manual', 'exited')
+        }
+        call_command('rebuild_attendance_summary', stdout=StringIO())
+        rebuilt = {
+            (row[0], row[1]): tuple(row[2:])
+            for row in AttendanceSummary.objects.values_list('student_id', 'class_subject_id', 'sessions_held', 'present', 'manual', 'exited')
+        }
+        self.assertEqual(rebuilt, expected)
+
+
+class CloseSessionTests(TestCase):
+
+    def setUp(self):
+        # Session ids are reused across tests; don't pick up an earlier test's roster
+        rosters.clear()
+        self.teacher = User.objects.create(email='teacher@example.com', role='teacher', name='Teacher')
+        self.subject = Subject.objects.create(name='Subject', code='S1')
+        self.classes = 0
+
+    def open_class(self, size):
+        """An open session for a new class of `size` students: half entered, a quarter of them also exited."""
+        self.classes += 1
+        school_class = Class.objects.create(name=f'Class {self.classes}', year=1, semester=1, department='Computer')
+        class_subject = ClassSubject.objects.create(class_instance=school_class, subject=self.subject, teacher=self.teacher)
+        User.objects.bulk_create([
+            User(email=f'c{self.classes}-{n}@example.com', role='student', name=f'Student {n}', roll_number=f'{self.classes}-{n}')
+            for n in range(size)
+        ])
+        students = list(User.objects.filter(email__startswith=f'c{self.classes}-').values_list('pk', flat=True))
+        StudentClassEnrollment.objects.bulk_create([StudentClassEnrollment(student_id=pk, enrolled_class=school_class) for pk in students])
+        session = AttendanceSession.objects.create(class_subject=class_subject, date=datetime.date(2024, 1, 1), started_by=self.teacher)
+        session = AttendanceSession.objects.select_related('class_subject').get(pk=session.pk)
+        mark_attendance(session, students[:size // 2], 'entry')
+        mark_attendance(session, students[:size // 4], 'exit')
+        return session, students
+
+    def close(self, session):
+        with CaptureQueriesContext(connection) as queries:
+            counts = close_session(session)
+        return counts, len(queries)
+
+    def test_queries_do_not_grow_with_the_class(self):
+        small, small_queries = self.close(self.open_class(10)[0])
+        large, large_queries = self.close(self.open_class(1000)[0])
+        self.assertEqual(small, {'absent': 5, 'exit_absent': 3})
+        self.assertEqual(large, {'absent': 500, 'exit_absent': 250})
+        self.assertEqual(small_queries, large_queries)
+
+    def test_absent_rows_and_summary(self):
+        session, students = self.open_class(8)
+        self.assertEqual(self.close(session)[0], {'absent': 4, 'exit_absent': 2})
+        records = dict(
+            ((student_id, (entry_status, exit_status)) for student_id, entry_status, exit_status
+             in AttendanceRecord.objects.filter(attendance_session=session).values_list('student_id', 'entry_status', 'exit_status'))
+        )
+        self.assertEqual(records, {
+            **{pk: ('present', 'present') for pk in students[:2]},
+            **{pk: ('present', 'absent') for pk in students[2:4]},
+            **{pk: ('absent', 'absent') for pk in students[4:]},
+        })
+        summaries = dict(
+            ((row[0], tuple(row[1:])) for row in AttendanceSummary.objects.filter(class_subject=session.class_subject_id)
+             .values_list('student_id', 'sessions_held', 'present', 'manual', 'exited'))
+        )
+        self.assertEqual(summaries, {
+            **{pk: (1, 1, 0, 1) for pk in students[:2]},
+            **{pk: (1, 1, 0, 0) for pk in students[2:4]},
+            **{pk: (1, 0, 0, 0) for pk in students[4:]},
+        })
+        self.assertIsNone(close_session(session))
+
+    def test_marks_after_close_are_turned_away(self):
+        session, students = self.open_class(4)
+        rosters.get(session)
+        # Closed by another process: this one's roster still thinks the session is open
+        AttendanceSession.objects.filter(pk=session.pk).update(status='closed')
+        self.assertEqual(mark_attendance(session, students[2:], 'entry'), {pk: 'session-closed' for pk in students[2:]})
+        self.assertIsNone(rosters.cached(session.pk))
+        self.assertFalse(AttendanceRecord.objects.filter(attendance_session=session, student_id__in=students[2:]).exists())
+
+    def test_reopen_clears_what_close_recorded(self):
+        session, students = self.open_class(4)
+        self.close(session)
+        with self.captureOnCommitCallbacks(execute=True):
+            session.status = 'open'
+            session.save(update_fields=['status'])
+        self.assertIsNone(rosters.cached(session.pk))
+        records = dict(
+            ((student_id, (entry_status, exit_status)) for student_id, entry_status, exit_status
+             in AttendanceRecord.objects.filter(attendance_session=session).values_list('student_id', 'entry_status', 'exit_status'))
+        )
+        self.assertEqual(records, {students[0]: ('present', 'present'), students[1]: ('present', None)})
+
+        self.assertEqual(mark_attendance(session, students, 'exit'), {
+            students[0]: 'already-marked', students[1]: 'present', students[2]: 'no-entry', students[3]: 'no-entry',
+        })
+        self.assertEqual(mark_attendance(session, students[2:], 'entry'), {pk: 'present' for pk in students[2:]})
+        self.assertEqual(self.close(session)[0], {'absent': 0, 'exit_absent': 2})
+
+
+class AttendanceStreamConsumerTests(TestCase):
+
+    def setUp(self):
+        rosters.clear()
+        teacher = User.objects.create(email='teacher@example.com', role='teacher', name='Teacher')
+        school_class = Class.objects.create(name='Class', year=1, semester=1, department='Computer')
+        subject = Subject.objects.create(name='Subject', code='S1')
+        class_subject = ClassSubject.objects.create(class_instance=school_class, subject=subject, teacher=teacher)
+        self.student = User.objects.create(email='student@example.com', role='student', name='Student', roll_number='1')
+        StudentClassEnrollment.objects.create(student=self.student, enrolled_class=school_class)
+        self.outsider = User.objects.create(email='outsider@example.com', role='student', name='Outsider', roll_number='2')
+        session = AttendanceSession.objects.create(class_subject=class_subject, date=datetime.date(2024, 1, 1))
+        self.sent = []
+        self.consumer = AttendanceStreamConsumer({}, None, self.record, session.pk)
+        self.consumer.session = AttendanceSession.objects.select_related('class_subject').get(pk=session.pk)
+
+    async def record(self, message):
+        self.sent.append(json.loads(message['text']) if 'text' in message else message)
+
+    def recognize(self, mode, *students):
+        with mock.patch('attendance.consumers.match_students', return_value={student.pk: 0.3 for student in students}):
+            return [(event['type'], event['student_id'], event['status']) for event in self.consumer.recognize(np.zeros((1, 128)), mode)]
+
+    def test_only_written_marks_are_marked_events(self):
+        self.assertEqual(self.recognize('exit', self.student), [('recognized', self.student.pk, 'no-entry')])
+        self.assertEqual(self.recognize('entry', self.student, self.outsider), [
+            ('marked', self.student.pk, 'present'), ('recognized', self.outsider.pk, 'not-enrolled'),
+        ])
+        self.assertEqual(self.recognize('exit', self.student), [('marked', self.student.pk, 'present')])
+
+    async def test_encoder_errors_keep_the_stream_running(self):
+        failed = Future()
+        failed.set_exception(BrokenProcessPool('worker died'))
+        empty = Future()
+        empty.set_result((np.empty((0, 128), dtype=np.float32), 1))
+        with mock.patch('attendance.consumers.face_pool.submit', side_effect=[failed, empty]) as submit:
+            worker = asyncio.create_task(self.consumer.process_frames())
+            with self.assertLogs('attendance.consumers', 'ERROR'):
+                await self.consumer.handle_message({'bytes': b'frame'})
+                await asyncio.sleep(0.01)
+            await self.consumer.handle_message({'bytes': b'frame'})
+            await asyncio.sleep(0.01)
+            self.assertFalse(worker.done())
+            worker.cancel()
+        self.assertEqual(submit.call_count, 2)
+        self.assertEqual([event['type'] for event in self.sent], ['error'])
+
+
+def face(seed):
+    return np.random.default_rng(seed).normal(0, 0.1, 128)
+
+
+class RecognizeAPITests(TestCase):
+    """/api/attendance/recognize/ with the face encoder stubbed out: each stub frame stands for the faces it returns."""
+
+    url = '/api/attendance/recognize/'
+
+    def setUp(self):
+        rosters.clear()
+        cache.clear()
+        face_index.invalidate()
+        teacher = User.objects.create(email='teacher@example.com', role='teacher', name='Teacher')
+        school_class = Class.objects.create(name='Class', year=1, semester=1, department='Computer')
+        subject = Subject.objects.create(name='Subject', code='S1')
+        class_subject = ClassSubject.objects.create(class_instance=school_class, subject=subject, teacher=teacher)
+        self.students = []
+        for n in range(3):
+            student = User.objects.create(email=f'student{n}@example.com', role='student', name=f'Student {n}', roll_number=str(n))
+            face_encoding = FaceEncoding(student=student)
+            face_encoding.set_vector(face(n))
+            face_encoding.save()
+            self.students.append(student)
+        # The last student has a face on file but is not in this class, so is never matched
+        StudentClassEnrollment.objects.bulk_create([
+            StudentClassEnrollment(student=student, enrolled_class=school_class) for student in self.students[:2]
+        ])
+        self.session = AttendanceSession.objects.create(class_subject=class_subject, date=datetime.date(2024, 1, 1))
+        self.client = APIClient()
+        self.client.force_authenticate(teacher)
+        encoder = mock.patch('attendance.views.encode_frames', side_effect=self.encode)
+        self.encoder = encoder.start()
+        self.addCleanup(encoder.stop)
+
+    def encode(self, images):
+        # Stub frames are b'faces:<seed>,<seed>...' (b'faces:' for none, anything else fails to decode)
+        encodings, frames = [], 0
+        for image in images:
+            if image.startswith(b'faces:'):
+                frames += 1
+                encodings += [face(int(seed)) + 0.01 * frames for seed in image[6:].decode().split(',') if seed]
+        return np.asarray(encodings, dtype=np.float32).reshape(-1, 128), frames
+
+    def recognize(self, images, mode='entry', multipart=False):
+        if multipart:
+            files = [SimpleUploadedFile(f'frame{n}.jpg', image, content_type='image/jpeg') for n, image in enumerate(images)]
+            return self.client.post(self.url, {'session_id': self.session.pk, 'mode': mode, 'images': files}, format='multipart')
+        encoded = [base64.b64encode(image).decode() for image in images]
+        return self.client.post(self.url, {'session_id': self.session.pk, 'mode': mode, 'images': encoded}, format='json')
+
+    def statuses(self, response):
+        self.assertEqual(response.status_code, 200, response.content)
+        return {row['student_id']: row['status'] for row in response.json()['recognized']}
+
+    def test_json_burst_marks_each_student_once(self):
+        first, second, _ = self.students
+        response = self.recognize([b'faces:0,1', b'faces:0', b'faces:2', b'faces:'])
+        self.assertEqual(self.statuses(response), {first.pk: 'present', second.pk: 'present'})
+        self.assertEqual(response.json()['frames'], 4)
+        # A student seen in several frames keeps their best match
+        recognized = {row['student_id']: row for row in response.json()['recognized']}
+        self.assertAlmostEqual(recognized[first.pk]['distance'], float(np.linalg.norm(np.full(128, 0.01))), places=3)
+        self.assertEqual(AttendanceRecord.objects.filter(attendance_session=self.session).count(), 2)
+
+    def test_multipart_frames(self):
+        first = self.students[0]
+        response = self.recognize([b'faces:0', b'faces:0'], multipart=True)
+        self.assertEqual(self.statuses(response), {first.pk: 'present'})
+        self.assertEqual(self.encoder.call_args[0][0], [b'faces:0', b'faces:0'])
+
+    def test_already_marked_exit_and_no_entry(self):
+        first, second, _ = self.students
+        self.recognize([b'faces:0'])
+        self.assertEqual(self.statuses(self.recognize([b'faces:0'])), {first.pk: 'already-marked'})
+        self.assertEqual(self.statuses(self.recognize([b'faces:0,1'], mode='exit')), {first.pk: 'present', second.pk: 'no-entry'})
+        self.assertEqual(self.statuses(self.recognize([b'faces:0'], mode='exit')), {first.pk: 'already-marked'})
+        record = AttendanceRecord.objects.get(attendance_session=self.session, student=first)
+        self.assertEqual((record.entry_status, record.exit_status, record.exit_method), ('present', 'present', 'facial'))
+        self.assertFalse(AttendanceRecord.objects.filter(attendance_session=self.session, student=second).exists())
+
+    def test_at_most_twenty_images(self):
+        response = self.recognize([b'faces:0'] * 21)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('images', response.json())
+        self.encoder.assert_not_called()
+        self.assertEqual(self.recognize([b'faces:0'] * 20).status_code, 200)
+
+    def test_undecodable_frames(self):
+        response = self.recognize([b'garbage'])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'No valid images received'})
+        response = self.client.post(self.url, {'session_id': self.session.pk, 'images': ['@@@']}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.encoder.assert_called_once()
+
+    def test_closed_session(self):
+        AttendanceSession.objects.filter(pk=self.session.pk).update(status='closed')
+        response = self.recognize([b'faces:0'])
+        self.assertEqual(response.status_code, 400)
+        self.encoder.assert_not_called()
@@ -0,0 +1,12 @@
+from django.urls import path
+from .views import SessionCreateAPIView, OpenSessionAPIView, SessionCloseAPIView, RecognizeAttendanceAPIView, ManualAttendanceAPIView, StudentAttendanceSummaryAPIView, AttendanceRecordListAPIView
+
+urlpatterns = [
+    path('session/create/', SessionCreateAPIView.as_view(), name='attendance_session_create'),
+    path('session/open/', OpenSessionAPIView.as_view(), name='attendance_session_open'),
+    path('session/<int:session_id>/close/', SessionCloseAPIView.as_view(), name='attendance_session_close'),
+    path('recognize/', RecognizeAttendanceAPIView.as_view(), name='attendance_recognize'),
+    path('manual/', ManualAttendanceAPIView.as_view(), name='attendance_manual'),
+    path('records/', AttendanceRecordListAPIView.as_view(), name='attendance_records'),
+    path('summary/', StudentAttendanceSummaryAPIView.as_view(), name='attendance_summary'),
+]
@@ -1,3 +1,203 @@
 from django.shortcuts import render
+from django.utils import timezone
+from rest_framework import generics
+from rest_framework import views
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.parsers import JSONParser, MultiPartParser
+from rest_framework.permissions import IsAuthenticated
+from rest_framework import status
+from rest_framework.response import Response
+from accounts.models import User
+from accounts.authentication import CLAIMS_AUTHENTICATION_CLASSES
+from academics.models import ClassSubject
+from academics.permissions import TeacherRole
+from .models import AttendanceSession, AttendanceRecord, AttendanceSummary
+from .serializers import RecognizeSerializer, SessionCreateSerializer, ManualAttendanceSerializer, AttendanceSummarySerializer, AttendanceRecordSerializer
+from .filters import AttendanceRecordFilter
+from face.workers import encode_frames
+from .recognition import match_students, mark_attendance, close_session
+from .roster import rosters
+from sajilohajiri_backend.pagination import KeysetPagination
+
+
+def can_manage(user, class_subject):
+    return user.role == 'admin' or user.is_staff or class_subject.teacher_id == user.pk
+
+
+def visible_records(user):
+    """Records a user may read: all for admins, their subjects' for teachers, their own for students."""
+    records = AttendanceRecord.objects.all()
+    if user.role == 'student':
+        return records.filter(student_id=user.pk)
+    if not (user.role == 'admin' or user.is_staff):
+        return records.filter(attendance_session__class_subject__teacher_id=user.pk)
+    return records
+
+
+def get_open_session(request, session_id):
+    """Return (session, None) for an open session the user runs, or (None, error response)."""
+    session = AttendanceSession.objects.select_related('class_subject').filter(pk=session_id).first()
+    if session is None:
+        return None, Response({'error': 'Session not found'}, status=status.HTTP_404_NOT_FOUND)
+    if not can_manage(request.user, session.class_subject):
+        return None, Response({'error': 'Not your session'}, status=status.HTTP_403_FORBIDDEN)
+    if session.status != 'open':
+        # Closed by another process, whose signals never reached this roster
+        rosters.drop(session.pk)
+        return None, Response({'error': 'Session is closed'}, status=status.HTTP_400_BAD_REQUEST)
+    return session, None
+
 
 # Create your views here.
+class SessionCreateAPIView(views.APIView):
+    authentication_classes = CLAIMS_AUTHENTICATION_CLASSES
+    permission_classes = [TeacherRole]
+
+    def post(self, request, *args, **kwargs):
+        serializer = SessionCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        class_subject = ClassSubject.objects.filter(pk=serializer.validated_data['class_subject_id']).first()
+        if class_subject is None:
+            return Response({'error': 'Class subject not found'}, status=status.HTTP_404_NOT_FOUND)
+        if not can_manage(request.user, class_subject):
+            return Response({'error': 'Not your class'}, status=status.HTTP_403_FORBIDDEN)
+
+        session = AttendanceSession.objects.filter(class_subject=class_subject, status='open').first()
+        if session is not None:
+            return Response({'session_id': session.pk, 'detail': 'An open session already exists'})
+        session = AttendanceSession.objects.create(
+            class_subject=class_subject,
+            session_title=serializer.validated_data.get('session_title'),
+            is_manual_allowed=serializer.validated_data['is_manual_allowed'],
+            date=timezone.localdate(),
+            started_by_id=request.user.pk,
+        )
+        return Response({'session_id': session.pk}, status=status.HTTP_201_CREATED)
+
+
+class OpenSessionAPIView(views.APIView):
+    authentication_classes = CLAIMS_AUTHENTICATION_CLASSES
+    permission_classes = [TeacherRole]
+
+    def get(self, request, *args, **kwargs):
+        class_subject_id = request.query_params.get('class_subject_id')
+        if not class_subject_id or not class_subject_id.isdigit():
+            return Response({'error': 'class_subject_id is required'}, status=status.HTTP_400_BAD_REQUEST)
+        session = AttendanceSession.objects.filter(class_subject_id=class_subject_id, status='open').values('id', 'date', 'is_manual_allowed').first()
+        if session is None:
+            return Response({'session_id': None})
+        return Response({'session_id': session['id'], 'date': session['date'], 'is_manual_allowed': session['is_manual_allowed']})
+
+
+class RecognizeAttendanceAPIView(views.APIView):
+    # Called many times a minute per teacher during a live session; request.user comes from the token's claims
+    authentication_classes = CLAIMS_AUTHENTICATION_CLASSES
+    permission_classes = [TeacherRole]
+    # JSON with base64 screenshots, or multipart with raw JPEG parts named "images"
+    parser_classes = [JSONParser, MultiPartParser]
+
+    def post(self, request, *args, **kwargs):
+        serializer = RecognizeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        mode = serializer.validated_data['mode']
+
+        session, error = get_open_session(request, serializer.validated_data['session_id'])
+        if error:
+            return error
+
+        # Frames are decoded (at reduced scale when large) inside the encoding worker
+        encodings, frame_count = encode_frames(serializer.validated_data['images'])
+        if not frame_count:
+            return Response({'error': 'No valid images received'}, status=status.HTTP_400_BAD_REQUEST)
+
+        matches = match_students(session, encodings)
+        results = mark_attendance(session, list(matches), mode)
+
+        students = User.objects.filter(pk__in=results).values('id', 'name', 'roll_number')
+        recognized = [
+            {
+                'student_id': student['id'],
+                'name': student['name'],
+                'roll_number': student['roll_number'],
+                'mode': mode,
+                'status': results[student['id']],
+                'distance': round(matches[student['id']], 4),
+            }
+            for student in students
+        ]
+        return Response({'recognized': recognized, 'frames': frame_count})
+
+
+class ManualAttendanceAPIView(views.APIView):
+    authentication_classes = CLAIMS_AUTHENTICATION_CLASSES
+    permission_classes = [TeacherRole]
+
+    def post(self, request, *args, **kwargs):
+        serializer = ManualAttendanceSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        mode = serializer.validated_data['mode']
+        roll_number = serializer.validated_data['roll_number']
+
+        session, error = get_open_session(request, serializer.validated_data['session_id'])
+        if error:
+            return error
+        if not session.is_manual_allowed:
+            return Response({'error': 'Manual attendance is not allowed for this session'}, status=status.HTTP_400_BAD_REQUEST)
+
+        student_id = rosters.get(session).student_for_roll(roll_number)
+        if student_id is None:
+            return Response({'error': f'No enrolled student with roll number {roll_number}'}, status=status.HTTP_404_NOT_FOUND)
+
+        result = mark_attendance(session, [student_id], mode, method='manual')[student_id]
+        messages = {
+            'present': f'Roll {roll_number} marked for {mode}.',
+            'already-marked': f'Roll {roll_number} is already marked for {mode}.',
+            'no-entry': f'Roll {roll_number} has no entry to exit from.',
+            'session-closed': 'Session is closed.',
+        }
+        return Response({'success': result == 'present', 'status': result, 'message': messages[result]})
+
+
+class SessionCloseAPIView(views.APIView):
+    authentication_classes = CLAIMS_AUTHENTICATION_CLASSES
+    permission_classes = [TeacherRole]
+
+    def post(self, request, session_id, *args, **kwargs):
+        session, error = get_open_session(request, session_id)
+        if error:
+            return error
+        counts = close_session(session)
+        if counts is None:
+            return Response({'error': 'Session is closed'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'session_id': session.pk, 'status': 'closed', **counts})
+
+
+class StudentAttendanceSummaryAPIView(generics.ListAPIView):
+    """Per-subject attendance totals of one student, read from AttendanceSummary."""
+    serializer_class = AttendanceSummarySerializer
+    authentication_classes = CLAIMS_AUTHENTICATION_CLASSES
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        user = self.request.user
+        student_id = self.request.query_params.get('student_id')
+        if student_id is None:
+            student_id = user.pk
+        elif not student_id.isdigit():
+            raise ValidationError({'student_id': 'Expected a student id.'})
+        if user.role == 'student' and int(student_id) != user.pk:
+            raise PermissionDenied('Students can only view their own attendance.')
+        return AttendanceSummary.objects.filter(student_id=student_id).select_related('class_subject__subject').order_by('class_subject__subject__name')
+
+
+class AttendanceRecordListAPIView(generics.ListAPIView):
+    serializer_class = AttendanceRecordSerializer
+    authentication_classes = CLAIMS_AUTHENTICATION_CLASSES
+    permission_classes = [IsAuthenticated]
+    filterset_class = AttendanceRecordFilter
+    # Newest first, paged by id so deep pages stay cheap
+    pagination_class = KeysetPagination
+    keyset_ordering = '-id'
+
+    def get_queryset(self):
+        return visible_records(self.request.user).select_related('attendance_session__class_subject__subject', 'student')
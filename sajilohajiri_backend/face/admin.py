@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import FaceEncoding
+from .models import FaceEncoding, FaceEnrollmentJob
 
 # Register your models here.
-admin.site.register(FaceEncoding)
\ No newline at end of file
+admin.site.register(FaceEncoding)
+admin.site.register(FaceEnrollmentJob)
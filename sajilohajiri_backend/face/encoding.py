@@ -0,0 +1,99 @@
+import io
+import cv2
+import numpy as np
+import face_recognition
+from PIL import Image
+
+# CPU-bound face detection/encoding. These functions run inside the
+# face.workers process pool, so they only take and return plain bytes and
+# arrays and must not touch Django models or settings.
+
+EMBEDDING_DIM = 128
+
+
+def load_image(data):
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            return np.asarray(image.convert('RGB'))
+    except (OSError, ValueError):
+        return None
+
+
+# cv2 can decode JPEGs at 1/2, 1/4 or 1/8 scale straight from the DCT
+# coefficients, which is far cheaper than decoding at full size and resizing.
+REDUCED_DECODE_FLAGS = [
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+]
+
+def decode_frame(data, max_dimension=None):
+    """Decode an encoded webcam frame into an RGB array, or None if it can't be decoded.
+
+    JPEGs larger than max_dimension are decoded at a reduced scale.
+    """
+    flags = cv2.IMREAD_COLOR
+    if max_dimension:
+        try:
+            # Only parses the header, the pixels are decoded by cv2 below
+            with Image.open(io.BytesIO(data)) as image:
+                width, height, image_format = image.width, image.height, image.format
+        except (OSError, ValueError):
+            return None
+        if image_format == 'JPEG':
+            for factor, reduced_flags in REDUCED_DECODE_FLAGS:
+                if max(width, height) // factor >= max_dimension:
+                    flags = reduced_flags
+                    break
+
+    bgr = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), flags)
+    if bgr is None:
+        return None
+    # Swap the channels in place rather than allocating a second array
+    return cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB, dst=bgr)
+
+
+def locate_face(data, model='hog'):
+    """Return the (top, right, bottom, left) box of the first face in an encoded image, or None."""
+    image = load_image(data)
+    if image is None:
+        return None
+    locations = face_recognition.face_locations(image, model=model)
+    return locations[0] if locations else None
+
+
+def encode_image(data, model='hog', face_box=None):
+    """Return the first face encoding found in an encoded image, or None.
+
+    A known face_box skips detection entirely.
+    """
+    image = load_image(data)
+    if image is None:
+        return None
+    locations = [tuple(face_box)] if face_box else face_recognition.face_locations(image, model=model)
+    if not locations:
+        return None
+    return face_recognition.face_encodings(image, known_face_locations=locations[:1])[0]
+
+
+def encode_frames(images, model='hog', max_dimension=None):
+    """Encode every face in a burst of encoded frames.
+
+    Returns (encodings, frame_count): an (n, 128) float32 matrix of all faces
+    found and the number of frames that could be decoded.
+    """
+    frames = [decode_frame(data, max_dimension) for data in images]
+    frames = [frame for frame in frames if frame is not None]
+    if model == 'cnn' and frames and len({frame.shape for frame in frames}) == 1:
+        # The CNN detector runs the whole burst through dlib as one batch
+        locations = face_recognition.batch_face_locations(frames, batch_size=len(frames))
+    else:
+        locations = [face_recognition.face_locations(frame, model=model) for frame in frames]
+
+    encodings = []
+    for frame, frame_locations in zip(frames, locations):
+        if frame_locations:
+            encodings.extend(face_recognition.face_encodings(frame, known_face_locations=frame_locations))
+    if not encodings:
+        return np.empty((0, EMBEDDING_DIM), dtype=np.float32), len(frames)
+    return np.asarray(encodings, dtype=np.float32), len(frames)
@@ -0,0 +1,256 @@
+import threading
+import time
+import numpy as np
+from django.conf import settings
+from django.core.cache import caches
+from academics.models import StudentClassEnrollment
+from .models import FaceEncoding, BINARY_DTYPES, decode_vector
+
+# In-memory face match index.
+#
+# Every class keeps its enrolled students' embeddings as one contiguous float32
+# matrix, so a whole batch of probe embeddings is matched with a single matrix
+# product instead of parsing and comparing every FaceEncoding row per frame.
+# The index lives per process; face.signals keeps it in sync with the database
+# and shared version keys tell the other workers to rebuild.
+
+EMBEDDING_DIM = 128
+
+
+def default_tolerance():
+    return getattr(settings, 'FACE_MATCH_TOLERANCE', 0.6)
+
+
+def load_matrix(rows):
+    """Stack (encoding_format, encoding_blob, encoding_data, encoding_dim) rows into a float32 matrix."""
+    formats = {row[0] for row in rows}
+    if len(formats) == 1 and next(iter(formats)) in BINARY_DTYPES:
+        # Common case: every row has the same binary layout, decode them in one go
+        dtype = BINARY_DTYPES[formats.pop()]
+        flat = np.frombuffer(b''.join(row[1] for row in rows), dtype=dtype)
+        return flat.reshape(len(rows), EMBEDDING_DIM).astype(np.float32)
+    matrix = np.empty((len(rows), EMBEDDING_DIM), dtype=np.float32)
+    for i, row in enumerate(rows):
+        matrix[i] = decode_vector(*row)
+    return matrix
+
+
+ENCODING_FIELDS = ('encoding_format', 'encoding_blob', 'encoding_data', 'encoding_dim')
+
+
+class ClassFaceIndex:
+    """Immutable snapshot of one class's embeddings.
+
+    Updates return a new snapshot, so readers never need a lock.
+    """
+
+    def __init__(self, class_id, student_ids, matrix):
+        self.class_id = class_id
+        self.student_ids = np.asarray(student_ids, dtype=np.int64)
+        self.matrix = np.ascontiguousarray(matrix, dtype=np.float32).reshape(-1, EMBEDDING_DIM)
+        self.sq_norms = np.einsum('ij,ij->i', self.matrix, self.matrix)
+        self.positions = {int(sid): i for i, sid in enumerate(self.student_ids)}
+
+    def __len__(self):
+        return len(self.student_ids)
+
+    def __contains__(self, student_id):
+        return student_id in self.positions
+
+    @classmethod
+    def build(cls, class_id):
+        rows = list(FaceEncoding.objects.filter(
+            student__studentclassenrollment__enrolled_class_id=class_id,
+        ).values_list('student_id', *ENCODING_FIELDS))
+        student_ids = [row[0] for row in rows]
+        return cls(class_id, student_ids, load_matrix([row[1:] for row in rows]))
+
+    def with_student(self, student_id, vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        position = self.positions.get(student_id)
+        if position is None:
+            student_ids = np.append(self.student_ids, student_id)
+            matrix = np.vstack([self.matrix, vector[None, :]])
+        else:
+            student_ids = self.student_ids
+            matrix = self.matrix.copy()
+            matrix[position] = vector
+        return ClassFaceIndex(self.class_id, student_ids, matrix)
+
+    def without_student(self, student_id):
+        position = self.positions.get(student_id)
+        if position is None:
+            return self
+        return ClassFaceIndex(
+            self.class_id,
+            np.delete(self.student_ids, position),
+            np.delete(self.matrix, position, axis=0),
+        )
+
+    def match(self, probes, tolerance=None):
+        """Return a (student_id, distance) pair per probe embedding.
+
+        student_id is None when the nearest enrolled face is farther than
+        tolerance (euclidean distance, same metric as face_recognition).
+        """
+        if tolerance is None:
+            tolerance = default_tolerance()
+        probes = np.asarray(probes, dtype=np.float32).reshape(-1, EMBEDDING_DIM)
+        if not len(probes):
+            return []
+        if not len(self):
+            return [(None, None)] * len(probes)
+
+        # |p - m|^2 = |p|^2 - 2 p.m + |m|^2, for every probe/student pair at once
+        distances = probes @ self.matrix.T
+        distances *= -2
+        distances += self.sq_norms[None, :]
+        distances += np.einsum('ij,ij->i', probes, probes)[:, None]
+        np.maximum(distances, 0, out=distances)
+
+        best = distances.argmin(axis=1)
+        best_distances = np.sqrt(distances[np.arange(len(probes)), best])
+        matches = []
+        for position, distance in zip(best, best_distances):
+            distance = float(distance)
+            if distance <= tolerance:
+                matches.append((int(self.student_ids[position]), distance))
+            else:
+                matches.append((None, distance))
+        return matches
+
+
+def get_cache():
+    return caches[getattr(settings, 'FACE_INDEX_CACHE', 'default')]
+
+
+ALL_CLASSES_KEY = 'face:index:version'
+
+
+def class_key(class_id):
+    return f'face:index:version:{class_id}'
+
+
+def read_versions(keys):
+    cache = get_cache()
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Unknown (cold or evicted cache): start from a value no old snapshot can hold
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key, 0)
+    return tuple(versions[key] for key in keys)
+
+
+def bump_version(key):
+    cache = get_cache()
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), None)
+        return cache.incr(key)
+
+
+class FaceIndex:
+    """Per-process registry of ClassFaceIndex snapshots keyed by class id.
+
+    Every change bumps a version counter in the Django cache (one per class,
+    plus one for all classes). A snapshot is reused only while those versions
+    are the ones it was built at and it is younger than FACE_INDEX_MAX_AGE, so
+    changes made through other workers are picked up on the next match. With
+    the default per-process LocMemCache only the age limit reaches other
+    workers; use a shared cache to invalidate them straight away.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # class_id -> (ClassFaceIndex, versions, built_at)
+        self._entries = {}
+        # Bumped on every change so a build racing with an update is not cached
+        self._generation = 0
+
+    def max_age(self):
+        return getattr(settings, 'FACE_INDEX_MAX_AGE', 300)
+
+    def for_class(self, class_id):
+        versions = read_versions([ALL_CLASSES_KEY, class_key(class_id)])
+        entry = self._entries.get(class_id)
+        if entry is not None and entry[1] == versions and time.monotonic() - entry[2] < self.max_age():
+            return entry[0]
+        generation = self._generation
+        index = ClassFaceIndex.build(class_id)
+        with self._lock:
+            if generation == self._generation:
+                self._entries[class_id] = (index, versions, time.monotonic())
+        return index
+
+    def for_class_subject(self, class_subject):
+        # Students enroll in a Class, so every ClassSubject of that class shares its index
+        return self.for_class(class_subject.class_instance_id)
+
+    def match(self, class_id, probes, tolerance=None):
+        return self.for_class(class_id).match(probes, tolerance)
+
+    def cached_class_ids(self):
+        return list(self._entries)
+
+    def _changed(self, class_id, update=None):
+        """Publish a change to class_id and apply update to this process's snapshot."""
+        version = bump_version(class_key(class_id))
+        with self._lock:
+            self._generation += 1
+            entry = self._entries.pop(class_id, None)
+            # Patch the snapshot only when no other process changed the class since it was built
+            if entry is not None and update is not None and entry[1][1] + 1 == version:
+                index, versions, built_at = entry
+                self._entries[class_id] = (update(index), (versions[0], version), built_at)
+
+    def student_updated(self, student_id, vector):
+        self.students_updated({student_id: vector})
+
+    def students_updated(self, vectors):
+        # One query for every class the {student_id: vector} students are enrolled in
+        if not vectors:
+            return
+        enrolled = StudentClassEnrollment.objects.filter(
+            student_id__in=list(vectors),
+        ).values_list('student_id', 'enrolled_class_id')
+        for student_id, class_id in enrolled:
+            self._changed(class_id, lambda index: index.with_student(student_id, vectors[student_id]))
+
+    def student_removed(self, student_id, class_id=None):
+        if class_id is not None:
+            class_ids = {class_id}
+        else:
+            class_ids = set(StudentClassEnrollment.objects.filter(student_id=student_id).values_list('enrolled_class_id', flat=True))
+            # Enrollments deleted along with the student publish their own change
+            class_ids.update(
+                cached for cached, entry in list(self._entries.items()) if student_id in entry[0]
+            )
+        for class_id in class_ids:
+            self._changed(class_id, lambda index: index.without_student(student_id))
+
+    def student_enrolled(self, student_id, class_id):
+        row = None
+        if class_id in self._entries:
+            row = FaceEncoding.objects.filter(student_id=student_id).values_list(*ENCODING_FIELDS).first()
+        if row is None:
+            self._changed(class_id, lambda index: index)
+        else:
+            vector = decode_vector(*row)
+            self._changed(class_id, lambda index: index.with_student(student_id, vector))
+
+    def invalidate(self, class_id=None):
+        if class_id is None:
+            bump_version(ALL_CLASSES_KEY)
+        else:
+            bump_version(class_key(class_id))
+        with self._lock:
+            self._generation += 1
+            if class_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(class_id, None)
+
+
+face_index = FaceIndex()
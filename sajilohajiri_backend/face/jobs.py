@@ -0,0 +1,138 @@
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from accounts.models import User
+from . import encoding
+from .index import ENCODING_FIELDS, face_index
+from .models import FaceEncoding, FaceEnrollmentJob, decode_vector
+from .workers import EncoderBusy, face_pool, detection_model, read_avatar
+
+logger = logging.getLogger(__name__)
+
+# Bulk approve-and-encode: avatars are encoded in parallel on the face worker
+# pool and the resulting FaceEncoding rows are written in batches.
+
+BATCH_SIZE = 100
+
+
+def _save_batch(job, outcomes, vectors):
+    # Encodings, approvals and the job's progress for one batch commit together
+    with transaction.atomic():
+        rows = []
+        for student_id, vector in vectors.items():
+            face_encoding = FaceEncoding(student_id=student_id)
+            face_encoding.set_vector(vector)
+            rows.append(face_encoding)
+        FaceEncoding.objects.bulk_create(rows, ignore_conflicts=True)
+        # Rows another writer inserted meanwhile were skipped; index what was actually stored
+        stored = {
+            student_id: decode_vector(*row)
+            for student_id, *row in FaceEncoding.objects.filter(student_id__in=list(vectors)).values_list('student_id', *ENCODING_FIELDS)
+        }
+        approved = [student_id for student_id, outcome in outcomes.items() if outcome in ('success', 'already_enrolled')]
+        User.objects.filter(pk__in=approved).update(approval_status='approved')
+
+        job.results.update({str(student_id): outcome for student_id, outcome in outcomes.items()})
+        job.processed = len(job.results)
+        job.save(update_fields=['results', 'processed', 'updated_at'])
+        # bulk_create sends no post_save, so tell the face index directly
+        transaction.on_commit(lambda: face_index.students_updated(stored))
+
+
+def run_enrollment_job(job_id):
+    job = FaceEnrollmentJob.objects.get(pk=job_id)
+    job.status = 'processing'
+    job.save(update_fields=['status', 'updated_at'])
+    try:
+        _run(job)
+    except Exception as exc:
+        logger.exception('Face enrollment job %s failed', job_id)
+        job.status = 'failed'
+        job.error = str(exc)
+    else:
+        job.status = 'completed'
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'finished_at', 'updated_at'])
+
+
+def fail_stale_jobs():
+    """Mark jobs that stopped making progress as failed; returns how many.
+
+    Jobs run on an in-process thread pool, so a restart loses every queued or
+    running job without a trace. A job that has not saved progress for
+    FACE_ENROLLMENT_STALE_SECONDS is assumed lost and can be submitted again.
+    """
+    cutoff = timezone.now() - timedelta(seconds=getattr(settings, 'FACE_ENROLLMENT_STALE_SECONDS', 900))
+    return FaceEnrollmentJob.objects.filter(status__in=['queued', 'processing'], updated_at__lt=cutoff).update(
+        status='failed',
+        error='The job stopped making progress, most likely because the server restarted.',
+        finished_at=timezone.now(),
+    )
+
+
+def _run(job):
+    students = list(User.objects.filter(pk__in=job.student_ids, role='student').only('id', 'avatar', 'avatar_normalized', 'face_box'))
+    enrolled = set(FaceEncoding.objects.filter(student_id__in=job.student_ids).values_list('student_id', flat=True))
+
+    outcomes = {}
+    vectors = {}
+    pending = {}
+    model = detection_model()
+    # Keep at most one job per worker in flight so request-path recognition still gets queue slots
+    max_in_flight = max(face_pool.workers, 1)
+
+    def collect(done):
+        for future in done:
+            student_id = pending.pop(future)
+            try:
+                vector = future.result()
+            except Exception:
+                logger.exception('Face encoding failed for student %s', student_id)
+                outcomes[student_id] = 'error'
+                continue
+            if vector is None:
+                outcomes[student_id] = 'no_face'
+            else:
+                vectors[student_id] = vector
+                outcomes[student_id] = 'success'
+
+    def flush(force=False):
+        if outcomes and (force or len(outcomes) >= BATCH_SIZE):
+            _save_batch(job, dict(outcomes), dict(vectors))
+            outcomes.clear()
+            vectors.clear()
+
+    seen = set()
+    for student in students:
+        seen.add(student.pk)
+        if student.pk in enrolled:
+            outcomes[student.pk] = 'already_enrolled'
+            continue
+        try:
+            data, face_box = read_avatar(student)
+        except (ValueError, FileNotFoundError):
+            outcomes[student.pk] = 'missing_avatar'
+            continue
+
+        while len(pending) >= max_in_flight:
+            collect(wait(pending, return_when=FIRST_COMPLETED).done)
+        while True:
+            try:
+                pending[face_pool.submit(encoding.encode_image, data, model, face_box)] = student.pk
+                break
+            except EncoderBusy:
+                # The pool is saturated by live recognition; wait for one of ours to finish
+                if pending:
+                    collect(wait(pending, return_when=FIRST_COMPLETED).done)
+                else:
+                    time.sleep(face_pool.retry_after)
+        flush()
+
+    collect(wait(pending).done)
+    for student_id in set(job.student_ids) - seen:
+        outcomes[student_id] = 'not_found'
+    flush(force=True)
@@ -0,0 +1,77 @@
+import json
+import numpy as np
+from django.db import migrations, models
+
+
+def json_to_binary(apps, schema_editor):
+    # face_recognition produces float64, so f64le keeps every value bit-exact
+    FaceEncoding = apps.get_model('face', 'FaceEncoding')
+    rows = FaceEncoding.objects.filter(encoding_format='json').only('id', 'encoding_data')
+    batch = []
+    for row in rows.iterator(chunk_size=1000):
+        vector = np.asarray(json.loads(row.encoding_data), dtype='<f8')
+        row.encoding_blob = vector.tobytes()
+        row.encoding_dim = vector.shape[0]
+        row.encoding_format = 'f64le'
+        row.encoding_data = None
+        batch.append(row)
+        if len(batch) >= 1000:
+            FaceEncoding.objects.bulk_update(batch, ['encoding_blob', 'encoding_dim', 'encoding_format', 'encoding_data'])
+            batch = []
+    if batch:
+        FaceEncoding.objects.bulk_update(batch, ['encoding_blob', 'encoding_dim', 'encoding_format', 'encoding_data'])
+
+
+def binary_to_json(apps, schema_editor):
+    FaceEncoding = apps.get_model('face', 'FaceEncoding')
+    dtypes = {'f32le': '<f4', 'f64le': '<f8'}
+    rows = FaceEncoding.objects.exclude(encoding_format='json').only('id', 'encoding_blob', 'encoding_format')
+    batch = []
+    for row in rows.iterator(chunk_size=1000):
+        vector = np.frombuffer(row.encoding_blob, dtype=dtypes[row.encoding_format])
+        row.encoding_data = json.dumps(vector.astype(np.float64).tolist())
+        row.encoding_format = 'json'
+        row.encoding_blob = None
+        batch.append(row)
+        if len(batch) >= 1000:
+            FaceEncoding.objects.bulk_update(batch, ['encoding_data', 'encoding_format', 'encoding_blob'])
+            batch = []
+    if batch:
+        FaceEncoding.objects.bulk_update(batch, ['encoding_data', 'encoding_format', 'encoding_blob'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('face', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='faceencoding',
+            name='encoding_blob',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='faceencoding',
+            name='encoding_dim',
+            field=models.PositiveSmallIntegerField(default=128),
+        ),
+        # Existing rows are JSON until converted below
+        migrations.AddField(
+            model_name='faceencoding',
+            name='encoding_format',
+            field=models.CharField(choices=[('json', 'JSON text'), ('f32le', 'Float32 binary'), ('f64le', 'Float64 binary')], default='json', max_length=8),
+        ),
+        migrations.AlterField(
+            model_name='faceencoding',
+            name='encoding_data',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.RunPython(json_to_binary, binary_to_json),
+        migrations.AlterField(
+            model_name='faceencoding',
+            name='encoding_format',
+            field=models.CharField(choices=[('json', 'JSON text'), ('f32le', 'Float32 binary'), ('f64le', 'Float64 binary')], default='f64le', max_length=8),
+        ),
+    ]
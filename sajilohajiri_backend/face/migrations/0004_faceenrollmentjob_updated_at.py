@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('face', '0003_faceenrollmentjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='faceenrollmentjob',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
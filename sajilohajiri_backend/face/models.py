@@ -1,11 +1,83 @@
+import json
+import numpy as np
 from django.db import models
 from django.conf import settings
 
+# Embedding codecs, keyed by FaceEncoding.encoding_format
+BINARY_DTYPES = {
+    'f32le': np.dtype('<f4'),
+    'f64le': np.dtype('<f8'),
+}
+
+
+def encode_vector(vector, encoding_format=None):
+    encoding_format = encoding_format or getattr(settings, 'FACE_ENCODING_FORMAT', 'f64le')
+    vector = np.asarray(vector, dtype=BINARY_DTYPES[encoding_format]).ravel()
+    return encoding_format, vector.tobytes(), vector.shape[0]
+
+
+def decode_vector(encoding_format, encoding_blob, encoding_data, encoding_dim=None):
+    # Reads both the binary formats and legacy JSON rows
+    if encoding_format == 'json':
+        return np.asarray(json.loads(encoding_data), dtype=np.float64)
+    vector = np.frombuffer(encoding_blob, dtype=BINARY_DTYPES[encoding_format])
+    if encoding_dim is not None and vector.shape[0] != encoding_dim:
+        raise ValueError(f"Expected {encoding_dim} values in face encoding, found {vector.shape[0]}")
+    return vector
+
+
 # Create your models here.
 class FaceEncoding(models.Model):
+    FORMAT_CHOICES = [
+        ('json', 'JSON text'),
+        ('f32le', 'Float32 binary'),
+        ('f64le', 'Float64 binary'),
+    ]
     student = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, limit_choices_to={'role': 'student'})
-    encoding_data = models.TextField()  # Store as base64 or JSON string
+    encoding_data = models.TextField(blank=True, null=True)  # Legacy JSON string, only for 'json' rows
+    encoding_blob = models.BinaryField(blank=True, null=True)  # Raw little-endian floats
+    encoding_format = models.CharField(max_length=8, choices=FORMAT_CHOICES, default='f64le')
+    encoding_dim = models.PositiveSmallIntegerField(default=128)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    @property
+    def vector(self):
+        return decode_vector(self.encoding_format, self.encoding_blob, self.encoding_data, self.encoding_dim)
+
+    def set_vector(self, vector, encoding_format=None):
+        self.encoding_format, self.encoding_blob, self.encoding_dim = encode_vector(vector, encoding_format)
+        self.encoding_data = None
+
+    def __str__(self):
+        return f"Face data for {self.student.email}"
+
+
+class FaceEnrollmentJob(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('processing', 'Processing'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    OUTCOME_CHOICES = [
+        ('success', 'Success'),
+        ('no_face', 'No face found'),
+        ('missing_avatar', 'Missing avatar'),
+        ('already_enrolled', 'Already enrolled'),
+        ('not_found', 'Not a student'),
+        ('error', 'Error'),
+    ]
+
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='face_enrollment_jobs')
+    status = models.CharField(max_length=15, choices=STATUS_CHOICES, default='queued')
+    student_ids = models.JSONField(default=list)
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    results = models.JSONField(default=dict)  # {student_id: outcome}
+    error = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)  # last progress; see face.jobs.fail_stale_jobs
+    finished_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
-        return f"Face data for {self.student.email}"
\ No newline at end of file
+        return f"Face enrollment job #{self.pk} ({self.status})"
@@ -0,0 +1,33 @@
+from collections import Counter
+from rest_framework import serializers
+from .models import FaceEnrollmentJob
+
+# Largest job, whether its students are listed or selected by the filters
+MAX_JOB_STUDENTS = 5000
+
+
+# Serializers go down here
+class BulkFaceEnrollmentSerializer(serializers.Serializer):
+    student_ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False, max_length=MAX_JOB_STUDENTS)
+    # Same fields as accounts.filters.UserFilter
+    department = serializers.CharField(required=False)
+    semester = serializers.CharField(required=False)
+    section = serializers.CharField(required=False)
+    approval_status = serializers.ChoiceField(choices=['pending', 'approved', 'unapproved'], required=False)
+
+    def validate(self, attrs):
+        if not attrs:
+            raise serializers.ValidationError('Provide student_ids or at least one filter.')
+        return attrs
+
+
+class FaceEnrollmentJobSerializer(serializers.ModelSerializer):
+    summary = serializers.SerializerMethodField()
+
+    class Meta:
+        model = FaceEnrollmentJob
+        fields = ['id', 'status', 'total', 'processed', 'summary', 'results', 'error', 'created_at', 'finished_at']
+        read_only_fields = fields
+
+    def get_summary(self, obj):
+        return Counter(obj.results.values())
@@ -36,3 +36,37 @@
     
 #     except Exception as e:
 #         print(f"Error processing face for {instance.email}: {str(e)}")
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from academics.models import StudentClassEnrollment
+from .models import FaceEncoding
+from .index import face_index
+
+
+# Keep the in-memory face index in sync once the change is committed; face_index
+# also bumps the shared version keys so other workers rebuild their snapshots
+@receiver(post_save, sender=FaceEncoding)
+def face_encoding_saved(sender, instance, **kwargs):
+    vector = instance.vector
+    transaction.on_commit(lambda: face_index.student_updated(instance.student_id, vector))
+
+
+@receiver(post_delete, sender=FaceEncoding)
+def face_encoding_deleted(sender, instance, **kwargs):
+    transaction.on_commit(lambda: face_index.student_removed(instance.student_id))
+
+
+@receiver(post_save, sender=StudentClassEnrollment)
+def enrollment_saved(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: face_index.student_enrolled(instance.student_id, instance.enrolled_class_id))
+    else:
+        # The student may have moved to another class; rebuild lazily
+        transaction.on_commit(face_index.invalidate)
+
+
+@receiver(post_delete, sender=StudentClassEnrollment)
+def enrollment_deleted(sender, instance, **kwargs):
+    transaction.on_commit(lambda: face_index.student_removed(instance.student_id, instance.enrolled_class_id))
@@ -1,3 +1,306 @@
-from django.test import TestCase
+import base64
+import datetime
+import io
+import json
+from unittest import mock
+import face_recognition
+import numpy as np
+from PIL import Image
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+from accounts.models import User
+from academics.models import Class, StudentClassEnrollment
+from attendance.serializers import FrameField
+from .encoding import decode_frame
+from .index import ClassFaceIndex, FaceIndex, face_index
+from .models import FaceEncoding, FaceEnrollmentJob, decode_vector, encode_vector
 
 # Create your tests here.
+def vector(seed):
+    return np.random.default_rng(seed).normal(0, 0.1, 128)
+
+
+class FaceIndexTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        face_index.invalidate()
+        self.school_class = Class.objects.create(name='Class', year=1, semester=1, department='Computer')
+        self.students = 0
+
+    def student(self, seed=None, enrolled=True):
+        self.students += 1
+        student = User.objects.create(email=f'student{self.students}@example.com', role='student', name='Student', roll_number=str(self.students))
+        if enrolled:
+            StudentClassEnrollment.objects.create(student=student, enrolled_class=self.school_class)
+        if seed is not None:
+            face_encoding = FaceEncoding(student=student)
+            face_encoding.set_vector(vector(seed))
+            face_encoding.save()
+        return student
+
+    def commit(self, change):
+        # Signals update the index once the change commits
+        with self.captureOnCommitCallbacks(execute=True):
+            return change()
+
+
+class ClassFaceIndexTests(SimpleTestCase):
+
+    def setUp(self):
+        self.known = np.array([vector(seed) for seed in range(20)])
+        self.index = ClassFaceIndex(1, list(range(100, 120)), self.known)
+
+    def test_match_agrees_with_face_recognition(self):
+        probes = np.vstack([self.known[:5] + np.random.default_rng(99).normal(0, 0.02, (5, 128)), [vector(1000)]])
+        for probe, (student_id, distance) in zip(probes, self.index.match(probes)):
+            distances = face_recognition.face_distance(self.known, probe)
+            self.assertAlmostEqual(distance, distances.min(), places=4)
+            expected = 100 + int(distances.argmin()) if distances.min() <= 0.6 else None
+            self.assertEqual(student_id, expected)
+
+    def test_tolerance(self):
+        probe = self.known[3] + 0.01
+        distance = float(face_recognition.face_distance(self.known[3:4], probe)[0])
+        self.assertEqual(self.index.match([probe], tolerance=distance + 0.001)[0][0], 103)
+        self.assertIsNone(self.index.match([probe], tolerance=distance - 0.001)[0][0])
+
+    def test_empty_cases(self):
+        self.assertEqual(self.index.match(np.empty((0, 128))), [])
+        self.assertEqual(ClassFaceIndex(1, [], np.empty((0, 128))).match([self.known[0]]), [(None, None)])
+
+    def test_updates_return_new_snapshots(self):
+        replaced = self.index.with_student(105, vector(500))
+        self.assertEqual(len(replaced), 20)
+        self.assertNotEqual(replaced.match([self.known[5]])[0][0], 105)
+        self.assertEqual(replaced.match([vector(500)])[0][0], 105)
+        # The original snapshot is untouched
+        self.assertEqual(self.index.match([self.known[5]])[0][0], 105)
+
+        added = self.index.with_student(200, vector(600))
+        self.assertEqual(added.match([vector(600)])[0][0], 200)
+
+        removed = self.index.without_student(105)
+        self.assertNotIn(105, removed)
+        self.assertNotEqual(removed.match([self.known[5]])[0][0], 105)
+        self.assertEqual(removed.match([self.known[6]])[0][0], 106)
+        self.assertIs(self.index.without_student(999), self.index)
+
+
+class FaceIndexSignalTests(FaceIndexTestCase):
+
+    def test_encodings_and_enrollments_update_the_index(self):
+        first = self.student(1)
+        self.assertEqual(face_index.match(self.school_class.pk, [vector(1)])[0][0], first.pk)
+
+        face_encoding = FaceEncoding.objects.get(student=first)
+        face_encoding.set_vector(vector(2))
+        self.commit(face_encoding.save)
+        self.assertEqual(face_index.match(self.school_class.pk, [vector(2)])[0][0], first.pk)
+        self.assertIsNone(face_index.match(self.school_class.pk, [vector(1)])[0][0])
+
+        second = self.commit(lambda: self.student(3))
+        self.assertEqual(face_index.match(self.school_class.pk, [vector(3)])[0][0], second.pk)
+
+        self.commit(face_encoding.delete)
+        self.assertNotIn(first.pk, face_index.for_class(self.school_class.pk))
+
+        self.commit(lambda: StudentClassEnrollment.objects.filter(student=second).delete())
+        self.assertEqual(len(face_index.for_class(self.school_class.pk)), 0)
+
+
+class SharedInvalidationTests(FaceIndexTestCase):
+    """Another worker's index, sharing only the cache, must see changes made here."""
+
+    def test_other_worker_sees_new_and_removed_students(self):
+        first = self.student(1)
+        worker = FaceIndex()
+        self.assertEqual(list(worker.for_class(self.school_class.pk).student_ids), [first.pk])
+
+        second = self.commit(lambda: self.student(2))
+        self.assertEqual(sorted(worker.for_class(self.school_class.pk).student_ids), sorted([first.pk, second.pk]))
+
+        self.commit(lambda: StudentClassEnrollment.objects.filter(student=first).delete())
+        self.assertEqual(list(worker.for_class(self.school_class.pk).student_ids), [second.pk])
+
+    def test_other_worker_sees_new_encoding(self):
+        student = self.student(1)
+        worker = FaceIndex()
+        worker.for_class(self.school_class.pk)
+        self.commit(lambda: FaceEncoding.objects.filter(student=student).first().delete())
+        self.assertEqual(len(worker.for_class(self.school_class.pk)), 0)
+
+    def test_local_changes_patch_the_snapshot(self):
+        self.student(1)
+        index = face_index.for_class(self.school_class.pk)
+        student = self.commit(lambda: self.student(2))
+        with self.assertNumQueries(0):
+            updated = face_index.for_class(self.school_class.pk)
+        self.assertIsNot(updated, index)
+        self.assertIn(student.pk, updated)
+
+    @override_settings(FACE_INDEX_MAX_AGE=0)
+    def test_snapshots_expire(self):
+        self.student(1)
+        worker = FaceIndex()
+        worker.for_class(self.school_class.pk)
+        # Written behind the signals' back, e.g. by a process using another cache
+        other = self.student(enrolled=False)
+        StudentClassEnrollment.objects.bulk_create([StudentClassEnrollment(student=other, enrolled_class=self.school_class)])
+        FaceEncoding.objects.bulk_create([FaceEncoding(student=other, encoding_blob=vector(2).tobytes())])
+        self.assertIn(other.pk, worker.for_class(self.school_class.pk))
+
+
+class BulkFaceEnrollmentTests(TestCase):
+    url = '/accounts/api/face-encoding/bulk/'
+
+    def setUp(self):
+        self.admin = User.objects.create(email='admin@example.com', role='admin', name='Admin')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        User.objects.bulk_create([
+            User(email=f'student{n}@example.com', role='student', name='Student', roll_number=str(n), department='Computer')
+            for n in range(3)
+        ])
+        background = mock.patch('face.views.run_in_background')
+        self.run_in_background = background.start()
+        self.addCleanup(background.stop)
+
+    def submit(self, data):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(self.url, data, format='json')
+
+    def test_filter_jobs_are_capped(self):
+        with mock.patch('face.views.MAX_JOB_STUDENTS', 2):
+            response = self.submit({'department': 'Computer'})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(FaceEnrollmentJob.objects.exists())
+
+        response = self.submit({'department': 'Computer'})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['total'], 3)
+        self.run_in_background.assert_called_once()
+
+    def test_jobs_lost_in_a_restart_fail(self):
+        lost = FaceEnrollmentJob.objects.create(status='processing', student_ids=[1], total=1)
+        running = FaceEnrollmentJob.objects.create(status='processing', student_ids=[2], total=1)
+        FaceEnrollmentJob.objects.filter(pk=lost.pk).update(updated_at=timezone.now() - datetime.timedelta(hours=1))
+
+        response = self.client.get(f'/accounts/api/face-encoding/jobs/{lost.pk}/')
+        self.assertEqual(response.json()['status'], 'failed')
+        running.refresh_from_db()
+        self.assertEqual(running.status, 'processing')
+
+
+class VectorCodecTests(SimpleTestCase):
+
+    def test_binary_round_trip(self):
+        original = vector(1)
+        encoding_format, blob, dim = encode_vector(original, 'f64le')
+        self.assertEqual((encoding_format, len(blob), dim), ('f64le', 128 * 8, 128))
+        np.testing.assert_array_equal(decode_vector(encoding_format, blob, None, dim), original)
+
+        encoding_format, blob, dim = encode_vector(original, 'f32le')
+        self.assertEqual(len(blob), 128 * 4)
+        decoded = decode_vector(encoding_format, blob, None, dim)
+        self.assertEqual(decoded.dtype, np.float32)
+        np.testing.assert_allclose(decoded, original, rtol=1e-6)
+
+    def test_json_rows(self):
+        original = vector(1)
+        np.testing.assert_array_equal(decode_vector('json', None, json.dumps(original.tolist())), original)
+
+    def test_model_default_format(self):
+        face_encoding = FaceEncoding()
+        face_encoding.set_vector(vector(1))
+        self.assertEqual(face_encoding.encoding_format, 'f64le')
+        self.assertIsNone(face_encoding.encoding_data)
+        np.testing.assert_array_equal(face_encoding.vector, vector(1))
+
+    def test_wrong_length_is_rejected(self):
+        encoding_format, blob, _ = encode_vector(vector(1), 'f32le')
+        with self.assertRaises(ValueError):
+            decode_vector(encoding_format, blob, None, 64)
+
+
+class EncodingMigrationTests(TransactionTestCase):
+    """0002 converts JSON rows to f64le blobs and back without changing a value."""
+
+    def migrate(self, name):
+        # Only face moves; every other app stays at its latest migration
+        executor = MigrationExecutor(connection)
+        targets = [node for node in executor.loader.graph.leaf_nodes() if node[0] != 'face'] + [('face', name)]
+        executor.migrate(targets)
+        return MigrationExecutor(connection).loader.project_state(targets).apps
+
+    def tearDown(self):
+        call_command('migrate', 'face', verbosity=0)
+
+    def test_round_trip(self):
+        original = vector(1)
+        apps = self.migrate('0001_initial')
+        student = apps.get_model('accounts', 'User').objects.create(email='student@example.com', role='student', name='Student')
+        apps.get_model('face', 'FaceEncoding').objects.create(student_id=student.pk, encoding_data=json.dumps(original.tolist()))
+
+        apps = self.migrate('0002_faceencoding_binary_storage')
+        row = apps.get_model('face', 'FaceEncoding').objects.get(student_id=student.pk)
+        self.assertEqual((row.encoding_format, row.encoding_dim, row.encoding_data), ('f64le', 128, None))
+        np.testing.assert_array_equal(decode_vector(row.encoding_format, bytes(row.encoding_blob), None, 128), original)
+
+        apps = self.migrate('0001_initial')
+        row = apps.get_model('face', 'FaceEncoding').objects.get(student_id=student.pk)
+        self.assertEqual(json.loads(row.encoding_data), original.tolist())
+
+
+def image_bytes(width, height, image_format, color=(200, 30, 10)):
+    output = io.BytesIO()
+    Image.new('RGB', (width, height), color).save(output, format=image_format)
+    return output.getvalue()
+
+
+class DecodeFrameTests(SimpleTestCase):
+
+    def test_decodes_to_rgb(self):
+        frame = decode_frame(image_bytes(64, 48, 'PNG'))
+        self.assertEqual(frame.shape, (48, 64, 3))
+        self.assertEqual(tuple(frame[0, 0]), (200, 30, 10))
+
+    def test_large_jpegs_decode_at_reduced_scale(self):
+        data = image_bytes(1600, 1200, 'JPEG')
+        self.assertEqual(decode_frame(data).shape, (1200, 1600, 3))
+        self.assertEqual(decode_frame(data, max_dimension=640).shape, (600, 800, 3))
+        self.assertEqual(decode_frame(data, max_dimension=200).shape, (150, 200, 3))
+        # PNG has no reduced decode; it stays at full size
+        self.assertEqual(decode_frame(image_bytes(1600, 1200, 'PNG'), max_dimension=640).shape, (1200, 1600, 3))
+
+    def test_bad_input(self):
+        self.assertIsNone(decode_frame(b'not an image'))
+        self.assertIsNone(decode_frame(b'not an image', max_dimension=640))
+        self.assertIsNone(decode_frame(image_bytes(64, 48, 'JPEG')[:20], max_dimension=640))
+
+
+class FrameFieldTests(SimpleTestCase):
+
+    def setUp(self):
+        self.field = FrameField()
+        self.data = image_bytes(8, 8, 'JPEG')
+
+    def test_base64_and_data_urls(self):
+        encoded = base64.b64encode(self.data).decode()
+        self.assertEqual(self.field.to_internal_value(encoded), self.data)
+        self.assertEqual(self.field.to_internal_value(f'data:image/jpeg;base64,{encoded}'), self.data)
+
+    def test_uploaded_files(self):
+        self.assertEqual(self.field.to_internal_value(SimpleUploadedFile('frame.jpg', self.data)), self.data)
+
+    def test_bad_input(self):
+        for value in ['not base64!', 'data:image/jpeg;base64,@@@', 42, None]:
+            with self.subTest(value=value), self.assertRaises(ValidationError):
+                self.field.to_internal_value(value)
@@ -1,3 +1,56 @@
 from django.shortcuts import render
+from django.db import transaction
+from rest_framework import generics
+from rest_framework import views
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from accounts.models import User
+from accounts.filters import UserFilter
+from academics.permissions import AdminRole
+from sajilohajiri_backend.background import run_in_background
+from .models import FaceEnrollmentJob
+from .serializers import BulkFaceEnrollmentSerializer, FaceEnrollmentJobSerializer, MAX_JOB_STUDENTS
+from .jobs import fail_stale_jobs, run_enrollment_job
 
 # Create your views here.
+class BulkFaceEnrollmentAPIView(views.APIView):
+    permission_classes = [IsAuthenticated, AdminRole]
+
+    def post(self, request, *args, **kwargs):
+        serializer = BulkFaceEnrollmentSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = dict(serializer.validated_data)
+
+        students = User.objects.filter(role='student')
+        student_ids = data.pop('student_ids', None)
+        if student_ids is not None:
+            students = students.filter(pk__in=student_ids)
+        if data or student_ids is None:
+            # Filter-based jobs only pick up students still waiting for approval unless told otherwise
+            data.setdefault('approval_status', 'pending')
+            students = UserFilter(data, queryset=students).qs
+        student_ids = list(students.values_list('id', flat=True)[:MAX_JOB_STUDENTS + 1])
+        if not student_ids:
+            return Response({'detail': 'No matching students.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(student_ids) > MAX_JOB_STUDENTS:
+            return Response(
+                {'detail': f'More than {MAX_JOB_STUDENTS} students match; narrow the filters or split the job.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        fail_stale_jobs()
+        job = FaceEnrollmentJob.objects.create(created_by=request.user, student_ids=student_ids, total=len(student_ids))
+        transaction.on_commit(lambda: run_in_background(run_enrollment_job, job.pk))
+        return Response(FaceEnrollmentJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+class FaceEnrollmentJobAPIView(generics.RetrieveAPIView):
+    queryset = FaceEnrollmentJob.objects.all()
+    serializer_class = FaceEnrollmentJobSerializer
+    permission_classes = [IsAuthenticated, AdminRole]
+
+    def get_object(self):
+        # Pollers of a job lost in a restart see it fail instead of waiting forever
+        fail_stale_jobs()
+        return super().get_object()
@@ -0,0 +1,147 @@
+import atexit
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from sajilohajiri_backend.instrumentation import timed
+from . import encoding
+
+logger = logging.getLogger(__name__)
+
+# Pool of face encoding worker processes.
+#
+# Detection/encoding is pure CPU work that holds the GIL for hundreds of
+# milliseconds per image, so it runs in separate processes. At most
+# FACE_ENCODING_WORKERS jobs run and FACE_ENCODING_QUEUE_SIZE more may wait;
+# beyond that callers get EncoderBusy (503 + Retry-After) instead of piling up.
+
+
+class EncoderBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Face recognition is busy, please retry shortly.'
+    default_code = 'encoder_busy'
+
+    def __init__(self, detail=None, code=None, wait=None):
+        super().__init__(detail, code)
+        # DRF's exception handler turns `wait` into a Retry-After header
+        self.wait = wait
+
+
+class FaceEncodingPool:
+
+    def __init__(self, workers, queue_size, timeout, retry_after, start_method='spawn'):
+        self.workers = workers
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.start_method = start_method
+        self._slots = threading.BoundedSemaphore(max(workers, 1) + queue_size)
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(self.start_method),
+                )
+            return self._executor
+
+    def _reset_executor(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def submit(self, fn, *args):
+        """Queue fn(*args) on the pool and return its Future.
+
+        Raises EncoderBusy when every worker and queue slot is taken.
+        """
+        if not self._slots.acquire(blocking=False):
+            raise EncoderBusy(wait=self.retry_after)
+        try:
+            if self.workers == 0:
+                # Inline mode for development and tests
+                future = Future()
+                try:
+                    future.set_result(fn(*args))
+                except Exception as exc:
+                    future.set_exception(exc)
+            else:
+                try:
+                    future = self._get_executor().submit(fn, *args)
+                except BrokenProcessPool:
+                    # A worker died (e.g. out of memory); start a fresh pool once
+                    logger.warning('Face encoding pool was broken, restarting it')
+                    self._reset_executor()
+                    future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda f: self._slots.release())
+        return future
+
+    def run(self, fn, *args):
+        """Run fn(*args) on the pool and wait for its result."""
+        with timed('face'):
+            future = self.submit(fn, *args)
+            try:
+                return future.result(timeout=self.timeout)
+            except TimeoutError:
+                raise EncoderBusy('Face recognition timed out, please retry shortly.', wait=self.retry_after)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+face_pool = FaceEncodingPool(
+    workers=getattr(settings, 'FACE_ENCODING_WORKERS', 2),
+    queue_size=getattr(settings, 'FACE_ENCODING_QUEUE_SIZE', 8),
+    timeout=getattr(settings, 'FACE_ENCODING_TIMEOUT', 30),
+    retry_after=getattr(settings, 'FACE_ENCODING_RETRY_AFTER', 2),
+    start_method=getattr(settings, 'FACE_ENCODING_START_METHOD', 'spawn'),
+)
+atexit.register(face_pool.shutdown)
+
+
+def detection_model():
+    return getattr(settings, 'FACE_DETECTION_MODEL', 'hog')
+
+
+def read_avatar(student):
+    """Return (image bytes, face_box) to encode for student.
+
+    Prefers the normalized avatar and its stored face box; raises ValueError
+    or FileNotFoundError when the student has no readable avatar.
+    """
+    if student.avatar_normalized:
+        image, face_box = student.avatar_normalized, student.face_box
+    else:
+        image, face_box = student.avatar, None
+    with image.open(mode='rb') as image_file:
+        return image_file.read(), face_box
+
+
+def locate_face(data):
+    """Blocking: (top, right, bottom, left) of the first face in an encoded image, or None."""
+    return face_pool.run(encoding.locate_face, data, detection_model())
+
+
+def encode_image(data, face_box=None):
+    """Blocking: first face encoding in an encoded image, or None."""
+    return face_pool.run(encoding.encode_image, data, detection_model(), face_box)
+
+
+def encode_frames(images):
+    """Blocking: (encodings, frame_count) for a burst of encoded frames."""
+    max_dimension = getattr(settings, 'RECOGNITION_FRAME_MAX_DIMENSION', 640)
+    return face_pool.run(encoding.encode_frames, images, detection_model(), max_dimension)
+
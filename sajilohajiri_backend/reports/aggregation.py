@@ -0,0 +1,140 @@
+from django.db.models import Count, Q
+from academics.models import StudentClassEnrollment
+from attendance.models import AttendanceSession, AttendanceRecord
+
+# Attendance percentages for a set of ClassSubjects over a date range.
+#
+# Everything is computed in a constant number of queries however many
+# students and sessions there are: one for the sessions, one for the
+# enrolled students, one grouped query for the per-student counts and
+# (for the matrix) one streamed pass over the records. The result is
+# columnar so the API and the file exporters share it without building
+# per-row dicts.
+
+PRESENT = 'P'
+MANUAL = 'M'
+ABSENT = 'A'
+NOT_RECORDED = '-'
+
+ENTRY_CODES = {
+    'present': PRESENT,
+    'manual-present': MANUAL,
+    'absent': ABSENT,
+}
+
+COUNT_COLUMNS = ['held', 'present', 'manual', 'absent', 'exited', 'percentage']
+
+
+class AttendanceTable:
+    """Students x sessions attendance for a report scope, stored column-wise.
+
+    ``students`` and ``sessions`` map column names to equal-length lists.
+    ``counts`` holds one list per COUNT_COLUMNS entry, aligned with
+    ``students``. ``matrix`` has one string per student with one status code
+    per session (P present, M manual, A absent, - not recorded), or is None
+    when the matrix was not requested.
+    """
+
+    def __init__(self, students, sessions, counts, matrix=None):
+        self.students = students
+        self.sessions = sessions
+        self.counts = counts
+        self.matrix = matrix
+
+    def __len__(self):
+        return len(self.students['id'])
+
+    def header(self):
+        columns = ['Roll number', 'Name']
+        if self.matrix is not None:
+            columns += [f'{date} {subject}' for date, subject in zip(self.sessions['date'], self.sessions['subject'])]
+        return columns + [column.capitalize() for column in COUNT_COLUMNS]
+
+    def rows(self):
+        for index in range(len(self)):
+            row = [self.students['roll_number'][index] or '', self.students['name'][index] or '']
+            if self.matrix is not None:
+                row += list(self.matrix[index])
+            yield row + [self.counts[column][index] for column in COUNT_COLUMNS]
+
+    def as_dict(self):
+        return {
+            'students': self.students,
+            'sessions': self.sessions,
+            'counts': self.counts,
+            'matrix': self.matrix,
+        }
+
+
+def attendance_table(class_subjects, from_date, to_date, with_matrix=True):
+    sessions = list(
+        AttendanceSession.objects.filter(class_subject__in=class_subjects, date__range=(from_date, to_date))
+        .order_by('date', 'pk')
+        .values_list('pk', 'date', 'class_subject__subject__name')
+    )
+    session_ids = [session[0] for session in sessions]
+
+    students = list(
+        StudentClassEnrollment.objects.filter(enrolled_class__in=class_subjects.values('class_instance_id'))
+        .order_by('student__roll_number', 'student_id')
+        .values_list('student_id', 'student__roll_number', 'student__name')
+        .distinct()
+    )
+    student_ids = [student[0] for student in students]
+
+    records = AttendanceRecord.objects.filter(
+        attendance_session__class_subject__in=class_subjects,
+        attendance_session__date__range=(from_date, to_date),
+    )
+    # One grouped pass with conditional aggregation gives every per-student count
+    grouped = (
+        records.values('student_id')
+        .annotate(
+            present=Count('pk', filter=Q(entry_status='present')),
+            manual=Count('pk', filter=Q(entry_status='manual-present')),
+            exited=Count('pk', filter=Q(exit_status__in=['present', 'manual-exit'])),
+        )
+    )
+    totals = {row['student_id']: row for row in grouped}
+
+    held = len(session_ids)
+    counts = {column: [] for column in COUNT_COLUMNS}
+    for student_id in student_ids:
+        row = totals.get(student_id, {})
+        present, manual, exited = row.get('present', 0), row.get('manual', 0), row.get('exited', 0)
+        counts['held'].append(held)
+        counts['present'].append(present)
+        counts['manual'].append(manual)
+        counts['absent'].append(held - present - manual)
+        counts['exited'].append(exited)
+        counts['percentage'].append(round((present + manual) * 100 / held, 2) if held else None)
+
+    matrix = None
+    if with_matrix:
+        matrix = build_matrix(student_ids, session_ids, records)
+
+    return AttendanceTable(
+        students={
+            'id': student_ids,
+            'roll_number': [student[1] for student in students],
+            'name': [student[2] for student in students],
+        },
+        sessions={
+            'id': session_ids,
+            'date': [session[1] for session in sessions],
+            'subject': [session[2] for session in sessions],
+        },
+        counts=counts,
+        matrix=matrix,
+    )
+
+
+def build_matrix(student_ids, session_ids, records):
+    rows = {student_id: bytearray(NOT_RECORDED * len(session_ids), 'ascii') for student_id in student_ids}
+    columns = {session_id: index for index, session_id in enumerate(session_ids)}
+    records = records.values_list('student_id', 'attendance_session_id', 'entry_status')
+    for student_id, session_id, entry_status in records.iterator(chunk_size=2000):
+        row = rows.get(student_id)
+        if row is not None:
+            row[columns[session_id]] = ord(ENTRY_CODES.get(entry_status, NOT_RECORDED))
+    return [rows[student_id].decode('ascii') for student_id in student_ids]
@@ -0,0 +1,92 @@
+import csv
+import io
+import logging
+import tempfile
+from django.core.files import File
+from django.utils import timezone
+from academics.models import ClassSubject, StudentClassEnrollment
+from attendance.models import AttendanceSession, AttendanceRecord
+from .aggregation import attendance_table
+from .models import AttendanceReport
+
+logger = logging.getLogger(__name__)
+
+# Report generation runs on the background job runner (see
+# sajilohajiri_backend.background), never on the request path. Rows are
+# written to a temporary file as they are fetched and the finished file is
+# saved to AttendanceReport.report_file, so memory stays flat however long
+# the date range is.
+
+CHUNK_SIZE = 2000
+
+
+def report_subjects(report):
+    """ClassSubjects covered by a report: one for subject reports, every subject of the class for class reports."""
+    if report.report_type == 'subject':
+        return ClassSubject.objects.filter(pk=report.class_subject_id)
+    if report.report_type == 'class':
+        return ClassSubject.objects.filter(class_instance_id=report.class_subject.class_instance_id)
+    if report.class_subject_id:
+        return ClassSubject.objects.filter(pk=report.class_subject_id)
+    classes = StudentClassEnrollment.objects.filter(student_id=report.student_id).values('enrolled_class_id')
+    return ClassSubject.objects.filter(class_instance_id__in=classes)
+
+
+def report_sessions(report):
+    return AttendanceSession.objects.filter(
+        class_subject__in=report_subjects(report),
+        date__range=(report.from_date, report.to_date),
+    )
+
+
+def write_individual(report, writer):
+    writer.writerow(['Date', 'Subject', 'Session', 'Entry', 'Entry method', 'Entry time', 'Exit', 'Exit method', 'Exit time'])
+    # One student's records for the range are few; sessions are streamed
+    records = {
+        record['attendance_session_id']: record
+        for record in AttendanceRecord.objects.filter(
+            student_id=report.student_id, attendance_session__in=report_sessions(report),
+        ).values('attendance_session_id', 'entry_status', 'entry_method', 'entry_time', 'exit_status', 'exit_method', 'exit_time')
+    }
+    sessions = report_sessions(report).order_by('date', 'pk').values_list('pk', 'date', 'class_subject__subject__name', 'session_title')
+    for session_id, date, subject, title in sessions.iterator(chunk_size=CHUNK_SIZE):
+        record = records.get(session_id, {})
+        writer.writerow([
+            date, subject, title or '',
+            record.get('entry_status', 'absent'), record.get('entry_method', ''), record.get('entry_time') or '',
+            record.get('exit_status') or '', record.get('exit_method') or '', record.get('exit_time') or '',
+        ])
+
+
+def write_table(report, writer):
+    # Student x session matrix with per-student totals, see reports.aggregation
+    table = attendance_table(report_subjects(report), report.from_date, report.to_date)
+    writer.writerow(table.header())
+    writer.writerows(table.rows())
+
+
+WRITERS = {
+    'individual': write_individual,
+    'class': write_table,
+    'subject': write_table,
+}
+
+
+def generate_report(report_id):
+    report = AttendanceReport.objects.select_related('class_subject').get(pk=report_id)
+    try:
+        with tempfile.TemporaryFile() as output:
+            text = io.TextIOWrapper(output, encoding='utf-8', newline='')
+            WRITERS[report.report_type](report, csv.writer(text))
+            text.flush()
+            text.detach()
+            output.seek(0)
+            report.report_file.save(f'{report.report_type}-{report.pk}-{report.from_date}-{report.to_date}.csv', File(output), save=False)
+    except Exception as exc:
+        logger.exception('Attendance report %s failed', report_id)
+        report.status = 'failed'
+        report.error = str(exc)
+    else:
+        report.status = 'generated'
+    report.finished_at = timezone.now()
+    report.save(update_fields=['report_file', 'status', 'error', 'finished_at'])
@@ -0,0 +1,85 @@
+import csv
+import datetime
+import tempfile
+from django.utils import timezone
+from django.http import FileResponse, StreamingHttpResponse
+
+# Streaming file exports. CSV rows are encoded and sent as they are fetched;
+# XLSX goes through openpyxl's write-only workbook, which spools rows to disk
+# instead of keeping the sheet in memory, and the finished file is streamed.
+
+CHUNK_SIZE = 2000
+
+RECORD_HEADER = ['Name', 'Roll Number', 'Date', 'Subject', 'Subject Code', 'Session', 'Entry Status', 'Entry Method', 'Entry Time', 'Exit Status', 'Exit Method', 'Exit Time']
+RECORD_FIELDS = [
+    'student__name', 'student__roll_number', 'attendance_session__date',
+    'attendance_session__class_subject__subject__name', 'attendance_session__class_subject__subject__code',
+    'attendance_session__session_title', 'entry_status', 'entry_method', 'entry_time', 'exit_status', 'exit_method', 'exit_time',
+]
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+class Echo:
+    """File-like object whose write() returns the value, for csv.writer into a generator."""
+
+    def write(self, value):
+        return value
+
+
+def cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime.datetime) and timezone.is_aware(value):
+        # Local wall-clock time; Excel cannot store timezones
+        return timezone.make_naive(value)
+    return value
+
+
+def record_rows(records):
+    """Stream attendance records as export rows through a server-side cursor."""
+    rows = records.order_by('attendance_session__date', 'attendance_session_id', 'student__roll_number').values_list(*RECORD_FIELDS)
+    for row in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield [cell(value) for value in row]
+
+
+def stream_csv(header, rows):
+    writer = csv.writer(Echo())
+    # BOM so spreadsheet apps open the file as UTF-8
+    yield '\ufeff' + writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def write_xlsx(header, rows, output):
+    from openpyxl import Workbook  # only needed for XLSX exports
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Attendance')
+    sheet.append(header)
+    for row in rows:
+        sheet.append(row)
+    workbook.save(output)
+
+
+def export_response(header, rows, filename, file_format='csv'):
+    if file_format == 'xlsx':
+        output = tempfile.TemporaryFile()
+        write_xlsx(header, rows, output)
+        output.seek(0)
+        # FileResponse streams the file in blocks and closes it when done
+        return FileResponse(output, as_attachment=True, filename=f'{filename}.xlsx', content_type=CONTENT_TYPES['xlsx'])
+    response = StreamingHttpResponse(stream_csv(header, rows), content_type=CONTENT_TYPES['csv'])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
+
+
+def export_records(records, filename, file_format='csv'):
+    return export_response(RECORD_HEADER, record_rows(records), filename, file_format)
+
+
+def export_table(table, filename, file_format='csv'):
+    return export_response(table.header(), table.rows(), filename, file_format)
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendancereport',
+            name='error',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='attendancereport',
+            name='finished_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
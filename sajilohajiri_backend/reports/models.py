@@ -26,6 +26,8 @@ class AttendanceReport(models.Model):
     report_file = models.FileField(upload_to='attendance_reports/', null=True, blank=True)
     title = models.CharField(max_length=255, null=True, blank=True)
     generated_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True, null=True)  # why generation failed
 
     def __str__(self):
         return self.title or f"{self.report_type} report from {self.from_date} to {self.to_date}"
\ No newline at end of file
@@ -0,0 +1,56 @@
+from rest_framework import serializers
+from django.urls import reverse
+from academics.models import ClassSubject
+from .models import AttendanceReport
+
+# Serializers go down here
+class ReportRequestSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = AttendanceReport
+        fields = ['report_type', 'student', 'class_subject', 'from_date', 'to_date', 'title']
+
+    def validate(self, attrs):
+        if attrs['from_date'] > attrs['to_date']:
+            raise serializers.ValidationError({'to_date': 'to_date must not be before from_date.'})
+        if attrs['report_type'] == 'individual':
+            student = attrs.get('student')
+            if student is None or student.role != 'student':
+                raise serializers.ValidationError({'student': 'Individual reports need a student.'})
+        elif attrs.get('class_subject') is None:
+            raise serializers.ValidationError({'class_subject': f"{attrs['report_type'].capitalize()} reports need a class_subject."})
+        return attrs
+
+
+class AttendanceReportSerializer(serializers.ModelSerializer):
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = AttendanceReport
+        fields = ['id', 'report_type', 'student', 'class_subject', 'from_date', 'to_date', 'title', 'status', 'error', 'generated_at', 'finished_at', 'download_url']
+        read_only_fields = fields
+
+    def get_download_url(self, obj):
+        if obj.status not in ('generated', 'downloaded') or not obj.report_file:
+            return None
+        url = reverse('report_download', kwargs={'pk': obj.pk})
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+
+class AttendanceSummaryQuerySerializer(serializers.Serializer):
+    class_subject = serializers.PrimaryKeyRelatedField(queryset=ClassSubject.objects.all())
+    from_date = serializers.DateField()
+    to_date = serializers.DateField()
+    scope = serializers.ChoiceField(choices=['subject', 'class'], default='subject')
+    matrix = serializers.BooleanField(default=False)
+
+    def validate(self, attrs):
+        if attrs['from_date'] > attrs['to_date']:
+            raise serializers.ValidationError({'to_date': 'to_date must not be before from_date.'})
+        return attrs
+
+
+class AttendanceSummaryExportSerializer(AttendanceSummaryQuerySerializer):
+    matrix = serializers.BooleanField(default=True)
+    file_type = serializers.ChoiceField(choices=['csv', 'xlsx'], default='csv')
@@ -1,3 +1,254 @@
-from django.test import TestCase
+import csv
+import datetime
+import io
+import shutil
+import tempfile
+from unittest import mock
+from openpyxl import load_workbook
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from accounts.models import User
+from academics.models import Class, Subject, ClassSubject, StudentClassEnrollment
+from attendance.models import AttendanceSession, AttendanceRecord
+from .aggregation import attendance_table
+from .engine import generate_report
+from .exports import RECORD_HEADER
+from .models import AttendanceReport
+
+JANUARY = (datetime.date(2024, 1, 1), datetime.date(2024, 1, 31))
+
 
 # Create your tests here.
+class ReportTestCase(TestCase):
+    """Three enrolled students, two subjects of one class and a few open sessions.
+
+    Maths is held on 1 and 2 January and 1 February, Physics on 1 January.
+    Sessions stay open so no absent rows are filled in behind the test's back.
+    """
+
+    def setUp(self):
+        self.teacher = User.objects.create(email='teacher@example.com', role='teacher', name='Teacher')
+        school_class = Class.objects.create(name='Class', year=1, semester=1, department='Computer')
+        self.maths = ClassSubject.objects.create(class_instance=school_class, subject=Subject.objects.create(name='Maths', code='M1'), teacher=self.teacher)
+        self.physics = ClassSubject.objects.create(class_instance=school_class, subject=Subject.objects.create(name='Physics', code='P1'), teacher=self.teacher)
+        self.students = []
+        for n in range(1, 4):
+            student = User.objects.create(email=f'student{n}@example.com', role='student', name=f'Student {n}', roll_number=str(n))
+            StudentClassEnrollment.objects.create(student=student, enrolled_class=school_class)
+            self.students.append(student)
+        first, second, third = self.students
+
+        self.sessions = [
+            self.session(self.maths, datetime.date(2024, 1, 1), [(first, 'present', 'present'), (second, 'absent', None)]),
+            self.session(self.maths, datetime.date(2024, 1, 2), [(first, 'manual-present', 'manual-exit')]),
+            self.session(self.physics, datetime.date(2024, 1, 1), [(first, 'present', None)]),
+            self.session(self.maths, datetime.date(2024, 2, 1), [(second, 'present', 'present')]),
+        ]
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+
+    def session(self, class_subject, date, marks):
+        session = AttendanceSession.objects.create(class_subject=class_subject, date=date, session_title=f'{class_subject.subject.name} {date}')
+        AttendanceRecord.objects.bulk_create([
+            AttendanceRecord(attendance_session=session, student=student, entry_status=entry_status, entry_method='facial', exit_status=exit_status)
+            for student, entry_status, exit_status in marks
+        ])
+        return session
+
+
+class AttendanceTableTests(ReportTestCase):
+
+    def test_counts_per_student(self):
+        with self.assertNumQueries(4):
+            table = attendance_table(ClassSubject.objects.filter(pk=self.maths.pk), *JANUARY)
+        self.assertEqual(table.students['roll_number'], ['1', '2', '3'])
+        self.assertEqual(table.sessions['date'], [datetime.date(2024, 1, 1), datetime.date(2024, 1, 2)])
+        self.assertEqual(table.counts, {
+            'held': [2, 2, 2],
+            'present': [1, 0, 0],
+            'manual': [1, 0, 0],
+            'absent': [0, 2, 2],
+            'exited': [2, 0, 0],
+            'percentage': [100.0, 0.0, 0.0],
+        })
+        self.assertEqual(table.matrix, ['PM', 'A-', '--'])
+
+    def test_class_scope_covers_every_subject(self):
+        table = attendance_table(ClassSubject.objects.filter(pk__in=[self.maths.pk, self.physics.pk]), *JANUARY, with_matrix=False)
+        self.assertIsNone(table.matrix)
+        self.assertEqual(table.counts['held'], [3, 3, 3])
+        self.assertEqual(table.counts['present'], [2, 0, 0])
+        self.assertEqual(table.counts['percentage'], [100.0, 0.0, 0.0])
+        self.assertEqual(table.header(), ['Roll number', 'Name', 'Held', 'Present', 'Manual', 'Absent', 'Exited', 'Percentage'])
+
+    def test_no_sessions(self):
+        table = attendance_table(ClassSubject.objects.filter(pk=self.maths.pk), datetime.date(2023, 1, 1), datetime.date(2023, 1, 31))
+        self.assertEqual(table.counts['held'], [0, 0, 0])
+        self.assertEqual(table.counts['percentage'], [None, None, None])
+        self.assertEqual(table.matrix, ['', '', ''])
+
+    def test_summary_endpoint(self):
+        response = self.client.get('/api/reports/summary/', {
+            'class_subject': self.maths.pk, 'from_date': '2024-01-01', 'to_date': '2024-01-31', 'matrix': 'true',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['matrix'], ['PM', 'A-', '--'])
+        self.assertEqual(response.json()['counts']['absent'], [0, 2, 2])
+
+        self.client.force_authenticate(self.students[0])
+        response = self.client.get('/api/reports/summary/', {'class_subject': self.maths.pk, 'from_date': '2024-01-01', 'to_date': '2024-01-31'})
+        self.assertEqual(response.status_code, 403)
+
+
+class ReportGenerationTests(ReportTestCase):
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+
+    def report(self, **kwargs):
+        return AttendanceReport.objects.create(generated_by=self.teacher, from_date=JANUARY[0], to_date=JANUARY[1], status='processing', **kwargs)
+
+    def read(self, report):
+        with report.report_file.open('rb') as report_file:
+            return list(csv.reader(io.StringIO(report_file.read().decode('utf-8'))))
+
+    def test_subject_report(self):
+        report = self.report(report_type='subject', class_subject=self.maths)
+        generate_report(report.pk)
+        report.refresh_from_db()
+        self.assertEqual(report.status, 'generated')
+        self.assertIsNotNone(report.finished_at)
+        self.assertEqual(self.read(report), [
+            ['Roll number', 'Name', '2024-01-01 Maths', '2024-01-02 Maths', 'Held', 'Present', 'Manual', 'Absent', 'Exited', 'Percentage'],
+            ['1', 'Student 1', 'P', 'M', '2', '1', '1', '0', '2', '100.0'],
+            ['2', 'Student 2', 'A', '-', '2', '0', '0', '2', '0', '0.0'],
+            ['3', 'Student 3', '-', '-', '2', '0', '0', '2', '0', '0.0'],
+        ])
+
+    def test_individual_report(self):
+        report = self.report(report_type='individual', student=self.students[1])
+        generate_report(report.pk)
+        report.refresh_from_db()
+        rows = self.read(report)
+        self.assertEqual(rows[0][:4], ['Date', 'Subject', 'Session', 'Entry'])
+        self.assertEqual([row[:4] for row in rows[1:]], [
+            ['2024-01-01', 'Maths', 'Maths 2024-01-01', 'absent'],
+            ['2024-01-01', 'Physics', 'Physics 2024-01-01', 'absent'],
+            ['2024-01-02', 'Maths', 'Maths 2024-01-02', 'absent'],
+        ])
+
+    def test_failure_is_recorded(self):
+        report = self.report(report_type='subject', class_subject=self.maths)
+        with mock.patch('reports.engine.attendance_table', side_effect=RuntimeError('disk full')):
+            with self.assertLogs('reports.engine', 'ERROR'):
+                generate_report(report.pk)
+        report.refresh_from_db()
+        self.assertEqual((report.status, report.error), ('failed', 'disk full'))
+
+        response = self.client.get(f'/api/reports/{report.pk}/download/')
+        self.assertEqual(response.status_code, 410)
+        self.assertEqual(response.json()['detail'], 'disk full')
+
+    def test_request_runs_in_background(self):
+        with mock.patch('reports.views.run_in_background') as run_in_background:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post('/api/reports/', {
+                    'report_type': 'subject', 'class_subject': self.maths.pk, 'from_date': '2024-01-01', 'to_date': '2024-01-31',
+                }, format='json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['status'], 'processing')
+        self.assertIsNone(response.json()['download_url'])
+        run_in_background.assert_called_once_with(generate_report, response.json()['id'])
+
+        response = self.client.get(f"/api/reports/{response.json()['id']}/download/")
+        self.assertEqual(response.status_code, 409)
+
+    def test_students_only_request_their_own_report(self):
+        self.client.force_authenticate(self.students[0])
+        response = self.client.post('/api/reports/', {
+            'report_type': 'individual', 'student': self.students[1].pk, 'from_date': '2024-01-01', 'to_date': '2024-01-31',
+        }, format='json')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(AttendanceReport.objects.exists())
+
+    def test_download(self):
+        report = self.report(report_type='subject', class_subject=self.maths)
+        generate_report(report.pk)
+        response = self.client.get(f'/api/reports/{report.pk}/')
+        self.assertTrue(response.json()['download_url'].endswith(f'/api/reports/{report.pk}/download/'))
+
+        response = self.client.get(f'/api/reports/{report.pk}/download/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Disposition'], f'attachment; filename="subject-{report.pk}-2024-01-01-2024-01-31.csv"')
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'Roll number,Name,'))
+        response.close()
+        report.refresh_from_db()
+        self.assertEqual(report.status, 'downloaded')
+
+        self.client.force_authenticate(self.students[0])
+        response = self.client.get(f'/api/reports/{report.pk}/download/')
+        self.assertEqual(response.status_code, 404)
+
+
+class ExportTests(ReportTestCase):
+    summary_url = '/api/reports/summary/export/'
+    records_url = '/api/reports/records/export/'
+
+    def summary_query(self, **kwargs):
+        return {'class_subject': self.maths.pk, 'from_date': '2024-01-01', 'to_date': '2024-01-31', **kwargs}
+
+    def test_summary_csv(self):
+        response = self.client.get(self.summary_url, self.summary_query())
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(response['Content-Disposition'], f'attachment; filename="attendance-subject-{self.maths.pk}-2024-01-01-2024-01-31.csv"')
+        content = b''.join(response.streaming_content).decode('utf-8')
+        self.assertTrue(content.startswith('\ufeffRoll number,'))
+        rows = list(csv.reader(io.StringIO(content.lstrip('\ufeff'))))
+        self.assertEqual(rows[0][2:4], ['2024-01-01 Maths', '2024-01-02 Maths'])
+        self.assertEqual(rows[1], ['1', 'Student 1', 'P', 'M', '2', '1', '1', '0', '2', '100.0'])
+        self.assertEqual(len(rows), 4)
+
+    def test_summary_xlsx(self):
+        response = self.client.get(self.summary_url, self.summary_query(file_type='xlsx', matrix='false', scope='class'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+        self.assertEqual(response['Content-Disposition'], f'attachment; filename="attendance-class-{self.maths.pk}-2024-01-01-2024-01-31.xlsx"')
+        workbook = load_workbook(io.BytesIO(b''.join(response.streaming_content)), read_only=True)
+        response.close()
+        rows = list(workbook['Attendance'].values)
+        self.assertEqual(rows, [
+            ('Roll number', 'Name', 'Held', 'Present', 'Manual', 'Absent', 'Exited', 'Percentage'),
+            ('1', 'Student 1', 3, 2, 1, 0, 2, 100),
+            ('2', 'Student 2', 3, 0, 0, 3, 0, 0),
+            ('3', 'Student 3', 3, 0, 0, 3, 0, 0),
+        ])
+
+    def test_records_csv(self):
+        response = self.client.get(self.records_url, {'class_subject': self.maths.pk, 'to_date': '2024-01-31'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="attendance-records.csv"')
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode('utf-8').lstrip('\ufeff'))))
+        self.assertEqual(rows[0], RECORD_HEADER)
+        self.assertEqual([row[:8] for row in rows[1:]], [
+            ['Student 1', '1', '2024-01-01', 'Maths', 'M1', 'Maths 2024-01-01', 'present', 'facial'],
+            ['Student 2', '2', '2024-01-01', 'Maths', 'M1', 'Maths 2024-01-01', 'absent', 'facial'],
+            ['Student 1', '1', '2024-01-02', 'Maths', 'M1', 'Maths 2024-01-02', 'manual-present', 'facial'],
+        ])
+
+    def test_records_are_limited_to_what_the_user_sees(self):
+        self.client.force_authenticate(self.students[1])
+        response = self.client.get(self.records_url)
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode('utf-8').lstrip('\ufeff'))))
+        self.assertEqual([row[2] for row in rows[1:]], ['2024-01-01', '2024-02-01'])
+
+    def test_unknown_file_type(self):
+        response = self.client.get(self.records_url, {'file_type': 'pdf'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(self.summary_url, self.summary_query(file_type='pdf'))
+        self.assertEqual(response.status_code, 400)
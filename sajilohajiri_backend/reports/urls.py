@@ -0,0 +1,11 @@
+from django.urls import path
+from .views import ReportListCreateAPIView, ReportDetailAPIView, ReportDownloadAPIView, AttendanceSummaryAPIView, AttendanceSummaryExportAPIView, AttendanceRecordExportAPIView
+
+urlpatterns = [
+    path('', ReportListCreateAPIView.as_view(), name='report_list'),
+    path('summary/', AttendanceSummaryAPIView.as_view(), name='report_summary'),
+    path('summary/export/', AttendanceSummaryExportAPIView.as_view(), name='report_summary_export'),
+    path('records/export/', AttendanceRecordExportAPIView.as_view(), name='attendance_record_export'),
+    path('<int:pk>/', ReportDetailAPIView.as_view(), name='report_detail'),
+    path('<int:pk>/download/', ReportDownloadAPIView.as_view(), name='report_download'),
+]
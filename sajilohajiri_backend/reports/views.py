@@ -1,3 +1,121 @@
 from django.shortcuts import render
+from django.db import transaction
+from django.http import FileResponse
+from rest_framework import generics
+from rest_framework import views
+from rest_framework import status
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from academics.models import ClassSubject, StudentClassEnrollment
+from sajilohajiri_backend.background import run_in_background
+from .models import AttendanceReport
+from .serializers import ReportRequestSerializer, AttendanceReportSerializer, AttendanceSummaryQuerySerializer, AttendanceSummaryExportSerializer
+from .engine import generate_report, report_subjects
+from .aggregation import attendance_table
+from .exports import export_records, export_table
+from attendance.filters import AttendanceRecordFilter
+from attendance.views import visible_records
+
+
+def can_request(user, data):
+    """Admins may report on anything, teachers on the classes they teach, students on themselves."""
+    if user.role == 'admin' or user.is_staff:
+        return True
+    if user.role == 'student':
+        return data['report_type'] == 'individual' and data['student'].pk == user.pk
+    taught = ClassSubject.objects.filter(teacher=user)
+    class_subject = data.get('class_subject')
+    if data['report_type'] == 'class':
+        return taught.filter(class_instance_id=class_subject.class_instance_id).exists()
+    if class_subject is not None:
+        return class_subject.teacher_id == user.pk
+    return StudentClassEnrollment.objects.filter(
+        student=data['student'], enrolled_class_id__in=taught.values('class_instance_id'),
+    ).exists()
+
 
 # Create your views here.
+class ReportListCreateAPIView(generics.ListCreateAPIView):
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return AttendanceReport.objects.filter(generated_by=self.request.user).order_by('-generated_at')
+
+    def get_serializer_class(self):
+        return ReportRequestSerializer if self.request.method == 'POST' else AttendanceReportSerializer
+
+    def create(self, request, *args, **kwargs):
+        serializer = ReportRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        if not can_request(request.user, serializer.validated_data):
+            raise PermissionDenied('You cannot request this report.')
+        report = serializer.save(generated_by=request.user, status='processing')
+        # Generated off the request path; poll the detail endpoint for the result
+        transaction.on_commit(lambda: run_in_background(generate_report, report.pk))
+        return Response(AttendanceReportSerializer(report, context={'request': request}).data, status=status.HTTP_202_ACCEPTED)
+
+
+class ReportDetailAPIView(generics.RetrieveAPIView):
+    serializer_class = AttendanceReportSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return AttendanceReport.objects.filter(generated_by=self.request.user)
+
+
+class ReportDownloadAPIView(views.APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk, *args, **kwargs):
+        report = AttendanceReport.objects.filter(pk=pk, generated_by=request.user).first()
+        if report is None:
+            return Response({'error': 'Report not found'}, status=status.HTTP_404_NOT_FOUND)
+        if report.status == 'processing':
+            return Response({'error': 'Report is still being generated'}, status=status.HTTP_409_CONFLICT)
+        if report.status == 'failed' or not report.report_file:
+            return Response({'error': 'Report generation failed', 'detail': report.error}, status=status.HTTP_410_GONE)
+        if report.status == 'generated':
+            AttendanceReport.objects.filter(pk=report.pk).update(status='downloaded')
+        return FileResponse(report.report_file.open('rb'), as_attachment=True, filename=report.report_file.name.rsplit('/', 1)[-1])
+
+
+class AttendanceSummaryAPIView(views.APIView):
+    permission_classes = [IsAuthenticated]
+    query_serializer_class = AttendanceSummaryQuerySerializer
+
+    def get_table(self, request):
+        serializer = self.query_serializer_class(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        if request.user.role == 'student' or not can_request(request.user, {'report_type': data['scope'], 'class_subject': data['class_subject']}):
+            raise PermissionDenied('You cannot view this summary.')
+        # Same scope as a class/subject report, computed inline
+        report = AttendanceReport(report_type=data['scope'], class_subject=data['class_subject'], from_date=data['from_date'], to_date=data['to_date'])
+        return attendance_table(report_subjects(report), data['from_date'], data['to_date'], with_matrix=data['matrix']), data
+
+    def get(self, request, *args, **kwargs):
+        table, data = self.get_table(request)
+        return Response(table.as_dict())
+
+
+class AttendanceSummaryExportAPIView(AttendanceSummaryAPIView):
+    query_serializer_class = AttendanceSummaryExportSerializer
+
+    def get(self, request, *args, **kwargs):
+        table, data = self.get_table(request)
+        filename = f"attendance-{data['scope']}-{data['class_subject'].pk}-{data['from_date']}-{data['to_date']}"
+        return export_table(table, filename, data['file_type'])
+
+
+class AttendanceRecordExportAPIView(views.APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        file_type = request.query_params.get('file_type', 'csv')
+        if file_type not in ('csv', 'xlsx'):
+            return Response({'error': 'file_type must be csv or xlsx'}, status=status.HTTP_400_BAD_REQUEST)
+        filterset = AttendanceRecordFilter(request.query_params, queryset=visible_records(request.user))
+        if not filterset.is_valid():
+            return Response(filterset.errors, status=status.HTTP_400_BAD_REQUEST)
+        return export_records(filterset.qs, 'attendance-records', file_type)
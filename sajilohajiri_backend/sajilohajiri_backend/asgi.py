@@ -2,6 +2,12 @@
 ASGI config for sajilohajiri_backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP goes to Django; WebSocket connections are routed to the consumers listed
+in ``websocket_urlpatterns`` (live attendance recognition).
+
+Serve it with an ASGI server, e.g.::
+
+    uvicorn sajilohajiri_backend.asgi:application
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -13,4 +19,22 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sajilohajiri_backend.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after Django is set up, since consumers use the ORM
+from attendance.consumers import websocket_urlpatterns  # noqa: E402
+
+
+async def websocket_application(scope, receive, send):
+    for pattern, consumer in websocket_urlpatterns:
+        match = pattern.match(scope['path'])
+        if match:
+            return await consumer(scope, receive, send, **match.groupdict())()
+    await receive()
+    await send({'type': 'websocket.close', 'code': 4404})
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        return await websocket_application(scope, receive, send)
+    return await django_application(scope, receive, send)
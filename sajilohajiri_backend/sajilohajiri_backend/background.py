@@ -0,0 +1,27 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+# Small in-process job runner for work that must not run on the request path
+# (bulk enrollment, report generation). Jobs record their own progress in the
+# database, so callers only need to hand over a primary key.
+
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'BACKGROUND_JOB_THREADS', 2),
+    thread_name_prefix='background-job',
+)
+
+
+def run_in_background(fn, *args):
+    def job():
+        try:
+            fn(*args)
+        except Exception:
+            logger.exception('Background job %s failed', getattr(fn, '__name__', fn))
+        finally:
+            connection.close()
+
+    return _executor.submit(job)
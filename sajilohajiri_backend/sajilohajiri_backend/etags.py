@@ -0,0 +1,25 @@
+import hashlib
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+# Conditional GET helpers for DRF views: send an ETag with the response and
+# answer If-None-Match with an empty 304 when the client's copy is current.
+
+
+def etag_for(data):
+    return '"%s"' % hashlib.md5(JSONRenderer().render(data)).hexdigest()
+
+
+def etag_matches(request, etag):
+    tags = parse_etags(request.headers.get('If-None-Match', ''))
+    return '*' in tags or etag in tags or f'W/{etag}' in tags
+
+
+def conditional_response(request, data, etag=None):
+    etag = etag or etag_for(data)
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+    if etag_matches(request, etag):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(data, headers=headers)
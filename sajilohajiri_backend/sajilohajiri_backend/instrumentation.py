@@ -0,0 +1,200 @@
+import bisect
+import contextvars
+import json
+import logging
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework import renderers
+
+logger = logging.getLogger(__name__)
+
+# Opt-in request instrumentation (INSTRUMENTATION_ENABLED).
+#
+# InstrumentationMiddleware measures every request: wall time, database
+# queries and their time, and the spans recorded with timed() while it runs.
+# Spans recorded out of the box are 'face' (waiting on the face encoding
+# pool) and 'serialize' (rendering response data with JSONRenderer; building
+# serializer.data happens in the view). Each request gets a Server-Timing
+# header and a JSON log line, and is added to a per-view histogram served to
+# admins at /api/admin/metrics/ (accounts.views.MetricsAPIView). Everything
+# is per process.
+
+BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.spans = {}
+
+    def add(self, name, seconds):
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db += time.perf_counter() - started
+
+
+@contextmanager
+def timed(name):
+    """Add the time spent in the block to span `name` of the current request, if it is instrumented."""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add(name, time.perf_counter() - started)
+
+
+class ViewStats:
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.queries = 0
+        self.max_queries = 0
+        self.db_ms = 0.0
+        self.spans_ms = {}
+        self.bytes = 0
+
+    def add(self, sample):
+        self.count += 1
+        self.errors += sample['status'] >= 500
+        self.total_ms += sample['duration_ms']
+        self.max_ms = max(self.max_ms, sample['duration_ms'])
+        self.buckets[bisect.bisect_left(BUCKETS_MS, sample['duration_ms'])] += 1
+        self.queries += sample['db_queries']
+        self.max_queries = max(self.max_queries, sample['db_queries'])
+        self.db_ms += sample['db_ms']
+        for name, value in sample['spans_ms'].items():
+            self.spans_ms[name] = self.spans_ms.get(name, 0.0) + value
+        self.bytes += sample['bytes'] or 0
+
+    def percentile(self, fraction):
+        # Upper bound of the bucket holding the percentile; None past the last bucket
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS_MS + [None], self.buckets):
+            seen += count
+            if seen >= rank:
+                return bound
+        return None
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'mean_ms': round(self.total_ms / self.count, 2),
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'max_ms': round(self.max_ms, 2),
+            'histogram_ms': dict(zip([f'<={bound}' for bound in BUCKETS_MS] + [f'>{BUCKETS_MS[-1]}'], self.buckets)),
+            'mean_db_queries': round(self.queries / self.count, 2),
+            'max_db_queries': self.max_queries,
+            'mean_db_ms': round(self.db_ms / self.count, 2),
+            'mean_spans_ms': {name: round(value / self.count, 2) for name, value in self.spans_ms.items()},
+            'mean_bytes': round(self.bytes / self.count),
+        }
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+        self.since = time.time()
+
+    def add(self, sample):
+        with self._lock:
+            self._views.setdefault(sample['view'], ViewStats()).add(sample)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'since': self.since,
+                'views': {view: stats.as_dict() for view, stats in sorted(self._views.items())},
+            }
+
+    def reset(self):
+        with self._lock:
+            self._views = {}
+            self.since = time.time()
+
+
+metrics = MetricsRegistry()
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    # Router patterns are regexes; drop their anchors
+    route = match.route.replace('^', '').replace('$', '') if match is not None else 'unresolved'
+    return f'{request.method} /{route}'
+
+
+class InstrumentationMiddleware:
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'INSTRUMENTATION_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_metrics = RequestMetrics()
+        token = _current.set(request_metrics)
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(request_metrics.record_query))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        duration = time.perf_counter() - request_metrics.started
+        spans_ms = {name: round(seconds * 1000, 2) for name, seconds in request_metrics.spans.items()}
+        sample = {
+            'view': view_name(request),
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 2),
+            'db_queries': request_metrics.queries,
+            'db_ms': round(request_metrics.db * 1000, 2),
+            'spans_ms': spans_ms,
+            'bytes': None if response.streaming else len(response.content),
+        }
+        metrics.add(sample)
+
+        timings = [f'total;dur={sample["duration_ms"]}', f'db;dur={sample["db_ms"]};desc="{sample["db_queries"]} queries"']
+        timings += [f'{name};dur={value}' for name, value in spans_ms.items()]
+        response['Server-Timing'] = ', '.join(timings)
+
+        slow = sample['duration_ms'] >= getattr(settings, 'INSTRUMENTATION_SLOW_MS', 1000)
+        logger.log(logging.WARNING if slow else logging.INFO, json.dumps({'path': request.path, **sample}))
+        return response
+
+
+class JSONRenderer(renderers.JSONRenderer):
+    """JSONRenderer that records its time as the 'serialize' span."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timed('serialize'):
+            return super().render(data, accepted_media_type, renderer_context)
+
@@ -0,0 +1,28 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import PageNumberPagination, CursorPagination
+from rest_framework.settings import api_settings
+
+# Pagination used across the API (see REST_FRAMEWORK in settings).
+#
+# Small admin tables use page numbers. Tables that grow with the institution
+# (users, attendance records) use keyset pagination: the cursor carries the
+# last primary key seen, so page 500 costs the same indexed range scan as
+# page 1 instead of an ever larger OFFSET.
+
+
+class StandardPagination(PageNumberPagination):
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class KeysetPagination(CursorPagination):
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = 'id'
+
+    def get_ordering(self, request, queryset, view):
+        # Always page on the unique primary key; views may pick the direction
+        # with keyset_ordering = '-id'. Refuse ?ordering= rather than ignore it
+        if request.query_params.get(api_settings.ORDERING_PARAM):
+            raise ValidationError({api_settings.ORDERING_PARAM: 'This list is always ordered by id.'})
+        return (getattr(view, 'keyset_ordering', self.ordering),)
@@ -10,10 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 import accounts
 from datetime import timedelta
 from corsheaders.defaults import default_headers
+from django.core.exceptions import ImproperlyConfigured
 
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -52,6 +54,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'sajilohajiri_backend.instrumentation.InstrumentationMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -85,12 +88,59 @@ WSGI_APPLICATION = 'sajilohajiri_backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+#
+# Chosen with environment variables:
+#   DB_ENGINE=sqlite (default)  single-server deployments. WAL lets readers
+#       run alongside the one writer, writers wait up to SQLITE_BUSY_TIMEOUT
+#       seconds for the lock instead of failing, and transactions take the
+#       write lock up front (IMMEDIATE) so they never deadlock upgrading it.
+#       DB_SQLITE_TUNED=0 gives the plain Django defaults.
+#   DB_ENGINE=postgres  DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT.
+#       Connections come from a psycopg 3 pool of DB_POOL_MIN_SIZE to
+#       DB_POOL_MAX_SIZE per process; DB_POOL_MAX_SIZE=0 disables the pool
+#       and keeps each connection open for DB_CONN_MAX_AGE seconds instead.
+
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'sajilohajiri'),
+            'USER': os.environ.get('DB_USER', 'sajilohajiri'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
     }
-}
+    DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', 10))
+    if DB_POOL_MAX_SIZE:
+        # Pooled connections are returned to the pool after each request; Django requires CONN_MAX_AGE = 0 with a pool
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+            'max_size': DB_POOL_MAX_SIZE,
+            'timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        }
+    else:
+        DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', 60))
+elif DB_ENGINE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 0)),
+        }
+    }
+    if os.environ.get('DB_SQLITE_TUNED', '1') == '1':
+        DATABASES['default']['OPTIONS'] = {
+            'timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 20)),
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;',
+        }
+else:
+    raise ImproperlyConfigured(f'Unknown DB_ENGINE {DB_ENGINE!r}; use sqlite or postgres.')
 
 
 # Password validation
@@ -149,7 +199,42 @@ REST_FRAMEWORK = {
         'rest_framework.filters.OrderingFilter',
         'rest_framework.filters.SearchFilter',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'sajilohajiri_backend.instrumentation.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PAGINATION_CLASS': 'sajilohajiri_backend.pagination.StandardPagination',
+    'PAGE_SIZE': 100,
+}
+
+# Request instrumentation: Server-Timing headers, a log line per request and
+# per-view histograms at /api/admin/metrics/ (see sajilohajiri_backend.instrumentation)
+INSTRUMENTATION_ENABLED = os.environ.get('INSTRUMENTATION_ENABLED', '0') == '1'
+INSTRUMENTATION_SLOW_MS = 1000  # requests slower than this are logged as warnings
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'sajilohajiri_backend.instrumentation': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
+# Caching
+# LocMemCache is per process: with several workers, switch to FileBasedCache
+# (e.g. LOCATION '/var/tmp/sajilohajiri_cache') or a shared Redis/Memcached
+# cache so academics and face index invalidations reach every worker.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'sajilohajiri',
+    }
 }
+ACADEMICS_CACHE = 'default'  # cache alias for academics responses
+ACADEMICS_CACHE_TIMEOUT = 300  # seconds; versions invalidate sooner on change
 
 # Media configurations
 MEDIA_URL = 'media/'
@@ -165,7 +250,29 @@ SIMPLE_JWT = {
     'SIGNING_KEY': SECRET_KEY,
     'AUTH_HEADER_TYPES': ('Bearer',),
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
+    # Embed role, is_staff and approval_status for accounts.authentication.ClaimsJWTAuthentication
+    'TOKEN_OBTAIN_SERIALIZER': 'accounts.serializers.ClaimsTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.serializers.ClaimsTokenRefreshSerializer',
 }
+JWT_CLAIMS_CHECK_TTL = 60  # seconds a user's active/role state is trusted before re-reading it
+
+# Face recognition settings
+FACE_DETECTION_MODEL = 'hog'  # 'cnn' is more accurate and batches frames, but needs a GPU to be fast
+FACE_MATCH_TOLERANCE = 0.6
+FACE_INDEX_CACHE = 'default'  # cache alias holding the face index version keys
+FACE_INDEX_MAX_AGE = 300  # seconds before a worker rebuilds a class's face index regardless
+FACE_ENCODING_FORMAT = 'f64le'
+FACE_ENCODING_WORKERS = 2  # worker processes; 0 encodes inline in the request thread
+FACE_ENCODING_QUEUE_SIZE = 8  # jobs allowed to wait before requests get a 503
+FACE_ENCODING_TIMEOUT = 30  # seconds a request waits for its result
+FACE_ENCODING_RETRY_AFTER = 2  # Retry-After seconds sent with the 503
+FACE_ENROLLMENT_STALE_SECONDS = 900  # enrollment jobs without progress this long are marked failed
+RECOGNITION_FRAME_MAX_DIMENSION = 640  # larger webcam JPEGs are decoded at 1/2, 1/4 or 1/8 scale
+AVATAR_MAX_DIMENSION = 800  # longest side of the normalized avatar used for encoding
+ROSTER_IDLE_SECONDS = 900  # per-process rosters of open sessions unused this long are dropped
+
+# Bulk student import
+IMPORT_HASH_WORKERS = 4  # processes hashing passwords; 0 hashes inline
 
 CORS_ALLOW_CREDENTIALS = True
 CORS_ALLOWED_ORIGINS = ["http://localhost:5173", "http://127.0.0.1:5173", "http://localhost:5174", "http://127.0.0.1:5174",]
@@ -19,6 +19,7 @@ from django.urls import path, include
 import accounts, academics
 from django.conf import settings
 from django.conf.urls.static import static
+from accounts.views import AdminBootstrapAPIView, MetricsAPIView
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
@@ -28,8 +29,12 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('api/admin/bootstrap/', AdminBootstrapAPIView.as_view(), name='admin_bootstrap'),
+    path('api/admin/metrics/', MetricsAPIView.as_view(), name='admin_metrics'),
     path('accounts/api/', include('accounts.urls')),
     path('academics/api/', include('academics.urls')),
+    path('api/attendance/', include('attendance.urls')),
+    path('api/reports/', include('reports.urls')),
 ]
 
 urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)